@@ -0,0 +1,37 @@
+from dotenv import load_dotenv
+
+import vowelsharepoint
+from vowelsharepoint.office365sdk import *
+
+load_dotenv()
+site_url = os.getenv('SHAREPOINT_SITE_URL')
+tenant_id = os.getenv('SHAREPOINT_TENANT_ID')
+client_id = os.getenv('SHAREPOINT_CLIENT_ID')
+cert_thumbprint = os.getenv('SHAREPOINT_CERT_THUMBPRINT')
+cert_pem = os.getenv('SHAREPOINT_CERT_PEM')
+
+
+def test_flow_acl_index_success(): 
+
+    # connection setup
+    site = vowelsharepoint.office365sdk.SharePointSite(site_url)
+    site.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem)
+    assert site.check_connection_valid(site_url) == True
+
+    # snapshot library permissions once, persist for restarts
+    acl_index = site.build_acl_index("Documents")
+    assert acl_index is not None
+    acl_index.save("/tmp/acl-index-documents.json")
+
+    # ACL check, answered locally
+    user_email = "sushamashroff@ciscosystems335.onmicrosoft.com"
+    file_path = "/sites/test-site-1/Shared Documents/sharepoint-test-site-12-test-doc.docx"
+    assert acl_index.has_access(user_email, file_path) == True
+
+    # periodic refresh, reads only the changed items
+    acl_index = AclIndex.load("/tmp/acl-index-documents.json")
+    assert site.refresh_acl_index(acl_index) == True
+    assert acl_index.has_access(user_email, file_path) == True
+
+if __name__ == '__main__':
+    test_flow_acl_index_success()
@@ -0,0 +1,34 @@
+from dotenv import load_dotenv
+import asyncio
+import json
+
+from vowelsharepoint.office365sdk import *
+from vowelsharepoint.asyncsite import AsyncSharePointSite
+
+load_dotenv()
+site_url = os.getenv('SHAREPOINT_SITE_URL')
+tenant_id = os.getenv('SHAREPOINT_TENANT_ID')
+client_id = os.getenv('SHAREPOINT_CLIENT_ID')
+cert_thumbprint = os.getenv('SHAREPOINT_CERT_THUMBPRINT')
+cert_pem = os.getenv('SHAREPOINT_CERT_PEM')
+
+
+async def test_flow_async_files_and_access():
+
+    async with AsyncSharePointSite(site_url) as site:
+        # connection setup
+        assert await site.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem) == True
+        assert await site.check_connection_valid(site_url) == True
+
+        folder_files_summary = await site.get_files_in_folder("Documents/sharepoint-test-folder1", "custom-metadata")
+        print(json.dumps(folder_files_summary, indent=4))
+
+        # ACL checks multiplexed on the event loop
+        user_email = "sushamashroff@ciscosystems335.onmicrosoft.com"
+        access = await asyncio.gather(*[
+            site.check_user_access_for_file(user_email, f["server_relative_url"], "OPEN_ITEMS") for f in folder_files_summary
+        ])
+        print(access)
+
+if __name__ == '__main__':
+    asyncio.run(test_flow_async_files_and_access())
@@ -0,0 +1,42 @@
+from dotenv import load_dotenv
+import json
+import shutil
+
+import vowelsharepoint
+from vowelsharepoint.office365sdk import *
+
+load_dotenv()
+site_url = os.getenv('SHAREPOINT_SITE_URL')
+tenant_id = os.getenv('SHAREPOINT_TENANT_ID')
+client_id = os.getenv('SHAREPOINT_CLIENT_ID')
+cert_thumbprint = os.getenv('SHAREPOINT_CERT_THUMBPRINT')
+cert_pem = os.getenv('SHAREPOINT_CERT_PEM')
+
+
+def test_flow_download_cache():  
+
+    # connection setup
+    site = vowelsharepoint.office365sdk.SharePointSite(site_url)
+    assert site.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem) == True
+    assert site.check_connection_valid(site_url) == True
+
+    # cache shared by the services of a node (same volume as download paths, so files are hardlinked)
+    site.enable_download_cache("/Users/sushroff/Desktop/sharepoint_cache", max_bytes=2 * 1024 * 1024 * 1024)
+
+    download_path = "/Users/sushroff/Desktop/sharepoint_download_temp"
+    shutil.rmtree(download_path, ignore_errors=True)
+    os.mkdir(download_path) 
+
+    # second run is served from the cache
+    folder_files_summary = site.get_files_in_folder("Documents/sharepoint-test-folder1")
+    for run in range(2):
+        results, stats = site.download_many(folder_files_summary, download_path, max_workers=8)
+        print(json.dumps(stats, indent=4))
+    print(json.dumps(site.get_download_cache_stats(), indent=4))
+
+    # read-only cache path, no copy
+    cached_path = site.get_cached_file(folder_files_summary[0])
+    print("cached file", cached_path)
+    
+if __name__ == '__main__':
+    test_flow_download_cache()
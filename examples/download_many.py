@@ -0,0 +1,39 @@
+from dotenv import load_dotenv
+import json
+import shutil
+
+import vowelsharepoint
+from vowelsharepoint.office365sdk import *
+
+load_dotenv()
+site_url = os.getenv('SHAREPOINT_SITE_URL')
+tenant_id = os.getenv('SHAREPOINT_TENANT_ID')
+client_id = os.getenv('SHAREPOINT_CLIENT_ID')
+cert_thumbprint = os.getenv('SHAREPOINT_CERT_THUMBPRINT')
+cert_pem = os.getenv('SHAREPOINT_CERT_PEM')
+
+
+def test_flow_download_many():  
+
+    # connection setup
+    site = vowelsharepoint.office365sdk.SharePointSite(site_url)
+    assert site.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem) == True
+    assert site.check_connection_valid(site_url) == True
+
+    # local storage handling for downloaded files
+    # download path should map to appropriate Volume mount when running on K8s cluster
+    download_path = "/Users/sushroff/Desktop/sharepoint_download_temp"
+    shutil.rmtree(download_path, ignore_errors=True)
+    os.mkdir(download_path) 
+    print("Directory created", download_path) 
+
+    # files keep their folder structure under download_path
+    folder_files_summary = site.get_files_in_folder("Documents/sharepoint-test-folder1")
+    results, stats = site.download_many(folder_files_summary, download_path, max_workers=8)
+    for file_download_summary, isOk in results:
+        if not isOk:
+            print("Download file errored")
+    print(json.dumps(stats, indent=4))
+    
+if __name__ == '__main__':
+    test_flow_download_many()
@@ -0,0 +1,35 @@
+from dotenv import load_dotenv
+import json
+
+import vowelsharepoint
+from vowelsharepoint.office365sdk import *
+
+load_dotenv()
+site_url = os.getenv('SHAREPOINT_SITE_URL')
+tenant_id = os.getenv('SHAREPOINT_TENANT_ID')
+client_id = os.getenv('SHAREPOINT_CLIENT_ID')
+cert_thumbprint = os.getenv('SHAREPOINT_CERT_THUMBPRINT')
+cert_pem = os.getenv('SHAREPOINT_CERT_PEM')
+
+def test_get_file_changes(): 
+
+    # connection setup
+    site = vowelsharepoint.office365sdk.SharePointSite(site_url)
+    site.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem)
+    assert site.check_connection_valid(site_url) == True
+
+    folder_path = "Documents/sharepoint-test-folder1"
+    tag_column_name = "custom-metadata"
+
+    # full crawl once, change token taken before it so no change is missed
+    change_token = site.get_change_token(folder_path)
+    folder_files_summary = site.get_files_in_folder(folder_path, tag_column_name)
+    print(json.dumps(folder_files_summary, indent=4))
+
+    # incremental crawl, persist file_changes["change_token"] for the next run
+    file_changes = site.get_file_changes(folder_path, change_token, tag_column_name)
+    print(json.dumps(file_changes, indent=4))
+
+
+if __name__ == '__main__':
+    test_get_file_changes()
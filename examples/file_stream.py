@@ -0,0 +1,37 @@
+from dotenv import load_dotenv
+import hashlib
+import zipfile
+
+import vowelsharepoint
+from vowelsharepoint.office365sdk import *
+
+load_dotenv()
+site_url = os.getenv('SHAREPOINT_SITE_URL')
+tenant_id = os.getenv('SHAREPOINT_TENANT_ID')
+client_id = os.getenv('SHAREPOINT_CLIENT_ID')
+cert_thumbprint = os.getenv('SHAREPOINT_CERT_THUMBPRINT')
+cert_pem = os.getenv('SHAREPOINT_CERT_PEM')
+
+
+def test_flow_file_stream():  
+
+    # connection setup
+    site = vowelsharepoint.office365sdk.SharePointSite(site_url)
+    assert site.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem) == True
+    assert site.check_connection_valid(site_url) == True
+
+    # parse documents straight from SharePoint, no local file
+    for file_summary in site.iter_files_in_folder("Documents/sharepoint-test-folder1"):
+        file_path = file_summary["server_relative_url"]
+        if file_path.endswith(".docx"):
+            with site.open_file_stream(file_path) as fp:
+                with zipfile.ZipFile(fp) as docx:
+                    print(file_path, docx.namelist())
+        else:
+            sha256 = hashlib.sha256()
+            for chunk in site.iter_file_chunks(file_path, reuse_buffer=True):
+                sha256.update(chunk)
+            print(file_path, sha256.hexdigest())
+    
+if __name__ == '__main__':
+    test_flow_file_stream()
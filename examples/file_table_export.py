@@ -0,0 +1,34 @@
+from dotenv import load_dotenv
+
+import vowelsharepoint
+from vowelsharepoint.office365sdk import *
+from vowelsharepoint.filetable import write_ndjson
+
+load_dotenv()
+site_url = os.getenv('SHAREPOINT_SITE_URL')
+tenant_id = os.getenv('SHAREPOINT_TENANT_ID')
+client_id = os.getenv('SHAREPOINT_CLIENT_ID')
+cert_thumbprint = os.getenv('SHAREPOINT_CERT_THUMBPRINT')
+cert_pem = os.getenv('SHAREPOINT_CERT_PEM')
+
+
+def test_file_table_export_success(): 
+
+    # connection setup
+    site = vowelsharepoint.office365sdk.SharePointSite(site_url)
+    site.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem)
+    assert site.check_connection_valid(site_url) == True
+
+    # compact in memory inventory, rows are dict compatible
+    files = site.get_file_table("Documents")
+    print("files: {0}, total size: {1} bytes".format(len(files), sum(f.size for f in files)))
+
+    # streamed straight from the listing, without keeping it in memory
+    with open("files.ndjson", "w") as f:
+        write_ndjson(site.iter_files_in_folder("Documents"), f)
+
+    # needs pip install vowelsharepoint[columnar]
+    files.write_parquet("files.parquet")
+
+if __name__ == '__main__':
+    test_file_table_export_success()
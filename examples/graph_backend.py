@@ -0,0 +1,36 @@
+from dotenv import load_dotenv
+import os
+import json
+
+import vowelsharepoint
+from vowelsharepoint.msgraphapi import *
+
+load_dotenv()
+site_url = os.getenv('SHAREPOINT_SITE_URL')
+tenant_id = os.getenv('SHAREPOINT_TENANT_ID')
+client_id = os.getenv('SHAREPOINT_CLIENT_ID')
+cert_thumbprint = os.getenv('SHAREPOINT_CERT_THUMBPRINT')
+cert_pem = os.getenv('SHAREPOINT_CERT_PEM')
+backend = os.getenv('SHAREPOINT_BACKEND', Backend_Graph)
+
+
+def test_files_in_folder_graph_success(): 
+
+    # connection setup, same calls on either backend
+    site = vowelsharepoint.msgraphapi.new_site(site_url, backend)
+    assert site.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem) == True
+    assert site.check_connection_valid(site_url) == True
+
+    folder_path = "Documents/sharepoint-test-folder1"
+
+    folder_summary = site.get_folder(folder_path)
+    print(json.dumps(folder_summary, indent=4))
+
+    # whole library, one driveItem delta query in pages of 999 files
+    file_count = 0
+    for file_summary in site.iter_files_in_folder("Documents"):
+        file_count += 1
+    print("files in library: {0}".format(file_count))
+
+if __name__ == '__main__':
+    test_files_in_folder_graph_success()
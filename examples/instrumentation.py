@@ -0,0 +1,38 @@
+from dotenv import load_dotenv
+import json
+import logging
+
+import vowelsharepoint
+from vowelsharepoint.office365sdk import *
+from vowelsharepoint.instrumentation import CallContextFilter, collect_metrics
+
+load_dotenv()
+site_url = os.getenv('SHAREPOINT_SITE_URL')
+tenant_id = os.getenv('SHAREPOINT_TENANT_ID')
+client_id = os.getenv('SHAREPOINT_CLIENT_ID')
+cert_thumbprint = os.getenv('SHAREPOINT_CERT_THUMBPRINT')
+cert_pem = os.getenv('SHAREPOINT_CERT_PEM')
+
+# log records carry the SharePointSite method in progress (sharepoint_call)
+handler = logging.StreamHandler()
+handler.addFilter(CallContextFilter())
+handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(sharepoint_call)s] %(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[handler])
+
+def test_folder_files_metrics(): 
+
+    # connection setup
+    site = vowelsharepoint.office365sdk.SharePointSite(site_url)
+    site.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem)
+    assert site.check_connection_valid(site_url) == True
+
+    folder_path = "Documents/sharepoint-test-folder1"
+
+    # requests, bytes, retries, throttles and latency per method and per REST endpoint
+    with collect_metrics() as metrics:
+        site.get_folder(folder_path)
+        site.get_files_in_folder(folder_path)
+    print(json.dumps(metrics.stats(), indent=4))
+
+if __name__ == '__main__':
+    test_folder_files_metrics()
@@ -0,0 +1,32 @@
+from dotenv import load_dotenv
+import json
+
+import vowelsharepoint
+from vowelsharepoint.office365sdk import *
+
+load_dotenv()
+site_url = os.getenv('SHAREPOINT_SITE_URL')
+tenant_id = os.getenv('SHAREPOINT_TENANT_ID')
+client_id = os.getenv('SHAREPOINT_CLIENT_ID')
+cert_thumbprint = os.getenv('SHAREPOINT_CERT_THUMBPRINT')
+cert_pem = os.getenv('SHAREPOINT_CERT_PEM')
+
+
+def test_flow_mirror_folder():  
+
+    # connection setup
+    site = vowelsharepoint.office365sdk.SharePointSite(site_url)
+    assert site.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem) == True
+    assert site.check_connection_valid(site_url) == True
+
+    # local mirror, kept across runs (Eg. a persistent Volume mount when running on K8s cluster)
+    local_root = "/Users/sushroff/Desktop/sharepoint_mirror"
+    os.makedirs(local_root, exist_ok=True)
+
+    # first run downloads every file, later runs only new and changed files,
+    # files deleted on SharePoint are removed locally, interrupted downloads resume
+    stats = site.mirror_folder("Documents/sharepoint-test-folder1", local_root, max_workers=8)
+    print(json.dumps(stats, indent=4))
+    
+if __name__ == '__main__':
+    test_flow_mirror_folder()
@@ -0,0 +1,38 @@
+from dotenv import load_dotenv
+import json
+import shutil
+
+from vowelsharepoint.office365sdk import *
+from vowelsharepoint.sitepool import SitePool
+
+load_dotenv()
+site_urls = os.getenv('SHAREPOINT_SITE_URLS', '').split(',')
+tenant_id = os.getenv('SHAREPOINT_TENANT_ID')
+client_id = os.getenv('SHAREPOINT_CLIENT_ID')
+cert_thumbprint = os.getenv('SHAREPOINT_CERT_THUMBPRINT')
+cert_pem = os.getenv('SHAREPOINT_CERT_PEM')
+
+
+def test_flow_site_pool():  
+
+    # one token and connection pool per tenant host, shared by every site
+    pool = SitePool(site_urls, max_workers=32, max_per_site=4)
+    assert pool.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem) == True
+
+    # files of every site, listed concurrently
+    files = 0
+    for site_url, file_summary in pool.iter_files("Documents"):
+        files += 1
+    print("files", files)
+
+    # tenant wide download, a slow or throttled site only holds max_per_site workers
+    download_path = "/Users/sushroff/Desktop/sharepoint_download_temp"
+    shutil.rmtree(download_path, ignore_errors=True)
+    os.mkdir(download_path) 
+    stats = pool.download_files("Documents", download_path)
+    print(json.dumps(stats, indent=4))
+    print(json.dumps(pool.get_stats(), indent=4))
+    pool.close()
+    
+if __name__ == '__main__':
+    test_flow_site_pool()
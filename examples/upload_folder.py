@@ -0,0 +1,37 @@
+from dotenv import load_dotenv
+import json
+
+import vowelsharepoint
+from vowelsharepoint.office365sdk import *
+
+load_dotenv()
+site_url = os.getenv('SHAREPOINT_SITE_URL')
+tenant_id = os.getenv('SHAREPOINT_TENANT_ID')
+client_id = os.getenv('SHAREPOINT_CLIENT_ID')
+cert_thumbprint = os.getenv('SHAREPOINT_CERT_THUMBPRINT')
+cert_pem = os.getenv('SHAREPOINT_CERT_PEM')
+
+
+def test_flow_upload_folder():  
+
+    # connection setup
+    site = vowelsharepoint.office365sdk.SharePointSite(site_url)
+    assert site.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem) == True
+    assert site.check_connection_valid(site_url) == True
+
+    # one file, large files are sent as an upload session of chunks
+    file_upload_summary, isOk = site.upload_file("/Users/sushroff/Desktop/summary.pdf",
+                                                 "Documents/sharepoint-test-folder1", chunk_size_bytes=20 * 1024 * 1024)
+    if isOk:
+        print(json.dumps(file_upload_summary, indent=4))
+
+    # a local directory tree, sub directories are created as needed
+    results, stats = site.upload_folder("/Users/sushroff/Desktop/processed", "Documents/sharepoint-test-folder1",
+                                        max_workers=8)
+    for file_upload_summary, isOk in results:
+        if not isOk:
+            print("Upload file errored")
+    print(json.dumps(stats, indent=4))
+    
+if __name__ == '__main__':
+    test_flow_upload_folder()
@@ -30,4 +30,8 @@ setuptools.setup(
         'urllib3==2.1.0',
         'python-dotenv~=1.0.0',
     ],
+    extras_require={
+        'async': ['aiohttp>=3.9'],
+        'columnar': ['pyarrow>=14'],
+    },
 )
@@ -0,0 +1,207 @@
+import argparse
+import json
+import multiprocessing
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+
+from office365.runtime.auth.token_response import TokenResponse
+
+from emulator import Graph_Path, Library_Path, Site_Path, SyntheticLibrary, start_server
+from vowelsharepoint.httpsession import PooledClientContext
+from vowelsharepoint.msgraphapi import Backend_Graph, Backend_Rest, new_site
+from vowelsharepoint.office365sdk import SharePointSite
+
+# benchmark suite against the local SharePoint REST emulator (emulator.py), no tenant needed.
+# Each scenario runs on a fresh SharePointSite, and reports the HTTP requests it sent (counted by
+# the emulator, which runs in its own process), wall time and peak (traced) client memory.
+#
+#   make benchmark
+#   PYTHONPATH=. python tests/benchmark.py --items 1000 100000 --latency-ms 20
+#   PYTHONPATH=. python tests/benchmark.py --items 1000000 --scenarios list_library folder_tree --json results.json
+#   PYTHONPATH=. python tests/benchmark.py --items 100000 --backends rest graph --scenarios list_library list_folder download
+
+Benchmark_Items = [1000, 10000]
+Benchmark_Lookups = 20
+Benchmark_Downloads = 50
+Benchmark_AccessChecks = 200
+Benchmark_User = "user-001@contoso.com"
+
+
+def list_library(site, items):
+    return sum(1 for _ in site.iter_files_in_folder("Documents"))
+
+
+def library_dicts(site, items):
+    return len(site.get_files_in_folder("Documents"))
+
+
+def library_table(site, items):
+    return len(site.get_file_table("Documents"))
+
+
+def list_folder(site, items):
+    return len(site.get_files_in_folder("Documents/folder-0000"))
+
+
+def folder_lookup(site, items):
+    library = SyntheticLibrary(items)
+    folder_urls = [library.find_item(item_id)["server_relative_url"]
+                   for item_id in range(items + 1, items + 1 + min(library.sub_folder_count, Benchmark_Lookups))]
+    return len([site.get_folder("Documents" + url[len(Library_Path):]) for url in folder_urls])
+
+
+def folder_tree(site, items):
+    return site.get_folder_tree("Documents")["files"]
+
+
+def download(site, items):
+    file_summaries = site.get_files_in_folder("Documents/folder-0000")[:Benchmark_Downloads]
+    with tempfile.TemporaryDirectory() as download_path:
+        results, stats = site.download_many(file_summaries, download_path)
+    return stats["files"] - stats["failed"]
+
+
+def access_check(site, items):
+    file_paths = _get_file_paths(min(items, Benchmark_Lookups))
+    return len([site.check_user_access_for_file(Benchmark_User, file_path, "OPEN_ITEMS") for file_path in file_paths])
+
+
+def access_check_batch(site, items):
+    file_paths = _get_file_paths(min(items, Benchmark_AccessChecks))
+    return len(site.check_user_access_for_files(Benchmark_User, file_paths, "OPEN_ITEMS"))
+
+
+def acl_index(site, items):
+    index = site.build_acl_index("Documents")
+    file_paths = _get_file_paths(min(items, Benchmark_AccessChecks))
+    return len([index.has_access(Benchmark_User, file_path) for file_path in file_paths])
+
+
+Scenarios = {
+    "list_library": list_library,
+    "library_dicts": library_dicts,
+    "library_table": library_table,
+    "list_folder": list_folder,
+    "folder_lookup": folder_lookup,
+    "folder_tree": folder_tree,
+    "download": download,
+    "access_check": access_check,
+    "access_check_batch": access_check_batch,
+    "acl_index": acl_index,
+}
+
+
+def run(items, scenarios, latency_secs=0, throttle_rate=0, trace_memory=True, backends=(Backend_Rest,)) -> list:
+    """
+    runs scenarios on each backend against an emulated library of items files
+
+    Returns: []dict {scenario, backend, items, result, requests, batch_parts, wall_secs, peak_mb, throttled}
+    """
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=_serve, args=(child, items, latency_secs, throttle_rate), daemon=True)
+    server.start()
+    base_url = parent.recv()
+
+    results = []
+    try:
+        for name, backend in [(name, backend) for name in scenarios for backend in backends]:
+            site = _connect(base_url, backend)
+            _emulator(base_url, "reset")
+            # the rate limiter of the site is process wide
+            throttled = site.get_rate_limit_stats()["throttled"]
+            if trace_memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            result = Scenarios[name](site, items)
+            wall_secs = time.perf_counter() - start
+            peak_bytes = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+            if trace_memory:
+                tracemalloc.stop()
+            # HTTP requests, $batch parts are counted apart
+            by_method = _emulator(base_url, "stats")["by_method"]
+            batch_parts = sum(count for method, count in by_method.items() if method.startswith("BATCH "))
+            requests = sum(by_method.values()) - batch_parts
+            results.append({
+                "scenario": name,
+                "backend": backend,
+                "items": items,
+                "result": result,
+                "requests": requests,
+                "batch_parts": batch_parts,
+                "wall_secs": round(wall_secs, 3),
+                "peak_mb": round(peak_bytes / 1024 / 1024, 1),
+                "throttled": site.get_rate_limit_stats()["throttled"] - throttled,
+            })
+            _print_result(results[-1])
+    finally:
+        server.terminate()
+        server.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SharePointSite benchmarks against the local SharePoint REST emulator")
+    parser.add_argument("--items", type=int, nargs="+", default=Benchmark_Items, help="library sizes (files)")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(Scenarios), default=list(Scenarios))
+    parser.add_argument("--backends", nargs="+", choices=[Backend_Rest, Backend_Graph], default=[Backend_Rest])
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay added to every emulator response")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="emulator answers 429 above requests per second")
+    parser.add_argument("--no-memory", action="store_true", help="skip peak memory tracing (faster)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    print("{0:<20} {1:<8} {2:>9} {3:>9} {4:>9} {5:>12} {6:>10} {7:>9} {8:>9}".format(
+        "scenario", "backend", "items", "result", "requests", "batch_parts", "wall_secs", "peak_mb", "throttled"))
+    results = []
+    for items in args.items:
+        results += run(items, args.scenarios, args.latency_ms / 1000.0, args.throttle_rate, not args.no_memory, args.backends)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+################################### Internal functions #################################
+
+def _serve(conn, items, latency_secs, throttle_rate):
+    mock = SyntheticLibrary(items)
+    mock.latency_secs = latency_secs
+    mock.throttle_rate = throttle_rate
+    server, base_url = start_server(mock)
+    conn.send(base_url)
+    # until terminated by the parent
+    conn.recv()
+
+
+def _connect(base_url, backend) -> SharePointSite:
+    site_url = base_url + Site_Path
+    site = new_site(site_url, backend)
+    site.ctx = PooledClientContext(site_url, site.session).with_access_token(
+        lambda: TokenResponse(access_token="token", token_type="Bearer")
+    )
+    if backend == Backend_Graph:
+        site.graph_url = base_url + Graph_Path
+        site.with_graph_access_token(lambda: TokenResponse(access_token="graph-token", token_type="Bearer"))
+    return site
+
+
+def _emulator(base_url, command) -> dict:
+    with urllib.request.urlopen("{0}/_emulator/{1}".format(base_url, command)) as response:
+        return json.loads(response.read())
+
+
+def _get_file_paths(count) -> list:
+    # first count files of the synthetic library (same layout for any size)
+    library = SyntheticLibrary(count)
+    return [library.file(idx)["server_relative_url"] for idx in range(count)]
+
+
+def _print_result(result):
+    print("{scenario:<20} {backend:<8} {items:>9} {result:>9} {requests:>9} {batch_parts:>12} {wall_secs:>10.3f} {peak_mb:>9.1f} {throttled:>9}"
+          .format(**result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import pytest
+
+from office365.runtime.auth.token_response import TokenResponse
+
+from emulator import (SharePointMock, Site_Path, Library_Title, Library_Path, Tag_Column_Title,  # noqa: F401
+                      Tag_Column_Internal, Login_Prefix, Graph_Path, start_server)
+from vowelsharepoint.httpsession import PooledClientContext
+from vowelsharepoint.msgraphapi import GraphSharePointSite
+from vowelsharepoint.office365sdk import SharePointSite
+
+
+@pytest.fixture
+def sharepoint_mock():
+    """starts a local SharePoint mock, yields (SharePointMock, base_url)"""
+
+    files = {}
+    for i in range(25):
+        files["folder1/file-{0:02d}.docx".format(i)] = 1000 + i
+    for i in range(5):
+        files["folder1/nested/file-{0:02d}.docx".format(i)] = 2000 + i
+    for i in range(7):
+        files["folder10/file-{0:02d}.docx".format(i)] = 3000 + i
+
+    mock = SharePointMock(files)
+    server, base_url = start_server(mock)
+    yield mock, base_url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def site(sharepoint_mock):
+    """SharePointSite connected to the local SharePoint mock"""
+
+    mock, base_url = sharepoint_mock
+    site_url = base_url + Site_Path
+    site = SharePointSite(site_url)
+    site.ctx = PooledClientContext(site_url, site.session).with_access_token(
+        lambda: TokenResponse(access_token="token", token_type="Bearer")
+    )
+    return site
+
+
+@pytest.fixture
+def graph_site(sharepoint_mock):
+    """GraphSharePointSite connected to the local SharePoint mock (REST and Graph)"""
+
+    mock, base_url = sharepoint_mock
+    site_url = base_url + Site_Path
+    site = GraphSharePointSite(site_url, base_url + Graph_Path)
+    site.ctx = PooledClientContext(site_url, site.session).with_access_token(
+        lambda: TokenResponse(access_token="token", token_type="Bearer")
+    )
+    return site.with_graph_access_token(lambda: TokenResponse(access_token="graph-token", token_type="Bearer"))
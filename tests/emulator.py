@@ -0,0 +1,934 @@
+import argparse
+import datetime
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlparse
+
+from office365.sharepoint.permissions.base_permissions import BasePermissions
+from office365.sharepoint.permissions.kind import PermissionKind
+
+# local emulator of the SharePoint REST (and Microsoft Graph drive) endpoints used by SharePointSite and
+# GraphSharePointSite, so tests and benchmarks (see benchmark.py) can count HTTP requests without a live tenant.
+# SharePointMock serves an explicit in-memory library, SyntheticLibrary a generated one of any size.
+# Run standalone: python tests/emulator.py --items 100000 --latency-ms 20
+
+Site_Path = "/sites/test-site-1"
+Library_Title = "Documents"
+Library_Path = Site_Path + "/Shared Documents"
+Tag_Column_Title = "custom-metadata"
+Tag_Column_Internal = "custom_x002d_metadata"
+Login_Prefix = "i:0#.f|membership|"
+
+# Microsoft Graph, the library is the only drive of the site
+Graph_Path = "/v1.0"
+Graph_SiteId = "site-id"
+Graph_DriveId = "drive-id"
+Graph_RootId = "root-item"
+
+# SyntheticLibrary layout
+Synthetic_FilesPerFolder = 100
+Synthetic_SubFolders = 10
+Synthetic_FileSizeBytes = 4096
+Synthetic_Users = 10
+Synthetic_Modified = datetime.datetime(2024, 1, 1)
+
+
+class SharePointMock:
+
+    """
+    in-memory document library served over a local HTTP server.
+    files: dict of folder-relative path (Eg. folder1/a.docx) -> size bytes
+    """
+
+    def __init__(self, files):
+        self.files = []
+        for idx, (path, size) in enumerate(sorted(files.items()), start=1):
+            self.files.append({
+                "id": idx,
+                "server_relative_url": Library_Path + "/" + path,
+                "size": size,
+                "modified": datetime.datetime(2024, 2, 1 + idx % 28, 10, 0),
+                "tag": "tag-{0}".format(idx),
+            })
+        # folder items, ids after the files
+        folder_paths = sorted({f["server_relative_url"].rsplit("/", 1)[0] for f in self.files} - {Library_Path})
+        self.folders = [{"id": 1000 + idx, "server_relative_url": path} for idx, path in enumerate(folder_paths)]
+        # site users, email -> id. alice can open every file under folder1, bob none
+        self.users = {"alice@contoso.com": 11, "bob@contoso.com": 12, "carol@contoso.com": 13}
+        self.grants = {("alice@contoso.com", f["server_relative_url"])
+                       for f in self.files if "/folder1/" in f["server_relative_url"]}
+        # role assignments, path (None for the library) -> principal ids with the Read role.
+        # owners group (carol) on the library, alice on folder1, bob on folder10/file-03 only
+        self.groups = {3: [13]}
+        self.everyone_id = 14
+        self.role_assignments = {
+            None: [3],
+            Library_Path + "/folder1": [11, 3],
+            Library_Path + "/folder10/file-03.docx": [12],
+        }
+        # change log, [](change number, item id, change type)
+        self.changes = []
+        # next requests answered 429 Too Many Requests with Retry-After retry_after
+        self.throttle = 0
+        self.retry_after = "0.1"
+        # optional, requests per second above which requests are answered 429 (0 = unlimited)
+        self.throttle_rate = 0
+        # optional, delay added to every response
+        self.latency_secs = 0
+        # upload sessions, upload id -> (server relative url, bytearray received)
+        self.uploads = {}
+        # next upload chunk requests (ContinueUpload / FinishUpload) answered 500, not stored
+        self.fail_chunks = 0
+        # next GetItems (listing) requests answered 500
+        self.fail_get_items = 0
+        # access tokens answered 401 Unauthorized (Eg. revoked before their expiry)
+        self.rejected_tokens = set()
+        self.requests = []
+        self.lock = threading.Lock()
+        self._allowance = 0.0
+        self._allowance_at = time.monotonic()
+
+    def record(self, method, path):
+        with self.lock:
+            self.requests.append((method, path))
+
+    def is_throttled(self):
+        """
+        Returns: True if the request is to be answered 429, per throttle (count) or throttle_rate
+        """
+        with self.lock:
+            if self.throttle > 0:
+                self.throttle -= 1
+                return True
+            if not self.throttle_rate:
+                return False
+            # token bucket of one second of requests
+            now = time.monotonic()
+            self._allowance = min(self._allowance + (now - self._allowance_at) * self.throttle_rate, self.throttle_rate)
+            self._allowance_at = now
+            if self._allowance < 1:
+                return True
+            self._allowance -= 1
+            return False
+
+    def file_json(self, f):
+        return {
+            "ServerRelativeUrl": f["server_relative_url"],
+            "Length": str(f["size"]),
+            "TimeLastModified": f["modified"].strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "Name": f["server_relative_url"].rsplit("/", 1)[1],
+            "ETag": '"{{{0:08d}-0000-0000-0000-000000000000}},{1}"'.format(f["id"], f.get("version", 1)),
+        }
+
+    def content(self, f):
+        if "data" in f:
+            return f["data"]
+        # byte i is (id + i) % 256
+        pattern = bytes((f["id"] + i) % 256 for i in range(256))
+        return (pattern * (f["size"] // 256 + 1))[:f["size"]]
+
+    def add_file(self, server_relative_url, data):
+        """
+        uploaded file, a new version of an existing file
+        """
+        modified = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None, microsecond=0)
+        f = self.find_file(server_relative_url)
+        if f is None:
+            f = {"id": max(item["id"] for item in self.files + self.folders) + 1,
+                 "server_relative_url": server_relative_url, "tag": ""}
+            self.files.append(f)
+        else:
+            f["version"] = f.get("version", 1) + 1
+        f.update(data=bytes(data), size=len(data), modified=modified)
+        return f
+
+    def add_folder(self, server_relative_url):
+        folder = self.find_folder(server_relative_url)
+        if folder is None:
+            folder = {"id": max(item["id"] for item in self.files + self.folders) + 1,
+                      "server_relative_url": server_relative_url}
+            self.folders.append(folder)
+        return folder
+
+    def find_file(self, server_relative_url):
+        for f in self.files:
+            if f["server_relative_url"] == server_relative_url:
+                return f
+        return None
+
+    def find_folder(self, server_relative_url):
+        for f in self.folders:
+            if f["server_relative_url"] == server_relative_url:
+                return f
+        return None
+
+    def find_user(self, email):
+        if email not in self.users:
+            return None
+        return self.user_json(email)
+
+    def site_groups_json(self):
+        return [{"Id": group_id, "Users": {"results": [{"Id": user_id} for user_id in members]}}
+                for group_id, members in self.groups.items()]
+
+    def user_json(self, email):
+        return {"Id": self.users[email], "LoginName": Login_Prefix + email, "Email": email, "Title": email}
+
+    def effective_permissions(self, login_name, f):
+        permissions = BasePermissions()
+        email = login_name[len(Login_Prefix):]
+        if (email, f["server_relative_url"]) in self.grants:
+            permissions.set(PermissionKind.ViewListItems)
+            permissions.set(PermissionKind.OpenItems)
+        return {"High": str(permissions.High), "Low": str(permissions.Low)}
+
+    def folder_json(self, folder_url):
+        files = [f for f in self.files if f["server_relative_url"].startswith(folder_url + "/")]
+        return {
+            "ServerRelativeUrl": folder_url,
+            "Name": folder_url.rsplit("/", 1)[1],
+            "TimeLastModified": max(f["modified"] for f in files).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "StorageMetrics": {
+                "TotalFileCount": len(files),
+                "TotalFileStreamSize": sum(f["size"] for f in files),
+                "TotalSize": sum(f["size"] for f in files) + 1024,
+            },
+        }
+
+    def children(self, folder_url):
+        """
+        Returns: folder and file items directly under folder_url
+        """
+        return [item for item in self.folders + self.files if item["server_relative_url"].rsplit("/", 1)[0] == folder_url]
+
+    def delta(self, position, top):
+        """
+        Returns: (items, next position, None after the last page) of the drive delta from position,
+                 the root (None) and folders (parents first) before files
+        """
+        items = [None] + self.folders + self.files
+        return items[position:position + top], (position + top if position + top < len(items) else None)
+
+    def root_json(self):
+        folder = self.folder_json(Library_Path)
+        return {
+            "id": Graph_RootId,
+            "name": "root",
+            "root": {},
+            "size": folder["StorageMetrics"]["TotalFileStreamSize"],
+            "lastModifiedDateTime": folder["TimeLastModified"],
+            "folder": {"childCount": len(self.children(Library_Path))},
+        }
+
+    def drive_item_json(self, f, fields=False, path=True):
+        """
+        Graph driveItem of a file or folder item. Delta items (path False) carry no parent path, as SharePoint's
+        """
+        url = f["server_relative_url"]
+        parent_url = url.rsplit("/", 1)[0]
+        parent = self.find_folder(parent_url)
+        item = {
+            "id": "item-{0}".format(f["id"]),
+            "name": url.rsplit("/", 1)[1],
+            "parentReference": {"driveId": Graph_DriveId, "id": "item-{0}".format(parent["id"]) if parent else Graph_RootId},
+            "sharepointIds": {"listItemId": str(f["id"])},
+        }
+        if path:
+            item["parentReference"]["path"] = "/drives/{0}/root:{1}".format(Graph_DriveId, parent_url[len(Library_Path):])
+        # folder items have no size
+        if "size" not in f:
+            folder = self.folder_json(url)
+            item["size"] = folder["StorageMetrics"]["TotalFileStreamSize"]
+            item["lastModifiedDateTime"] = folder["TimeLastModified"]
+            item["folder"] = {"childCount": len(self.children(url))}
+            return item
+        file = self.file_json(f)
+        item["size"] = f["size"]
+        item["lastModifiedDateTime"] = file["TimeLastModified"]
+        item["eTag"] = file["ETag"]
+        item["file"] = {"mimeType": "application/octet-stream"}
+        item["@microsoft.graph.downloadUrl"] = "{0}/_layouts/15/download.aspx?UniqueId={1}&tempauth=emulator".format(
+            self.site_url, item["id"])
+        if fields:
+            item["listItem"] = {"fields": {Tag_Column_Internal: f["tag"]}}
+        return item
+
+    def find_item(self, item_id):
+        for item in self.files + self.folders:
+            if item["id"] == item_id:
+                return item
+        return None
+
+    def item_json(self, f):
+        # folder items have no size
+        if "size" not in f:
+            return {
+                "Id": f["id"],
+                "ID": f["id"],
+                "FileSystemObjectType": 1,
+                "FileRef": f["server_relative_url"],
+                "HasUniqueRoleAssignments": f["server_relative_url"] in self.role_assignments,
+            }
+        return {
+            "Id": f["id"],
+            "ID": f["id"],
+            "FileSystemObjectType": 0,
+            "FileRef": f["server_relative_url"],
+            "HasUniqueRoleAssignments": f["server_relative_url"] in self.role_assignments,
+            Tag_Column_Internal: f["tag"],
+            "File": self.file_json(f),
+        }
+
+    def role_assignments_json(self, path):
+        read = BasePermissions()
+        read.set(PermissionKind.ViewListItems)
+        read.set(PermissionKind.OpenItems)
+        limited = BasePermissions()
+        limited.set(PermissionKind.ViewFormPages)
+        return [{
+            "PrincipalId": principal_id,
+            "Member": {"Id": principal_id},
+            "RoleDefinitionBindings": {"results": [
+                {"Name": "Limited Access", "BasePermissions": {"High": str(limited.High), "Low": str(limited.Low)}},
+                {"Name": "Read", "BasePermissions": {"High": str(read.High), "Low": str(read.Low)}},
+            ]},
+        } for principal_id in self.role_assignments[path]]
+
+    def site_users_json(self):
+        users = [self.user_json(email) for email in self.users]
+        users.append({"Id": self.everyone_id, "LoginName": "c:0-.f|rolemanager|spo-grid-all-users",
+                      "Email": "", "Title": "Everyone except external users"})
+        return users
+
+    def change_token(self, change_number=None):
+        if change_number is None:
+            change_number = len(self.changes)
+        return "1;3;list-id;638000000000000000;{0}".format(change_number)
+
+    def log_change(self, item, change_type):
+        self.changes.append((len(self.changes) + 1, item["id"], change_type))
+
+    def get_changes(self, body):
+        qry = body["query"]
+        start = int(qry["ChangeTokenStart"]["StringValue"].rsplit(";", 1)[1])
+        fetch_limit = int(qry.get("FetchLimit") or 1000)
+        return [{
+            "ChangeToken": {"StringValue": self.change_token(number)},
+            "ChangeType": change_type,
+            "ItemId": item_id,
+            "ListId": "list-id",
+            "WebId": "web-id",
+        } for number, item_id, change_type in self.changes if number > start][:fetch_limit]
+
+    def get_items(self, body):
+        qry = body["query"]
+        folder = qry.get("FolderServerRelativeUrl") or Library_Path
+        recursive_all = 'Scope="RecursiveAll"' in qry["ViewXml"]
+        row_limit = int(re.search(r"<RowLimit[^>]*>(\d+)</RowLimit>", qry["ViewXml"]).group(1))
+        last_id = 0
+        position = qry.get("ListItemCollectionPosition")
+        if position:
+            last_id = int(re.search(r"p_ID=(\d+)", position["PagingInfo"]).group(1))
+        modified_after = re.search(r'<Value Type="DateTime"[^>]*>([^<]+)</Value>', qry["ViewXml"])
+        matched = []
+        for f in sorted(self.files + (self.folders if recursive_all else []), key=lambda item: item["id"]):
+            # SharePoint urls are case insensitive
+            if not f["server_relative_url"].lower().startswith(folder.rstrip("/").lower() + "/"):
+                continue
+            if f["id"] <= last_id:
+                continue
+            if modified_after and f["modified"] <= datetime.datetime.strptime(modified_after.group(1), "%Y-%m-%dT%H:%M:%SZ"):
+                continue
+            matched.append(self.item_json(f))
+        return matched[:row_limit]
+
+
+class SyntheticLibrary(SharePointMock):
+
+    """
+    generated document library of any size (1k .. 1M+ files), items are computed from their id
+    on request rather than stored. Layout: folder-AAAA/sub-B/file-IIIIIII.docx, files_per_folder
+    files per sub folder and Synthetic_SubFolders sub folders per top level folder, so every
+    folder subtree is a contiguous range of item ids.
+    Site users user-KKK@contoso.com: user-000 (owners group) reads everything, any other user
+    reads the top level folders with index % users == K (unique role assignments per top level folder).
+    """
+
+    def __init__(self, items, files_per_folder=None, file_size_bytes=None, users=Synthetic_Users):
+        super(SyntheticLibrary, self).__init__({})
+        self.file_count = items
+        self.files_per_folder = files_per_folder or Synthetic_FilesPerFolder
+        self.file_size_bytes = file_size_bytes or Synthetic_FileSizeBytes
+        self.sub_folder_count = -(-items // self.files_per_folder)
+        self.top_folder_count = -(-self.sub_folder_count // Synthetic_SubFolders)
+
+        self.users = {"user-{0:03d}@contoso.com".format(k): 100 + k for k in range(users)}
+        self.groups = {3: [100]}
+        self.role_assignments = {None: [3]}
+        for a in range(self.top_folder_count):
+            self.role_assignments[self._top_folder_url(a)] = [100 + a % users]
+        self._folder_json = {}
+
+    def file(self, idx):
+        """
+        Returns: file item (dict as SharePointMock.files) of 0-based file index idx
+        """
+        f = idx // self.files_per_folder
+        return {
+            "id": idx + 1,
+            "server_relative_url": "{0}/sub-{1}/file-{2:07d}.docx".format(
+                self._top_folder_url(f // Synthetic_SubFolders), f % Synthetic_SubFolders, idx),
+            "size": self.file_size_bytes + idx % 97,
+            "modified": Synthetic_Modified + datetime.timedelta(minutes=idx),
+            "tag": "tag-{0}".format(idx % 10),
+        }
+
+    def find_file(self, server_relative_url):
+        parts = self._parse_url(server_relative_url)
+        if parts is None or len(parts) != 3:
+            return None
+        f = self.file(parts[2])
+        return f if f["server_relative_url"] == server_relative_url else None
+
+    def find_folder(self, server_relative_url):
+        parts = self._parse_url(server_relative_url)
+        if parts is None or len(parts) not in (1, 2):
+            return None
+        return self.find_item(self._folder_id(*parts))
+
+    def find_item(self, item_id):
+        if 1 <= item_id <= self.file_count:
+            return self.file(item_id - 1)
+        a, r = divmod(item_id - self.file_count - 1, Synthetic_SubFolders + 1)
+        if not 0 <= a < self.top_folder_count:
+            return None
+        if r == 0:
+            return {"id": item_id, "server_relative_url": self._top_folder_url(a)}
+        if a * Synthetic_SubFolders + r - 1 >= self.sub_folder_count:
+            return None
+        return {"id": item_id, "server_relative_url": "{0}/sub-{1}".format(self._top_folder_url(a), r - 1)}
+
+    def children(self, folder_url):
+        parts = self._parse_url(folder_url) if folder_url != Library_Path else ()
+        if parts is None or len(parts) > 2:
+            return []
+        if len(parts) == 2:
+            lo, hi, _, _ = self._get_subtree(parts)
+            return [self.file(idx) for idx in range(lo, hi)]
+        if not parts:
+            ids = [self._folder_id(a) for a in range(self.top_folder_count)]
+        else:
+            ids = [self._folder_id(parts[0], b) for b in range(Synthetic_SubFolders)]
+        return [item for item in map(self.find_item, ids) if item is not None]
+
+    def delta(self, position, top):
+        # position 0 is the root, then folder ids (parents first) and files
+        folder_ids = self._folder_id(self.top_folder_count) - self.file_count - 1
+        end = folder_ids + self.file_count + 1
+        items = []
+        while len(items) < top and position < end:
+            if position == 0:
+                items.append(None)
+            elif position <= folder_ids:
+                item = self.find_item(self.file_count + position)
+                if item is not None:
+                    items.append(item)
+            else:
+                items.append(self.file(position - folder_ids - 1))
+            position += 1
+        return items, (position if position < end else None)
+
+    def effective_permissions(self, login_name, f):
+        permissions = BasePermissions()
+        user_id = self.users.get(login_name[len(Login_Prefix):])
+        a = (f["id"] - 1) // self.files_per_folder // Synthetic_SubFolders
+        if user_id == 100 or (user_id is not None and a % len(self.users) == user_id - 100):
+            permissions.set(PermissionKind.ViewListItems)
+            permissions.set(PermissionKind.OpenItems)
+        return {"High": str(permissions.High), "Low": str(permissions.Low)}
+
+    def folder_json(self, folder_url):
+        folder = self._folder_json.get(folder_url)
+        if folder is None:
+            lo, hi, _, _ = self._get_subtree(self._parse_url(folder_url) if folder_url != Library_Path else ())
+            size = sum(self.file_size_bytes + idx % 97 for idx in range(lo, hi))
+            folder = self._folder_json[folder_url] = {
+                "ServerRelativeUrl": folder_url,
+                "Name": folder_url.rsplit("/", 1)[1],
+                "TimeLastModified": self.file(hi - 1)["modified"].strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "StorageMetrics": {"TotalFileCount": hi - lo, "TotalFileStreamSize": size, "TotalSize": size + 1024},
+            }
+        return folder
+
+    def get_items(self, body):
+        qry = body["query"]
+        folder = (qry.get("FolderServerRelativeUrl") or Library_Path).rstrip("/")
+        recursive_all = 'Scope="RecursiveAll"' in qry["ViewXml"]
+        row_limit = int(re.search(r"<RowLimit[^>]*>(\d+)</RowLimit>", qry["ViewXml"]).group(1))
+        last_id = 0
+        position = qry.get("ListItemCollectionPosition")
+        if position:
+            last_id = int(re.search(r"p_ID=(\d+)", position["PagingInfo"]).group(1))
+        modified_after = re.search(r'<Value Type="DateTime"[^>]*>([^<]+)</Value>', qry["ViewXml"])
+
+        parts = self._parse_url(folder) if folder != Library_Path else ()
+        if parts is None or len(parts) > 2:
+            return []
+        lo, hi, folder_lo, folder_hi = self._get_subtree(parts)
+        if modified_after:
+            # modified time grows with the file index
+            after = datetime.datetime.strptime(modified_after.group(1), "%Y-%m-%dT%H:%M:%SZ")
+            lo = max(lo, int((after - Synthetic_Modified).total_seconds() // 60) + 1)
+
+        matched = []
+        for idx in range(max(lo, last_id), hi):
+            if len(matched) == row_limit:
+                return matched
+            matched.append(self.item_json(self.file(idx)))
+        if recursive_all and not modified_after:
+            for item_id in range(max(folder_lo, last_id + 1), folder_hi):
+                if len(matched) == row_limit:
+                    break
+                item = self.find_item(item_id)
+                if item is not None:
+                    matched.append(self.item_json(item))
+        return matched
+
+    def _top_folder_url(self, a):
+        return "{0}/folder-{1:04d}".format(Library_Path, a)
+
+    def _folder_id(self, a, b=None):
+        top_id = self.file_count + 1 + a * (Synthetic_SubFolders + 1)
+        return top_id if b is None else top_id + 1 + b
+
+    def _parse_url(self, server_relative_url):
+        """
+        Returns: (a, [b, [file index]]) of folder-a/sub-b/file-idx, None if not a synthetic path
+        """
+        m = re.match(re.escape(Library_Path) + r"/folder-(\d{4})(?:/sub-(\d+)(?:/file-(\d{7})\.docx)?)?$",
+                     server_relative_url)
+        if m is None:
+            return None
+        return tuple(int(g) for g in m.groups() if g is not None)
+
+    def _get_subtree(self, parts):
+        """
+        Returns: (file index lo, hi, folder id lo, hi) ranges (hi excluded) of the subtree of folder parts
+        """
+        if not parts:
+            return 0, self.file_count, self.file_count + 1, self._folder_id(self.top_folder_count)
+        a = parts[0]
+        if len(parts) == 1:
+            first = a * Synthetic_SubFolders
+            return (min(first * self.files_per_folder, self.file_count),
+                    min((first + Synthetic_SubFolders) * self.files_per_folder, self.file_count),
+                    self._folder_id(a, 0), self._folder_id(a + 1))
+        f = a * Synthetic_SubFolders + parts[1]
+        return (min(f * self.files_per_folder, self.file_count), min((f + 1) * self.files_per_folder, self.file_count),
+                0, 0)
+
+
+def _json(status, payload):
+    return status, {"Content-Type": "application/json;odata=verbose"}, json.dumps(payload).encode()
+
+
+def _not_found(message):
+    return _json(404, {"error": {"message": {"value": message}}})
+
+
+def _content(content, range_header, if_range=None, etag=None):
+    byte_range = re.match(r"bytes=(\d+)-(\d*)", range_header or "")
+    # a range of another version is answered with the whole current content
+    if not byte_range or (if_range and if_range != etag):
+        return 200, {"Content-Type": "application/octet-stream"}, content
+    start, end = int(byte_range.group(1)), min(int(byte_range.group(2) or len(content) - 1), len(content) - 1)
+    return 206, {"Content-Type": "application/octet-stream",
+                 "Content-Range": "bytes {0}-{1}/{2}".format(start, end, len(content))}, content[start:end + 1]
+
+
+def dispatch(mock, method, raw_path, headers, body):
+    """
+    routes one REST request to the mock
+
+    Returns: (status, headers, body bytes)
+    """
+    url = urlparse(raw_path)
+    path = unquote(url.path)
+    query = {k: unquote(v) for k, v in (p.split("=", 1) for p in url.query.split("&") if "=" in p)}
+
+    if path.startswith("/_emulator/"):
+        return _control(mock, path)
+
+    mock.record(method, path)
+
+    # $batch parts are delayed and throttled with their batch
+    batch_part = method.startswith("BATCH ")
+    if mock.latency_secs and not batch_part:
+        time.sleep(mock.latency_secs)
+
+    if not batch_part and mock.is_throttled():
+        return 429, {"Content-Type": "application/json;odata=verbose", "Retry-After": mock.retry_after}, \
+            json.dumps({"error": {"message": {"value": "throttled"}}}).encode()
+
+    if not batch_part and (headers.get("Authorization") or "").partition(" ")[2] in mock.rejected_tokens:
+        return _json(401, {"error": {"message": {"value": "invalid token"}}})
+
+    if path.startswith(Graph_Path + "/"):
+        return _graph(mock, path, query)
+
+    if path.endswith("/_layouts/15/download.aspx"):
+        # pre-authenticated download url, a token is rejected
+        if headers.get("Authorization"):
+            return _json(401, {"error": {"code": "invalidRequest", "message": "unexpected Authorization header"}})
+        f = mock.find_item(int(query.get("UniqueId", "item-0")[len("item-"):]))
+        if f is None or "size" not in f:
+            return _not_found("file not found")
+        return _content(mock.content(f), headers.get("Range"))
+
+    if path.lower().endswith("/_api/contextinfo"):
+        return _json(200, {"d": {"GetContextWebInformation": {
+            "FormDigestValue": "digest", "FormDigestTimeoutSeconds": 1800}}})
+
+    if path.lower().endswith("/_api/$batch"):
+        return _batch(mock, headers, body)
+
+    if method == "POST":
+        upload = _upload(mock, path, body)
+        if upload is not None:
+            return upload
+
+    body = json.loads(body) if body else {}
+
+    lib = "/_api/web/lists/getbytitle('{0}')".format(Library_Title).lower()
+    if path.lower().endswith(lib + "/getitems"):
+        with mock.lock:
+            fail = mock.fail_get_items > 0
+            mock.fail_get_items -= int(fail)
+        if fail:
+            return _json(500, {"error": {"message": {"value": "listing failed"}}})
+        return _json(200, {"d": {"results": mock.get_items(body)}})
+
+    if path.lower().endswith(lib + "/fields"):
+        return _json(200, {"d": {"results": [
+            {"Title": "Title", "InternalName": "Title"},
+            {"Title": Tag_Column_Title, "InternalName": Tag_Column_Internal},
+        ]}})
+
+    if method == "POST" and path.lower().endswith(lib + "/getchanges"):
+        return _json(200, {"d": {"results": mock.get_changes(body)}})
+
+    if path.lower().endswith(lib):
+        return _json(200, {"d": {"Title": Library_Title, "CurrentChangeToken": {"StringValue": mock.change_token()}}})
+
+    if path.lower().endswith("/_api/web/lists"):
+        return _json(200, {"d": {"results": [{"Title": Library_Title, "RootFolder": {"ServerRelativeUrl": Library_Path}}]}})
+
+    if path.lower().endswith("/_api/web"):
+        return _json(200, {"d": {"Url": mock.site_url, "ServerRelativeUrl": Site_Path}})
+
+    if path.lower().endswith(lib + "/rootfolder"):
+        return _json(200, {"d": mock.folder_json(Library_Path)})
+
+    m = re.search(r"/GetFolderByServerRelativePath\(DecodedUrl='(.+)'\)$", path, re.IGNORECASE)
+    if m:
+        folder_url = m.group(1).replace("''", "'")
+        if mock.find_folder(folder_url) is None:
+            return _not_found("folder not found")
+        return _json(200, {"d": mock.folder_json(folder_url)})
+
+    if path.lower().endswith(lib + "/roleassignments"):
+        return _json(200, {"d": {"results": mock.role_assignments_json(None)}})
+
+    if path.lower().endswith("/_api/web/sitegroups"):
+        return _json(200, {"d": {"results": mock.site_groups_json()}})
+
+    if path.lower().endswith("/_api/web/siteusers"):
+        return _json(200, {"d": {"results": mock.site_users_json()}})
+
+    m = re.search(r"/items\((\d+)\)(/RoleAssignments)?$", path, re.IGNORECASE)
+    if m:
+        item = mock.find_item(int(m.group(1)))
+        if item is None:
+            return _not_found("item not found")
+        if m.group(2):
+            return _json(200, {"d": {"results": mock.role_assignments_json(item["server_relative_url"])}})
+        return _json(200, {"d": mock.item_json(item)})
+
+    m = re.search(r"/items\((\d+)\)/File(/ListItemAllFields)?$", path, re.IGNORECASE)
+    if m:
+        f = mock.find_item(int(m.group(1)))
+        if m.group(2):
+            return _json(200, {"d": {"Id": f["id"], Tag_Column_Internal: f["tag"]}})
+        return _json(200, {"d": mock.file_json(f)})
+
+    m = re.search(r"/siteUsers/GetByEmail\('(.+)'\)$", path, re.IGNORECASE)
+    if m:
+        user = mock.find_user(m.group(1))
+        if user is None:
+            return _not_found("user not found")
+        return _json(200, {"d": user})
+
+    m = re.search(r"/getFileByServerRelativePath\(DecodedUrl='(.+)'\)/listItemAllFields"
+                  r"/GetUserEffectivePermissions\((.+)\)$", path, re.IGNORECASE)
+    if m:
+        f = mock.find_file(m.group(1).replace("''", "'"))
+        if f is None:
+            return _not_found("file not found")
+        login_name = query.get("@user", "") if m.group(2) == "@user" else m.group(2)
+        login_name = login_name.strip("'").replace("''", "'")
+        return _json(200, {"d": {"GetUserEffectivePermissions": mock.effective_permissions(login_name, f)}})
+
+    m = re.search(r"/getFileByServerRelativePath\(DecodedUrl='(.+)'\)(/\$value)?$", path, re.IGNORECASE)
+    if m:
+        f = mock.find_file(m.group(1).replace("''", "'"))
+        if f is None:
+            return _not_found("file not found")
+        if m.group(2):
+            return _content(mock.content(f), headers.get("Range"), headers.get("If-Range"), mock.file_json(f)["ETag"])
+        return _json(200, {"d": dict(mock.file_json(f), ServerRelativePath={
+            "DecodedUrl": f["server_relative_url"]})})
+
+    return _not_found("not found:" + path)
+
+
+def _upload(mock, path, body):
+    """
+    file uploads: Files/AddUsingPath, upload sessions (StartUpload, ContinueUpload, FinishUpload, CancelUpload)
+    and Folders/AddUsingPath
+
+    Returns: (status, headers, body bytes), None if path is not an upload
+    """
+    m = re.search(r"/GetFolderByServerRelativePath\(DecodedUrl='(.+)'\)/Files/AddUsingPath\(DecodedUrl='(.+)',"
+                  r"\s*Overwrite=(true|false)\)$", path, re.IGNORECASE)
+    if m:
+        folder_url, name = m.group(1).replace("''", "'"), m.group(2).replace("''", "'")
+        if folder_url != Library_Path and mock.find_folder(folder_url) is None:
+            return _not_found("folder not found")
+        if m.group(3).lower() == "false" and mock.find_file(folder_url + "/" + name) is not None:
+            return _json(400, {"error": {"message": {"value": "file exists"}}})
+        return _json(200, {"d": mock.file_json(mock.add_file(folder_url + "/" + name, body))})
+
+    m = re.search(r"/Folders/AddUsingPath\(DecodedUrl='(.+)'\)$", path, re.IGNORECASE)
+    if m:
+        folder_url = m.group(1).replace("''", "'")
+        mock.add_folder(folder_url)
+        return _json(200, {"d": {"ServerRelativeUrl": folder_url}})
+
+    m = re.search(r"/GetFileByServerRelativePath\(DecodedUrl='(.+)'\)/(StartUpload|ContinueUpload|FinishUpload|CancelUpload)"
+                  r"\(uploadId=guid'([^']+)'(?:,\s*fileOffset=(\d+))?\)$", path, re.IGNORECASE)
+    if not m:
+        return None
+    server_relative_url, operation, upload_id = m.group(1).replace("''", "'"), m.group(2), m.group(3)
+    if mock.find_file(server_relative_url) is None:
+        return _not_found("file not found")
+    if operation == "StartUpload":
+        mock.uploads[upload_id] = (server_relative_url, bytearray(body))
+        return _json(200, {"d": {operation: str(len(body))}})
+    if upload_id not in mock.uploads:
+        return _json(400, {"error": {"message": {"value": "upload session not found"}}})
+    if operation == "CancelUpload":
+        del mock.uploads[upload_id]
+        return _json(200, {"d": {}})
+
+    with mock.lock:
+        fail = mock.fail_chunks > 0
+        mock.fail_chunks -= int(fail)
+    if fail:
+        return _json(500, {"error": {"message": {"value": "chunk failed"}}})
+    data = mock.uploads[upload_id][1]
+    if int(m.group(4)) != len(data):
+        return _json(400, {"error": {"message": {"value": "unexpected fileOffset"}}})
+    data.extend(body)
+    if operation == "ContinueUpload":
+        return _json(200, {"d": {operation: str(len(data))}})
+    del mock.uploads[upload_id]
+    return _json(200, {"d": mock.file_json(mock.add_file(server_relative_url, data))})
+
+
+def _graph_not_found():
+    return _json(404, {"error": {"code": "itemNotFound", "message": "The resource could not be found."}})
+
+
+def _graph_folder_url(mock, root_path, item_id):
+    # folder of a children request, by path (root:/path:) or by item id, None if not a folder
+    if item_id is not None:
+        if item_id == Graph_RootId:
+            return Library_Path
+        item = mock.find_item(int(item_id[len("item-"):])) if item_id.startswith("item-") else None
+        return item["server_relative_url"] if item is not None and "size" not in item else None
+    if not root_path:
+        return Library_Path
+    return Library_Path + root_path if mock.find_folder(Library_Path + root_path) is not None else None
+
+
+def _graph(mock, path, query):
+    """
+    Microsoft Graph site, drives and driveItem (item, children, delta) requests, paged by $top
+    """
+    base_url = mock.site_url[:-len(Site_Path)]
+    drive = "{0}/drives/{1}".format(Graph_Path, Graph_DriveId)
+    fields = "listItem" in query.get("$expand", "")
+
+    m = re.match(re.escape(Graph_Path) + r"/sites/[^/]+:(/.*?):?$", path)
+    if m:
+        if m.group(1).rstrip("/") != Site_Path:
+            return _graph_not_found()
+        return _json(200, {"id": Graph_SiteId, "webUrl": mock.site_url})
+
+    if path == "{0}/sites/{1}/drives".format(Graph_Path, Graph_SiteId):
+        return _json(200, {"value": [{"id": Graph_DriveId, "name": Library_Title, "webUrl": base_url + quote(Library_Path)}]})
+
+    if path == drive + "/root/delta":
+        top = int(query.get("$top") or 200)
+        items, position = mock.delta(int(query.get("token") or 0), top)
+        page = {"value": [mock.root_json() if f is None else mock.drive_item_json(f, path=False) for f in items]}
+        link = "{0}{1}/root/delta?$top={2}&token={3}".format(base_url, drive, top, position if position is not None else "latest")
+        page["@odata.nextLink" if position is not None else "@odata.deltaLink"] = link
+        return _json(200, page)
+
+    m = re.match(re.escape(drive) + r"/(?:root(?::(/.+?):)?|items/([^/]+))/children$", path)
+    if m:
+        folder_url = _graph_folder_url(mock, m.group(1), m.group(2))
+        if folder_url is None:
+            return _graph_not_found()
+        top = int(query.get("$top") or 200)
+        skip = int(query.get("$skiptoken") or 0)
+        children = mock.children(folder_url)
+        page = {"value": [mock.drive_item_json(f, fields) for f in children[skip:skip + top]]}
+        if skip + top < len(children):
+            next_query = dict(query, **{"$skiptoken": skip + top})
+            page["@odata.nextLink"] = base_url + quote(path) + "?" + "&".join(
+                "{0}={1}".format(name, quote(str(value), safe="(),=$")) for name, value in next_query.items())
+        return _json(200, page)
+
+    m = re.match(re.escape(drive) + r"/root(?::(/.+?):?)?$", path)
+    if m:
+        if not m.group(1):
+            return _json(200, mock.root_json())
+        url = Library_Path + m.group(1)
+        f = mock.find_file(url) or mock.find_folder(url)
+        if f is None:
+            return _graph_not_found()
+        return _json(200, mock.drive_item_json(f, fields))
+
+    return _graph_not_found()
+
+
+def _control(mock, path):
+    """
+    emulator endpoints for out of process clients (Eg. benchmark.py):
+    /_emulator/stats: {requests, by_method}, /_emulator/reset: clears the recorded requests
+    """
+    with mock.lock:
+        requests = list(mock.requests)
+        if path == "/_emulator/reset":
+            del mock.requests[:]
+    by_method = {}
+    for method, _ in requests:
+        by_method[method] = by_method.get(method, 0) + 1
+    return _json(200, {"requests": len(requests), "by_method": by_method})
+
+
+def _batch(mock, headers, body):
+    """
+    OData $batch: runs each GET part through dispatch(...), answers a multipart/mixed response
+    """
+    boundary = re.search(r"boundary=([^;]+)", headers.get("Content-Type", "")).group(1)
+    parts = []
+    for part in body.decode().split("--" + boundary)[1:]:
+        if part.startswith("--"):
+            break
+        request_line = re.search(r"^(GET|POST) (\S+) HTTP/1\.1", part, re.MULTILINE)
+        status, part_headers, part_body = dispatch(mock, "BATCH " + request_line.group(1),
+                                                   urlparse(request_line.group(2))._replace(scheme="", netloc="").geturl(),
+                                                   {}, b"")
+        parts.append(
+            "--batchresponse\r\nContent-Type: application/http\r\nContent-Transfer-Encoding: binary\r\n\r\n"
+            "HTTP/1.1 {0} {1}\r\n{2}\r\n\r\n{3}\r\n".format(
+                status, "OK" if status < 400 else "Error",
+                "\r\n".join("{0}: {1}".format(k, v) for k, v in part_headers.items()),
+                part_body.decode())
+        )
+    payload = ("".join(parts) + "--batchresponse--\r\n").encode()
+    return 200, {"Content-Type": "multipart/mixed; boundary=batchresponse"}, payload
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    # keep-alive, as SharePoint Online. Headers and body are written separately, no Nagle delay
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _route(self, method):
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        body = self.rfile.read(length) if length else b""
+
+        status, headers, payload = dispatch(self.server.mock, method, self.path, self.headers, body)
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+
+class _Server(ThreadingHTTPServer):
+
+    # concurrent clients (thread pools, asyncio) open many connections at once
+    request_queue_size = 128
+    daemon_threads = True
+
+
+
+def start_server(mock, host="127.0.0.1", port=0):
+    """
+    serves mock over HTTP on a daemon thread
+
+    Returns: (server, base_url), stop with server.shutdown(); server.server_close()
+    """
+    server = _Server((host, port), _Handler)
+    server.mock = mock
+    base_url = "http://{0}:{1}".format(host, server.server_address[1])
+    mock.site_url = base_url + Site_Path
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    return server, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="local SharePoint REST emulator serving a synthetic library")
+    parser.add_argument("--items", type=int, default=10000, help="files in the library")
+    parser.add_argument("--files-per-folder", type=int, default=Synthetic_FilesPerFolder)
+    parser.add_argument("--file-size", type=int, default=Synthetic_FileSizeBytes, help="bytes per file")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay added to every response")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="requests per second answered 429 above")
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args()
+
+    mock = SyntheticLibrary(args.items, args.files_per_folder, args.file_size)
+    mock.latency_secs = args.latency_ms / 1000.0
+    mock.throttle_rate = args.throttle_rate
+    server, base_url = start_server(mock, port=args.port)
+    print("serving {0} files at {1}".format(args.items, mock.site_url), flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
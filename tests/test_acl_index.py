@@ -0,0 +1,111 @@
+from office365.sharepoint.changes.type import ChangeType
+
+from conftest import Library_Path, Library_Title
+from vowelsharepoint.aclindex import AclIndex
+
+
+def _count(mock, method):
+    return len([m for m, path in mock.requests if m == method])
+
+
+def test_build_acl_index(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+
+    acl_index = site.build_acl_index(Library_Title)
+
+    assert acl_index.has_access("alice@contoso.com", Library_Path + "/folder1/file-00.docx")
+    assert acl_index.has_access("Alice@contoso.com", Library_Path + "/folder1/nested/file-04.docx")
+    assert not acl_index.has_access("alice@contoso.com", Library_Path + "/folder10/file-00.docx")
+    assert acl_index.has_access("bob@contoso.com", Library_Path + "/folder10/file-03.docx")
+    assert not acl_index.has_access("bob@contoso.com", Library_Path + "/folder10/file-02.docx")
+    # carol is a member of the owners group, granted on the library and folder1
+    assert acl_index.has_access("carol@contoso.com", Library_Path + "/folder10/file-02.docx")
+    assert acl_index.has_access("carol@contoso.com", Library_Path + "/folder1/file-00.docx")
+    assert not acl_index.has_access("dave@contoso.com", Library_Path + "/folder1/file-00.docx")
+    assert not acl_index.has_access("alice@contoso.com", Library_Path + "/folder1/missing.docx")
+    # urls are case insensitive, the folder1 scope applies
+    assert acl_index.has_access("alice@contoso.com", Library_Path.upper() + "/FOLDER1/File-00.docx")
+    assert not acl_index.has_access("alice@contoso.com", Library_Path.upper() + "/FOLDER10/File-00.docx")
+
+    # principals + unique scopes, one GetItems page for 37 files and 3 folders
+    assert _count(mock, "POST") == 4
+    assert len([path for method, path in mock.requests if path.endswith("/GetItems")]) == 1
+
+
+def test_refresh_acl_index(site, sharepoint_mock, tmp_path):
+    mock, _ = sharepoint_mock
+    acl_index = site.build_acl_index(Library_Title)
+
+    # bob is granted folder1/file-05, folder10/file-00 is deleted
+    granted = mock.find_file(Library_Path + "/folder1/file-05.docx")
+    mock.role_assignments[granted["server_relative_url"]] = [12]
+    mock.log_change(granted, ChangeType.AssignmentAdd)
+    deleted = mock.find_file(Library_Path + "/folder10/file-00.docx")
+    mock.files.remove(deleted)
+    mock.log_change(deleted, ChangeType.DeleteObject)
+    del mock.requests[:]
+
+    assert site.refresh_acl_index(acl_index)
+
+    assert acl_index.has_access("bob@contoso.com", Library_Path + "/folder1/file-05.docx")
+    assert not acl_index.has_access("alice@contoso.com", Library_Path + "/folder1/file-05.docx")
+    assert not acl_index.has_access("carol@contoso.com", Library_Path + "/folder10/file-00.docx")
+    assert acl_index.change_token == mock.change_token()
+    # changes + changed items + principals + unique scopes, no listing
+    assert len([path for method, path in mock.requests if path.endswith("/GetItems")]) == 0
+    assert _count(mock, "BATCH GET") == 1 + 4 + 1
+
+    file_name = str(tmp_path / "acl-index.json")
+    acl_index.save(file_name)
+    loaded = AclIndex.load(file_name)
+    assert loaded.stats()["items"] == acl_index.stats()["items"]
+    assert loaded.has_access("bob@contoso.com", Library_Path + "/folder1/file-05.docx")
+    assert not loaded.has_access("bob@contoso.com", Library_Path + "/folder1/file-06.docx")
+
+
+def test_build_acl_index_failure(site, sharepoint_mock, monkeypatch):
+    mock, _ = sharepoint_mock
+
+    # a failed listing page, no partial index
+    mock.fail_get_items = 1
+    assert site.build_acl_index(Library_Title) is None
+
+    # a failed unique scope request, the item is never left with the scope of its parent
+    execute_batch = site._execute_batch
+
+    def execute_batch_failing_scopes(urls):
+        if "/items(" in urls[0]:
+            return [(500, None) for _ in urls]
+        return execute_batch(urls)
+
+    monkeypatch.setattr(site, "_execute_batch", execute_batch_failing_scopes)
+    assert site.build_acl_index(Library_Title) is None
+
+
+def test_acl_index_interns_scopes():
+    acl_index = AclIndex()
+    acl_index.set_list_scope([1, 2])
+    for item_id in range(1, 5):
+        acl_index.set_item(item_id, "/lib/folder-{0}".format(item_id), [3, item_id % 2])
+
+    assert acl_index.unique_scopes["/lib/folder-1"] is acl_index.unique_scopes["/lib/folder-3"]
+    assert acl_index.unique_scopes["/lib/folder-2"] is not acl_index.unique_scopes["/lib/folder-1"]
+    acl_index.set_item(5, "/lib/folder-5", [2, 1])
+    assert acl_index.unique_scopes["/lib/folder-5"] is acl_index.list_scope
+
+
+def test_acl_index_paths_case_insensitive():
+    acl_index = AclIndex()
+    acl_index.set_principals({"alice@contoso.com": 1}, {}, [])
+    acl_index.set_list_scope([2])
+    acl_index.set_item(1, "/lib/Folder", [1])
+    acl_index.set_item(2, "/lib/Folder/a.docx")
+
+    assert acl_index.has_access("alice@contoso.com", "/LIB/folder/A.docx")
+    # a renamed folder (another case too) moves its items and scope, item urls keep their case
+    acl_index.set_item(1, "/lib/Renamed", [1])
+    assert acl_index.items[2] == "/lib/Renamed/a.docx"
+    assert acl_index.has_access("alice@contoso.com", "/lib/renamed/a.docx")
+    assert not acl_index.has_access("alice@contoso.com", "/lib/folder/a.docx")
+    acl_index.remove_item(1)
+    assert acl_index.items == {} and acl_index.paths == {} and acl_index.unique_scopes == {}
@@ -0,0 +1,200 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from conftest import Library_Path, Site_Path
+import vowelsharepoint.office365sdk as office365sdk
+from vowelsharepoint.httpsession import PooledClientContext
+from vowelsharepoint.instrumentation import add_listener, remove_listener
+from vowelsharepoint.tokenmanager import ManagedAuthenticationContext, TokenManager
+
+aiohttp = pytest.importorskip("aiohttp")
+
+from vowelsharepoint.asyncsite import AsyncSharePointSite
+
+
+@pytest.fixture
+def async_site(site):
+    """AsyncSharePointSite sharing the SDK context of the site fixture"""
+
+    async_site = AsyncSharePointSite(site.site_url)
+    async_site.ctx = site.ctx
+    return async_site
+
+
+def test_async_listing_matches_sync(site, async_site, sharepoint_mock, monkeypatch):
+    mock, _ = sharepoint_mock
+    monkeypatch.setattr(office365sdk, "ListItems_PageSize", 10)
+
+    async def run():
+        async with async_site:
+            assert await async_site.check_connection_valid(site.site_url)
+            return await async_site.get_files_in_folder("Documents/folder1", "custom-metadata")
+
+    files = asyncio.run(run())
+    assert files == site.get_files_in_folder("Documents/folder1", "custom-metadata")
+    assert len(files) == 30
+
+
+def test_async_folder_download_access(async_site, sharepoint_mock, tmp_path):
+    mock, _ = sharepoint_mock
+    files = [f["server_relative_url"] for f in mock.files]
+
+    async def run():
+        async with async_site:
+            folder, doc_lib, missing = await asyncio.gather(
+                async_site.get_folder("Documents/folder1/nested"),
+                async_site.get_folder("Documents"),
+                async_site.get_folder("Documents/missing"),
+            )
+            access = await asyncio.gather(*[
+                async_site.check_user_access_for_file("alice@contoso.com", file_path, "OPEN_ITEMS") for file_path in files
+            ])
+            downloaded = await async_site.download_file(files[0], None, str(tmp_path))
+            return folder, doc_lib, missing, access, downloaded
+
+    folder, doc_lib, missing, access, (file_download_summary, ok) = asyncio.run(run())
+
+    assert folder["server_relative_url"] == Library_Path + "/folder1/nested"
+    assert folder["size_bytes"] == sum(2000 + i for i in range(5))
+    assert doc_lib["server_relative_url"] == Library_Path
+    assert missing is None
+    assert access == ["/folder1/" in file_path for file_path in files]
+    assert ok
+    with open(file_download_summary["file_name"], "rb") as f:
+        assert f.read() == mock.content(mock.files[0])
+
+
+def test_async_download_ranges(async_site, sharepoint_mock, tmp_path, monkeypatch):
+    mock, _ = sharepoint_mock
+    monkeypatch.setattr(office365sdk, "Download_LargeFileSizeBytes", 512)
+    f = mock.files[0]
+
+    async def run():
+        async with async_site:
+            return await async_site.download_file(f["server_relative_url"], f["size"], str(tmp_path), chunk_size_bytes=100)
+
+    file_download_summary, ok = asyncio.run(run())
+
+    assert ok
+    with open(file_download_summary["file_name"], "rb") as local_file:
+        assert local_file.read() == mock.content(f)
+    assert len([path for method, path in mock.requests if path.endswith("/$value")]) == 10
+
+
+def test_async_request_errors_map_to_sync_results(async_site, sharepoint_mock, monkeypatch):
+    mock, _ = sharepoint_mock
+    file_path = mock.files[0]["server_relative_url"]
+
+    async def run(error):
+        async def failing_request(*args, **kwargs):
+            raise error
+        monkeypatch.setattr(async_site, "_request", failing_request)
+        return (await async_site.check_user_access_for_file("alice@contoso.com", file_path, "OPEN_ITEMS"),
+                await async_site.get_folder("Documents/folder1"),
+                await async_site.check_connection_valid(async_site.site.site_url))
+
+    for error in (aiohttp.ClientConnectionError("refused"), asyncio.TimeoutError()):
+        assert asyncio.run(run(error)) == (False, None, False)
+
+
+def test_async_connect_runs_off_the_event_loop(async_site, monkeypatch):
+    threads = []
+
+    def connect(*args):
+        threads.append(threading.get_ident())
+        return True
+
+    monkeypatch.setattr(async_site.site, "connect_with_client_certificate", connect)
+
+    async def run():
+        return await async_site.connect_with_client_certificate("tenant", "client", "thumbprint", "pem")
+
+    assert asyncio.run(run())
+    assert threads and threads[0] != threading.get_ident()
+
+
+def test_async_sdk_calls_run_one_at_a_time(async_site, monkeypatch):
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+    get_folderpath = async_site.site._get_folderpath_from_inputpath
+
+    def folderpath(input_path):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.02)
+        with lock:
+            running["now"] -= 1
+        return get_folderpath(input_path)
+
+    monkeypatch.setattr(async_site.site, "_get_folderpath_from_inputpath", folderpath)
+
+    async def run():
+        async with async_site:
+            return await asyncio.gather(*[async_site.get_folder("Documents/folder1") for _ in range(5)])
+
+    assert all(asyncio.run(run()))
+    assert running["max"] == 1
+
+
+def test_async_failed_download_keeps_previous_file(async_site, sharepoint_mock, tmp_path, monkeypatch):
+    mock, _ = sharepoint_mock
+    monkeypatch.setattr(office365sdk, "Download_LargeFileSizeBytes", 512)
+    f = mock.files[0]
+    local_file_name = str(tmp_path / os.path.basename(f["server_relative_url"]))
+    with open(local_file_name, "wb") as local_file:
+        local_file.write(b"previous")
+
+    async def failed_range(content_url, fd, start, end, file_size, semaphore):
+        return start != 500
+
+    async def run():
+        async with async_site:
+            # changed since listed, the size on the server wins
+            changed = await async_site.download_file(f["server_relative_url"], f["size"] + 1, str(tmp_path))
+            monkeypatch.setattr(async_site, "_download_range", failed_range)
+            failed = await async_site.download_file(f["server_relative_url"], f["size"], str(tmp_path),
+                                                    chunk_size_bytes=100)
+            return changed, failed
+
+    assert asyncio.run(run()) == (({}, False), ({}, False))
+    assert open(local_file_name, "rb").read() == b"previous"
+    assert os.listdir(str(tmp_path)) == [os.path.basename(local_file_name)]
+
+
+def test_async_requests_throttled_and_reauthenticated(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    tokens = iter(["expired", "fresh"])
+    token_manager = TokenManager(lambda force: {"access_token": next(tokens), "token_type": "Bearer", "expires_in": 3600})
+    async_site = AsyncSharePointSite(site.site_url)
+    async_site.ctx = PooledClientContext(site.site_url, site.session,
+                                         ManagedAuthenticationContext(site.site_url, token_manager))
+    mock.rejected_tokens.add("expired")
+    limiter_stats = site.session.rate_limiter.stats()
+    events = []
+
+    async def run():
+        async with async_site:
+            return await async_site.get_doc_lib("Documents")
+
+    add_listener(events.append)
+    try:
+        assert asyncio.run(run()) is not None
+        # the rejected token is replaced, then throttled requests wait for their Retry-After
+        mock.throttle = 2
+        start = time.monotonic()
+        assert asyncio.run(run()) is not None
+        assert time.monotonic() - start >= 0.2
+    finally:
+        remove_listener(events.append)
+
+    assert token_manager.stats()["refreshes"] == 2
+    requests = [e for e in events if e["type"] == "request"]
+    assert [e["status"] for e in requests if e["status"] in (401, 429)] == [401, 429, 429]
+    stats = site.session.rate_limiter.stats()
+    assert stats["requests"] - limiter_stats["requests"] == len(requests)
+    assert stats["throttled"] - limiter_stats["throttled"] == 2
@@ -0,0 +1,100 @@
+import datetime
+
+from office365.sharepoint.changes.type import ChangeType
+
+from conftest import Library_Path
+
+
+def test_catalog_serves_folder_listing(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    site.enable_catalog(":memory:")
+
+    # first use syncs the library (full crawl)
+    folder_files_summary = site.get_files_in_folder("Documents/folder1", "custom-metadata")
+    assert len(folder_files_summary) == 30
+    assert all(f["tag"].startswith("tag-") for f in folder_files_summary)
+    del mock.requests[:]
+
+    remote = sorted(site._iter_files("Documents", "Shared Documents/folder1", "custom-metadata"),
+                    key=lambda f: f["item_id"])
+    del mock.requests[:]
+    assert site.get_files_in_folder("Documents/folder1", "custom-metadata") == remote
+    # folder10 files were modified Feb 4 .. Feb 10
+    assert len(site.get_files_in_folder("Documents/folder10", None, datetime.datetime(2024, 2, 5, 0, 0))) == 6
+    assert len(site.get_files_in_folder("Documents/folder1/nested")) == 5
+    assert len(site.get_files_in_folder("Documents")) == 37
+
+    folder_summary = site.get_folder("Documents/folder1/nested")
+    assert folder_summary["server_relative_url"] == Library_Path + "/folder1/nested"
+    assert folder_summary["size_bytes"] == sum(2000 + i for i in range(5))
+    assert site.get_doc_lib("Documents")["server_relative_url"] == Library_Path
+    assert mock.requests == []
+
+
+def test_catalog_incremental_sync(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    catalog = site.enable_catalog(":memory:", max_staleness_secs=0)
+    assert site.sync_catalog("Documents")
+
+    modified = mock.find_file(Library_Path + "/folder1/file-03.docx")
+    modified["size"] = 5000
+    mock.log_change(modified, ChangeType.Update)
+    deleted = mock.find_file(Library_Path + "/folder10/file-01.docx")
+    mock.files.remove(deleted)
+    mock.log_change(deleted, ChangeType.DeleteObject)
+    del mock.requests[:]
+
+    folder_files_summary = site.get_files_in_folder("Documents/folder10")
+    assert len(folder_files_summary) == 6
+    assert [f["size_bytes"] for f in site.get_files_in_folder("Documents/folder1") if f["item_id"] == modified["id"]] == ["5000"]
+    assert len([path for method, path in mock.requests if path.endswith("/GetItems")]) == 0
+
+    # a deleted folder is not expanded by the change log, falls back to a full crawl
+    folder = [f for f in mock.folders if f["server_relative_url"].endswith("/nested")][0]
+    mock.files = [f for f in mock.files if "/nested/" not in f["server_relative_url"]]
+    mock.log_change(folder, ChangeType.DeleteObject)
+    del mock.requests[:]
+
+    assert len(site.get_files_in_folder("Documents/folder1")) == 25
+    assert len([path for method, path in mock.requests if path.endswith("/GetItems")]) == 1
+    assert catalog.get_sync_state("Documents")["change_token"] == mock.change_token()
+
+
+def test_catalog_sync_failure_keeps_files(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    catalog = site.enable_catalog(":memory:", max_staleness_secs=0)
+    assert site.sync_catalog("Documents")
+    sync_state = catalog.get_sync_state("Documents")
+
+    # expired change token (full crawl), the listing fails
+    catalog._conn.execute("UPDATE sync_state SET change_token = NULL")
+    mock.fail_get_items = 1
+    assert not site.sync_catalog("Documents")
+    assert len(catalog.get_files("Documents")) == 37
+    assert catalog.get_sync_state("Documents")["synced_at"] == sync_state["synced_at"]
+
+
+def test_catalog_folder_urls_are_case_insensitive(site, sharepoint_mock):
+    catalog = site.enable_catalog(":memory:")
+    assert site.sync_catalog("Documents")
+
+    assert len(catalog.get_files("Documents", Library_Path.upper() + "/FOLDER1")) == 30
+    assert len(catalog.get_files("Documents", Library_Path + "/Folder1/Nested")) == 5
+    assert catalog.get_folder_summary("Documents", Library_Path.lower() + "/folder10")["files"] == 7
+    # the subtree is an index range
+    where, params = catalog._get_where("Documents", Library_Path)
+    plan = catalog._conn.execute("EXPLAIN QUERY PLAN SELECT * FROM files WHERE " + where, params).fetchall()
+    assert "files_server_relative_url_nocase" in str(plan)
+
+
+def test_catalog_summaries_match_sharepoint(site, sharepoint_mock):
+    input_paths = ["Documents", "Documents/folder1", "Documents/folder1/nested"]
+    uncached = [site.get_folder(input_path) for input_path in input_paths]
+
+    mock, _ = sharepoint_mock
+    site.enable_catalog(":memory:")
+    assert site.sync_catalog("Documents")
+    del mock.requests[:]
+
+    assert [site.get_folder(input_path) for input_path in input_paths] == uncached
+    assert mock.requests == []
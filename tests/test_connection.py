@@ -0,0 +1,92 @@
+import time
+
+from office365.runtime.auth.token_response import TokenResponse
+
+from conftest import Site_Path
+
+from vowelsharepoint.httpsession import PooledClientContext, get_session
+from vowelsharepoint.office365sdk import SharePointSite
+
+
+def _count(mock, suffix):
+    return len([path for method, path in mock.requests if path.lower().endswith(suffix.lower())])
+
+
+def test_check_connection_valid_cached(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+
+    assert site.check_connection_valid(site.site_url)
+    assert site.check_connection_valid(site.site_url.upper())
+    assert site.check_connection_valid(site.site_url)
+    assert _count(mock, "/_api/Web") == 1
+
+    assert not site.check_connection_valid(site.site_url + "-other")
+    assert _count(mock, "/_api/Web") == 2
+    # cached per site url, the failed check of another url leaves it valid
+    assert site.check_connection_valid(site.site_url)
+    assert _count(mock, "/_api/Web") == 2
+
+
+def test_check_connection_valid_token_expiry(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    # token about to expire, validity is not cached
+    site.ctx.authentication_context._cached_token = TokenResponse.from_json(
+        {"access_token": "token", "token_type": "Bearer", "expires_in": 30}
+    )
+
+    assert site.check_connection_valid(site.site_url)
+    assert site.check_connection_valid(site.site_url)
+    assert _count(mock, "/_api/Web") == 2
+
+
+def test_pooled_session_shared(sharepoint_mock, monkeypatch):
+    mock, base_url = sharepoint_mock
+    site_url = base_url + "/sites/test-site-1"
+
+    session = get_session("tenant", site_url)
+    assert get_session("tenant", site_url + "/") is session
+    assert get_session("other-tenant", site_url) is not session
+
+    sent = []
+    request = session.request
+    monkeypatch.setattr(session, "request", lambda method, url, **kwargs: sent.append(url) or request(method, url, **kwargs))
+
+    for _ in range(2):
+        site = SharePointSite(site_url)
+        site.ctx = PooledClientContext(site_url, session).with_access_token(
+            lambda: TokenResponse(access_token="token", token_type="Bearer")
+        )
+        site.session = session
+        assert len(site.get_files_in_folder("Documents/folder10")) == 7
+
+    # SDK queries and form digest requests all go through the shared session,
+    # the library root folder mapping is resolved once for both sites
+    assert len(sent) == len(mock.requests) == 5
+    assert len([path for method, path in mock.requests if path.endswith("/_api/Web/lists")]) == 1
+
+
+def test_check_connection_valid_shared_by_site_objects(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+
+    # short-lived site objects sharing the pooled session
+    for _ in range(3):
+        other = SharePointSite(site.site_url)
+        other.ctx = PooledClientContext(site.site_url, other.session).with_access_token(
+            lambda: TokenResponse(access_token="token", token_type="Bearer")
+        )
+        assert other.check_connection_valid(site.site_url)
+    assert _count(mock, "/_api/Web") == 1
+
+
+def test_check_connection_invalid_fails_fast(sharepoint_mock):
+    mock, base_url = sharepoint_mock
+    # nothing listens on port 9
+    site_url = "http://127.0.0.1:9" + Site_Path
+    site = SharePointSite(site_url)
+    site.ctx = PooledClientContext(site_url, site.session).with_access_token(
+        lambda: TokenResponse(access_token="token", token_type="Bearer")
+    )
+
+    start = time.monotonic()
+    assert not site.check_connection_valid(site_url)
+    assert time.monotonic() - start < 2
@@ -0,0 +1,126 @@
+import os
+import stat
+import threading
+
+from vowelsharepoint.downloadcache import DownloadCache
+
+from conftest import Library_Path
+
+
+def _content_requests(mock):
+    return len([p for m, p in mock.requests if p.endswith("/$value")])
+
+
+def test_download_many_served_from_cache(site, sharepoint_mock, tmp_path):
+    mock, _ = sharepoint_mock
+    cache = site.enable_download_cache(str(tmp_path / "cache"))
+    file_summaries = site.get_files_in_folder("Documents/folder1")
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+
+    results, stats = site.download_many(file_summaries, str(tmp_path / "a"))
+    assert stats["failed"] == 0
+    assert _content_requests(mock) == 30
+
+    # another service, same node: local disk reads, hardlinks to the read-only cache content
+    del mock.requests[:]
+    results, stats = site.download_many(file_summaries, str(tmp_path / "b"))
+    assert stats["failed"] == 0
+    assert _content_requests(mock) == 0
+
+    f = mock.find_file(Library_Path + "/folder1/file-04.docx")
+    local_file_name = str(tmp_path / "b" / "Shared Documents" / "folder1" / "file-04.docx")
+    assert open(local_file_name, "rb").read() == mock.content(f)
+    assert os.stat(local_file_name).st_nlink == 3
+    assert not os.stat(local_file_name).st_mode & stat.S_IWUSR
+
+    cache_stats = site.get_download_cache_stats()
+    assert cache_stats["entries"] == 30 and cache_stats["hits"] == 30 and cache_stats["misses"] == 30
+    assert cache_stats["bytes"] == sum(int(s["size_bytes"]) for s in file_summaries)
+    assert cache is site.download_cache
+
+
+def test_download_file_new_version(site, sharepoint_mock, tmp_path):
+    mock, _ = sharepoint_mock
+    site.enable_download_cache(str(tmp_path / "cache"))
+    f = mock.find_file(Library_Path + "/folder10/file-01.docx")
+    file_summary = [s for s in site.iter_files_in_folder("Documents/folder10")
+                    if s["server_relative_url"] == f["server_relative_url"]][0]
+
+    summary, ok = site.download_file(f["server_relative_url"], file_summary["size_bytes"], str(tmp_path),
+                                     etag=file_summary["etag"])
+    assert ok
+    summary, ok = site.download_file(f["server_relative_url"], file_summary["size_bytes"], str(tmp_path),
+                                     etag=file_summary["etag"])
+    assert ok and _content_requests(mock) == 1
+
+    # a new version replaces the cached one
+    f["version"], f["size"] = 2, f["size"] + 100
+    summary, ok = site.download_file(f["server_relative_url"], str(f["size"]), str(tmp_path), etag='"{v2},2"')
+    assert ok and _content_requests(mock) == 2
+    assert open(summary["file_name"], "rb").read() == mock.content(f)
+    assert site.get_download_cache_stats()["objects"] == 1
+
+    # without etag, not cached
+    summary, ok = site.download_file(f["server_relative_url"], str(f["size"]), str(tmp_path))
+    assert ok and _content_requests(mock) == 3
+
+
+def test_get_cached_file(site, sharepoint_mock, tmp_path):
+    mock, _ = sharepoint_mock
+    file_summary = site.get_files_in_folder("Documents/folder10")[0]
+    assert site.get_cached_file(file_summary) is None
+
+    site.enable_download_cache(str(tmp_path / "cache"))
+    path = site.get_cached_file(file_summary)
+
+    assert open(path, "rb").read() == mock.content(mock.find_file(file_summary["server_relative_url"]))
+    assert site.get_cached_file(file_summary) == path
+    assert _content_requests(mock) == 1
+    # wrong size, not cached
+    assert site.get_cached_file(dict(file_summary, etag="other", size_bytes="1")) is None
+
+
+def test_lru_eviction(tmp_path):
+    cache = DownloadCache(str(tmp_path), max_bytes=3000)
+    site_url = "https://contoso.sharepoint.com/sites/a"
+    paths = [cache.add(site_url, "/sites/a/f{0}".format(i), "e", [bytes([i]) * 1000], 1000) for i in range(3)]
+
+    # f0 used since f1, f1 is evicted first
+    assert cache.get(site_url, "/sites/a/f0", "e") == paths[0]
+    cache.add(site_url, "/sites/a/f3", "e", [b"3" * 1000], 1000)
+
+    assert cache.get(site_url, "/sites/a/f1", "e") is None
+    assert not os.path.exists(paths[1])
+    assert cache.get(site_url, "/sites/a/f0", "e") == paths[0]
+    assert cache.stats()["bytes"] == 3000 and cache.stats()["evictions"] == 1
+
+    # same content, one object
+    cache.add(site_url, "/sites/a/copy-of-f0", "e", [bytes([0]) * 1000], 1000)
+    assert cache.stats()["objects"] == 3 and cache.stats()["entries"] == 4
+
+    # larger than the cache, not stored and nothing evicted for it
+    assert cache.add(site_url, "/sites/a/big", "e", [b"b" * 3001], 3001) is None
+    assert cache.add(site_url, "/sites/a/big", "e", [b"b" * 3001]) is None
+    assert cache.get(site_url, "/sites/a/big", "e") is None
+    assert cache.stats()["objects"] == 3 and cache.stats()["evictions"] == 1
+    assert os.listdir(str(tmp_path / "tmp")) == []
+
+
+def test_shared_cache_dir(tmp_path):
+    # two caches on the same directory, as two processes of a node
+    caches = [DownloadCache(str(tmp_path)), DownloadCache(str(tmp_path))]
+    site_url = "https://contoso.sharepoint.com/sites/a"
+
+    def add(cache, offset):
+        for i in range(20):
+            cache.add(site_url, "/sites/a/f{0}".format((i + offset) % 20), "e", [str(i % 20).encode() * 100])
+    threads = [threading.Thread(target=add, args=(cache, idx * 10)) for idx, cache in enumerate(caches)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert caches[1].stats()["entries"] == 20
+    assert all(caches[0].get(site_url, "/sites/a/f{0}".format(i), "e") for i in range(20))
+    assert os.listdir(str(tmp_path / "tmp")) == []
@@ -0,0 +1,76 @@
+import vowelsharepoint.office365sdk as office365sdk
+
+from conftest import Library_Path
+
+
+def _download(site, sharepoint_mock, tmp_path, path, **kwargs):
+    mock, _ = sharepoint_mock
+    f = mock.find_file(Library_Path + path)
+    summary, ok = site.download_file(f["server_relative_url"], str(f["size"]), str(tmp_path), **kwargs)
+    return mock, f, summary, ok
+
+
+def test_download_file_small(site, sharepoint_mock, tmp_path):
+    mock, f, summary, ok = _download(site, sharepoint_mock, tmp_path, "/folder1/file-03.docx")
+
+    assert ok
+    assert summary["file_size_bytes"] == f["size"]
+    assert open(summary["file_name"], "rb").read() == mock.content(f)
+
+
+def test_download_file_ranges(site, sharepoint_mock, tmp_path, monkeypatch):
+    monkeypatch.setattr(office365sdk, "Download_LargeFileSizeBytes", 1)
+
+    mock, f, summary, ok = _download(site, sharepoint_mock, tmp_path, "/folder10/file-02.docx",
+                                     chunk_size_bytes=256, max_workers=3)
+
+    assert ok
+    assert open(summary["file_name"], "rb").read() == mock.content(f)
+    # 3002 bytes in 256 byte ranges
+    assert len([p for m, p in mock.requests if p.endswith("/$value")]) == 12
+
+
+def test_download_file_size_mismatch(site, sharepoint_mock, tmp_path):
+    mock, _ = sharepoint_mock
+    f = mock.find_file(Library_Path + "/folder1/file-01.docx")
+
+    summary, ok = site.download_file(f["server_relative_url"], str(f["size"] + 1), str(tmp_path))
+
+    assert not ok
+    assert summary == {}
+    # no partial local file
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_download_many_keeps_folder_structure(site, sharepoint_mock, tmp_path):
+    mock, _ = sharepoint_mock
+    file_summaries = site.get_files_in_folder("Documents")
+    file_summaries.append(dict(file_summaries[0], server_relative_url=Library_Path + "/missing.docx"))
+
+    results, stats = site.download_many(file_summaries, str(tmp_path), max_workers=4)
+
+    assert len(results) == 38
+    assert stats["files"] == 38
+    assert stats["failed"] == 1
+    assert stats["bytes"] == sum(f["size"] for f in mock.files)
+    assert results[-1] == ({}, False)
+    # same file name in folder1 and folder10 is not overwritten
+    assert (tmp_path / "Shared Documents" / "folder1" / "file-00.docx").stat().st_size == 1000
+    assert (tmp_path / "Shared Documents" / "folder10" / "file-00.docx").stat().st_size == 3000
+
+
+def test_download_file_stale_size(site, sharepoint_mock, tmp_path, monkeypatch):
+    monkeypatch.setattr(office365sdk, "Download_LargeFileSizeBytes", 1)
+    mock, _ = sharepoint_mock
+    f = mock.find_file(Library_Path + "/folder10/file-00.docx")
+
+    # listed as 2000 bytes, 3000 bytes on the server: not truncated to the listed size
+    summary, ok = site.download_file(f["server_relative_url"], "2000", str(tmp_path), chunk_size_bytes=256)
+    assert not ok and summary == {}
+    assert list(tmp_path.iterdir()) == []
+
+    # same for a download_many(...) summary, the ranges are checked against the size on the server
+    file_summary = dict(site.get_files_in_folder("Documents/folder10")[0], size_bytes=2000)
+    results, stats = site.download_many([file_summary], str(tmp_path), chunk_size_bytes=256)
+    assert results == [({}, False)] and stats["failed"] == 1
+    assert not (tmp_path / "Shared Documents" / "folder10" / "file-00.docx").exists()
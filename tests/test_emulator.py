@@ -0,0 +1,37 @@
+from office365.runtime.auth.token_response import TokenResponse
+
+from emulator import Library_Path, Site_Path, SyntheticLibrary, start_server
+from vowelsharepoint.httpsession import PooledClientContext
+from vowelsharepoint.office365sdk import SharePointSite
+
+
+def test_synthetic_library():
+    library = SyntheticLibrary(987, files_per_folder=20)
+    server, base_url = start_server(library)
+    try:
+        site = SharePointSite(base_url + Site_Path)
+        site.ctx = PooledClientContext(site.site_url, site.session).with_access_token(
+            lambda: TokenResponse(access_token="token", token_type="Bearer")
+        )
+
+        files = list(site.iter_files_in_folder("Documents", page_size=500))
+        assert [f["item_id"] for f in files] == list(range(1, 988))
+
+        # 50 sub folders of 20 files (the last one 7), 10 per top level folder
+        tree = site.get_folder_tree("Documents")
+        assert tree["files"] == 987
+        assert len(tree["folders"]) == 5
+        assert [sub["files"] for sub in tree["folders"][4]["folders"]] == [20] * 9 + [7]
+
+        folder = site.get_folder("Documents/folder-0004/sub-9")
+        assert folder["size_bytes"] == sum(library.file(idx)["size"] for idx in range(980, 987))
+        assert site.get_folder("Documents/folder-0005/sub-0") is None
+        assert len(site.get_files_in_folder("Documents/folder-0001/sub-3")) == 20
+
+        # user-001 reads top level folders 1, 11, ...
+        assert site.check_user_access_for_file("user-001@contoso.com", library.file(250)["server_relative_url"], "OPEN_ITEMS")
+        assert not site.check_user_access_for_file("user-001@contoso.com", library.file(0)["server_relative_url"], "OPEN_ITEMS")
+        assert site.build_acl_index("Documents").has_access("user-001@contoso.com", Library_Path + "/folder-0001/sub-2/file-0000250.docx")
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,91 @@
+from office365.sharepoint.changes.type import ChangeType
+
+from conftest import Library_Path
+
+
+def _count(mock, suffix):
+    return len([path for method, path in mock.requests if path.lower().endswith(suffix.lower())])
+
+
+def test_get_file_changes(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    change_token = site.get_change_token("Documents/folder1")
+    assert change_token == mock.change_token()
+
+    no_changes = site.get_file_changes("Documents/folder1", change_token)
+    assert no_changes["change_token"] == change_token
+    assert no_changes["added"] == no_changes["modified"] == no_changes["renamed"] == no_changes["deleted"] == []
+
+    modified = mock.find_file(Library_Path + "/folder1/file-03.docx")
+    mock.log_change(modified, ChangeType.Update)
+    mock.log_change(modified, ChangeType.Update)
+    outside = mock.find_file(Library_Path + "/folder10/file-01.docx")
+    mock.log_change(outside, ChangeType.Update)
+    deleted = mock.find_file(Library_Path + "/folder1/file-04.docx")
+    mock.files.remove(deleted)
+    mock.log_change(deleted, ChangeType.DeleteObject)
+    # folder1/nested renamed to folder1/renamed
+    nested = [f for f in mock.folders if f["server_relative_url"].endswith("/nested")][0]
+    for item in mock.files + [nested]:
+        item["server_relative_url"] = item["server_relative_url"].replace("/folder1/nested", "/folder1/renamed")
+    mock.log_change(nested, ChangeType.Rename)
+    del mock.requests[:]
+
+    file_changes = site.get_file_changes("Documents/folder1", change_token, "custom-metadata")
+
+    assert file_changes["change_token"] == mock.change_token()
+    assert [f["server_relative_url"] for f in file_changes["modified"]] == [modified["server_relative_url"]]
+    assert file_changes["modified"][0]["item_id"] == modified["id"]
+    assert file_changes["modified"][0]["tag"] == modified["tag"]
+    assert file_changes["deleted"] == [{"item_id": deleted["id"]}]
+    assert len(file_changes["renamed"]) == 5
+    assert all("/folder1/renamed/" in f["server_relative_url"] for f in file_changes["renamed"])
+    assert file_changes["added"] == []
+
+    # fields + changes + one $batch of the 3 changed items (not deleted) + files under the renamed folder
+    assert _count(mock, "/getchanges") == 1
+    assert _count(mock, "/$batch") == 1
+    assert _count(mock, "/GetItems") == 1
+    assert len(mock.requests) == 1 + 1 + 1 + 3 + 1
+
+
+def test_get_file_changes_missing_token(site, sharepoint_mock):
+    assert site.get_file_changes("Documents/folder1", None) is None
+
+
+def test_get_file_changes_moved_out_of_folder(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    change_token = site.get_change_token("Documents/folder1")
+
+    # folder1/file-03 moved to folder10, folder1/nested moved to folder10/nested
+    moved = mock.find_file(Library_Path + "/folder1/file-03.docx")
+    moved["server_relative_url"] = Library_Path + "/folder10/file-03-moved.docx"
+    mock.log_change(moved, ChangeType.Rename)
+    nested = [f for f in mock.folders if f["server_relative_url"].endswith("/folder1/nested")][0]
+    nested_files = [f for f in mock.files if "/folder1/nested/" in f["server_relative_url"]]
+    for item in nested_files + [nested]:
+        item["server_relative_url"] = item["server_relative_url"].replace("/folder1/nested", "/folder10/nested")
+    mock.log_change(nested, ChangeType.Rename)
+
+    file_changes = site.get_file_changes("Documents/folder1", change_token)
+
+    assert sorted(f["item_id"] for f in file_changes["deleted"]) == sorted(
+        [moved["id"], nested["id"]] + [f["id"] for f in nested_files])
+    assert file_changes["renamed"] == []
+
+    # the files of the folder moved into folder10, not a short list if the listing fails
+    mock.fail_get_items = 1
+    assert site.get_file_changes("Documents/folder10", change_token) is None
+    assert len(site.get_file_changes("Documents/folder10", change_token)["renamed"]) == 6
+
+
+def test_get_file_changes_folder_case(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    change_token = site.get_change_token("Documents/folder1")
+    modified = mock.find_file(Library_Path + "/folder1/file-03.docx")
+    mock.log_change(modified, ChangeType.Update)
+
+    # urls are case insensitive
+    file_changes = site.get_file_changes("Documents/FOLDER1", change_token)
+    assert [f["server_relative_url"] for f in file_changes["modified"]] == [modified["server_relative_url"]]
+    assert file_changes["deleted"] == []
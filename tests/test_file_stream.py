@@ -0,0 +1,101 @@
+import io
+
+import pytest
+
+from vowelsharepoint.filestream import FileStream
+
+from conftest import Library_Path
+
+
+def _content_requests(mock):
+    return len([p for m, p in mock.requests if p.endswith("/$value") or p.endswith("/download.aspx")])
+
+
+def test_open_file_stream_reads_sequentially(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    f = mock.find_file(Library_Path + "/folder10/file-03.docx")
+    content = mock.content(f)
+
+    with site.open_file_stream(f["server_relative_url"], buffer_size=512) as fp:
+        head = fp.read(10)
+        buffer = bytearray(1000)
+        assert fp.readinto(buffer) == 1000
+        rest = fp.read()
+        assert fp.read() == b""
+
+    assert head + bytes(buffer) + rest == content
+    assert _content_requests(mock) == 1
+
+
+def test_open_file_stream_seeks_with_ranges(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    f = mock.find_file(Library_Path + "/folder10/file-03.docx")
+    content = mock.content(f)
+
+    fp = site.open_file_stream(f["server_relative_url"])
+    assert fp.seekable()
+    # zip readers start with the end of the file
+    fp.seek(-100, io.SEEK_END)
+    assert fp.read() == content[-100:]
+    fp.seek(20)
+    assert fp.read(30) == content[20:50]
+    assert fp.tell() == 50
+    fp.close()
+
+    assert _content_requests(mock) == 2
+
+
+def test_iter_file_chunks(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    f = mock.find_file(Library_Path + "/folder10/file-05.docx")
+
+    chunks = list(site.iter_file_chunks(f["server_relative_url"], chunk_size=1024))
+    assert b"".join(chunks) == mock.content(f)
+    assert max(len(chunk) for chunk in chunks) <= 1024
+
+    # one reused buffer
+    chunks = [(type(chunk), bytes(chunk)) for chunk in
+              site.iter_file_chunks(f["server_relative_url"], chunk_size=1024, reuse_buffer=True)]
+    assert all(chunk_type is memoryview for chunk_type, _ in chunks)
+    assert b"".join(chunk for _, chunk in chunks) == mock.content(f)
+
+
+class _Response:
+
+    def __init__(self, data, status_code=200):
+        self.raw = io.BytesIO(data)
+        self.status_code = status_code
+
+    def close(self):
+        pass
+
+
+def test_truncated_stream_is_an_error(site, sharepoint_mock, monkeypatch):
+    mock, _ = sharepoint_mock
+    # the connection closes 100 bytes early
+    fp = io.BufferedReader(FileStream(lambda offset: _Response(b"x" * (900 - offset)), 1000, "a.docx"))
+    with pytest.raises(IOError):
+        fp.read()
+
+    f = mock.find_file(Library_Path + "/folder10/file-05.docx")
+    get_file_content = site._get_file_content
+    monkeypatch.setattr(site, "_get_file_content", lambda path: (get_file_content(path)[0], f["size"] + 100))
+    for reuse_buffer in (False, True):
+        with pytest.raises(IOError):
+            list(site.iter_file_chunks(f["server_relative_url"], reuse_buffer=reuse_buffer))
+
+
+def test_missing_file(site):
+    assert site.open_file_stream(Library_Path + "/folder10/missing.docx") is None
+    assert list(site.iter_file_chunks(Library_Path + "/folder10/missing.docx")) == []
+    assert site.open_file_stream("") is None
+
+
+def test_graph_file_stream(graph_site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    f = mock.find_file(Library_Path + "/folder1/nested/file-02.docx")
+
+    with graph_site.open_file_stream(f["server_relative_url"]) as fp:
+        fp.seek(1000)
+        assert fp.read() == mock.content(f)[1000:]
+    assert b"".join(graph_site.iter_file_chunks(f["server_relative_url"])) == mock.content(f)
@@ -0,0 +1,82 @@
+import datetime
+import io
+import json
+
+import pytest
+
+from vowelsharepoint.filetable import FileRecord, FileTable, write_ndjson
+
+from conftest import Library_Path, Tag_Column_Title
+
+
+def test_file_table_rows_match_summaries(site):
+    summaries = site.get_files_in_folder("Documents", Tag_Column_Title)
+
+    files = site.get_file_table("Documents", Tag_Column_Title)
+
+    assert len(files) == len(summaries) == 37
+    assert all(isinstance(f, FileRecord) for f in files)
+    # dict compatible view, same keys and values
+    assert [dict(f) for f in files] == summaries
+    assert files[0] == summaries[0]
+    assert files[-1]["tag"] == summaries[-1]["tag"]
+    assert files[0].get("missing") is None
+    assert json.loads(json.dumps(files[0].to_dict())) == summaries[0]
+
+    # numeric values, interned strings
+    f = files[0]
+    assert f.size == int(summaries[0]["size_bytes"])
+    assert datetime.datetime.fromtimestamp(f.modified, datetime.timezone.utc).ctime() == summaries[0]["time_last_modified"]
+    assert len(files._sites) == 1
+    assert files._folders == [Library_Path + "/folder1", Library_Path + "/folder1/nested", Library_Path + "/folder10"]
+
+
+def test_file_table_without_tags_and_odd_etags():
+    files = FileTable()
+    summary = {"site_url": "https://contoso.sharepoint.com/sites/a", "item_id": 7,
+               "server_relative_url": "/sites/a/Shared Documents/a.docx", "time_last_modified": "Thu Feb  1 10:00:00 2024",
+               "size_bytes": "12", "etag": "W/abc"}
+    files.append(summary)
+    files.append(dict(summary, item_id=8, etag=None))
+
+    assert "tag" not in files[0]
+    assert list(files[0]) == list(summary)
+    assert files[0] == summary
+    assert files[1]["etag"] is None
+    assert files[0].modified == int(datetime.datetime(2024, 2, 1, 10, tzinfo=datetime.timezone.utc).timestamp())
+
+    # a tag seen later, earlier rows get an empty tag
+    files.append(dict(summary, item_id=9, tag="hr"))
+    assert files[0]["tag"] == ""
+    assert files[2]["tag"] == "hr"
+
+    with pytest.raises(IndexError):
+        files[3]
+
+
+def test_write_ndjson_streams_numeric_fields(site):
+    out = io.StringIO()
+
+    rows = write_ndjson(site.iter_files_in_folder("Documents/folder10"), out)
+
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert rows == len(lines) == 7
+    assert isinstance(lines[0]["size_bytes"], int)
+    assert isinstance(lines[0]["time_last_modified"], int)
+
+    # same output from a table
+    table_out = io.StringIO()
+    site.get_file_table("Documents/folder10").write_ndjson(table_out)
+    assert table_out.getvalue() == out.getvalue()
+
+
+def test_write_parquet(site, tmp_path):
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    files = site.get_file_table("Documents", Tag_Column_Title)
+
+    assert files.write_parquet(str(tmp_path / "files.parquet"), batch_rows=10) == 37
+
+    table = pyarrow_parquet.read_table(str(tmp_path / "files.parquet"))
+    assert table.num_rows == 37
+    assert table.column("server_relative_url").to_pylist() == [f["server_relative_url"] for f in files]
+    assert table.column("size_bytes").to_pylist() == [f.size for f in files]
@@ -0,0 +1,90 @@
+import datetime
+
+import pytest
+
+from office365.runtime.client_request_exception import ClientRequestException
+
+import vowelsharepoint.office365sdk as office365sdk
+
+from conftest import Library_Path
+
+
+def _count(mock, suffix):
+    return len([path for method, path in mock.requests if path.lower().endswith(suffix.lower())])
+
+
+def test_get_files_in_folder_request_count(site, sharepoint_mock, monkeypatch):
+    mock, _ = sharepoint_mock
+    monkeypatch.setattr(office365sdk, "ListItems_PageSize", 10)
+
+    folder_files_summary = site.get_files_in_folder("Documents/folder1", "custom-metadata")
+
+    # 30 files under folder1 (including nested), none from folder10
+    assert len(folder_files_summary) == 30
+    assert all("/folder1/" in f["server_relative_url"] for f in folder_files_summary)
+    assert all(f["tag"].startswith("tag-") for f in folder_files_summary)
+
+    # library root folder + fields lookup + form digest + 4 paged GetItems, no per file requests
+    assert _count(mock, "/GetItems") == 4
+    assert _count(mock, "/File") == 0
+    assert _count(mock, "/ListItemAllFields") == 0
+    assert len(mock.requests) == 7
+
+
+def test_get_files_in_folder_modified_after(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+
+    folder_files_summary = site.get_files_in_folder("Documents/folder10", None, datetime.datetime(2024, 2, 1, 0, 0))
+
+    assert len(folder_files_summary) == 7
+    assert "tag" not in folder_files_summary[0]
+    assert _count(mock, "/GetItems") == 1
+
+
+def test_get_files_in_folder_modified_after_time_zone(site, sharepoint_mock):
+    # 2024-02-01 05:30 in UTC+05:30 is midnight UTC
+    modified_after = datetime.datetime(2024, 2, 1, 5, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=5, minutes=30)))
+
+    folder_files_summary = site.get_files_in_folder("Documents/folder10", None, modified_after)
+
+    assert folder_files_summary == site.get_files_in_folder("Documents/folder10", None, datetime.datetime(2024, 2, 1, 0, 0))
+    assert len(folder_files_summary) == 7
+
+
+def test_folder_items_query_modified_after_is_utc(site):
+    modified_after = datetime.datetime(2024, 2, 1, 5, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=5, minutes=30)))
+
+    qry = site._get_folder_items_query(Library_Path, modified_after)
+
+    assert ('<Value Type="DateTime" IncludeTimeValue="TRUE" StorageTZ="TRUE">2024-02-01T00:00:00Z</Value>'
+            in qry.ViewXml)
+
+
+def test_iter_files_in_folder_streams_pages(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+
+    files = site.iter_files_in_folder("Documents/folder1", page_size=10)
+
+    # nothing requested until the first file is consumed, then only the first page
+    assert _count(mock, "/GetItems") == 0
+    first = next(files)
+    assert first["server_relative_url"].endswith("/folder1/file-00.docx")
+    assert _count(mock, "/GetItems") == 1
+
+    assert len(list(files)) == 29
+    assert _count(mock, "/GetItems") == 4
+
+
+def test_listing_failure_raises(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+
+    mock.fail_get_items = 1
+    with pytest.raises(ClientRequestException):
+        site.get_files_in_folder("Documents/folder1")
+
+    # a later page failing is not a shorter listing
+    files = site.iter_files_in_folder("Documents/folder1", page_size=10)
+    assert len([next(files) for _ in range(10)]) == 10
+    mock.fail_get_items = 1
+    with pytest.raises(ClientRequestException):
+        list(files)
@@ -0,0 +1,43 @@
+import vowelsharepoint.office365sdk as office365sdk
+
+from conftest import Library_Path
+
+
+def test_get_folder_by_path(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+
+    folder_summary = site.get_folder("Documents/folder1/nested")
+    assert folder_summary["server_relative_url"] == Library_Path + "/folder1/nested"
+    assert folder_summary["size_bytes"] == sum(2000 + i for i in range(5))
+    # library root folder mapping + folder with StorageMetrics, no library listing
+    assert len(mock.requests) == 2
+    assert len([path for method, path in mock.requests if path.endswith("/GetItems")]) == 0
+
+    # the library mapping is cached, unknown folders are not found
+    del mock.requests[:]
+    assert site.get_folder("documents/folder10")["size_bytes"] == sum(3000 + i for i in range(7))
+    assert site.get_folder("Documents/missing") is None
+    assert len(mock.requests) == 2
+
+
+def test_get_folder_doc_lib_only(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+
+    lib_summary = site.get_folder("Documents")
+    assert lib_summary["server_relative_url"] == Library_Path
+    assert lib_summary["size_bytes"] == sum(f["size"] for f in mock.files) + 1024
+    assert len(mock.requests) == 1
+
+
+def test_unknown_doc_lib_is_not_relisted(site, sharepoint_mock, monkeypatch):
+    mock, _ = sharepoint_mock
+
+    assert site.get_folder("Missing/folder1") is None
+    assert site.get_folder("Missing/folder1") is None
+    assert site.get_folder("Documents/folder1")["server_relative_url"] == Library_Path + "/folder1"
+    assert len([path for method, path in mock.requests if path.endswith("/_api/Web/lists")]) == 1
+
+    # relisted once the miss has expired, Eg. a library created since
+    monkeypatch.setattr(office365sdk, "DocLibRoots_MissSecs", 0)
+    assert site.get_folder("Missing/folder1") is None
+    assert len([path for method, path in mock.requests if path.endswith("/_api/Web/lists")]) == 2
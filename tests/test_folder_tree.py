@@ -0,0 +1,55 @@
+import json
+
+import vowelsharepoint.office365sdk as office365sdk
+
+from conftest import Library_Path
+
+
+def test_get_folder_tree(site, sharepoint_mock, monkeypatch):
+    mock, _ = sharepoint_mock
+    monkeypatch.setattr(office365sdk, "ListItems_PageSize", 10)
+
+    tree = site.get_folder_tree("Documents")
+
+    assert tree["server_relative_url"] == Library_Path
+    assert tree["files"] == 37
+    assert tree["size_bytes"] == sum(f["size"] for f in mock.files)
+    assert [child["name"] for child in tree["folders"]] == ["folder1", "folder10"]
+    folder1, folder10 = tree["folders"]
+    assert folder1["files"] == 30
+    assert folder1["size_bytes"] == sum(1000 + i for i in range(25)) + sum(2000 + i for i in range(5))
+    assert folder1["folders"][0]["name"] == "nested"
+    assert folder1["folders"][0]["files"] == 5
+    assert folder10["files"] == 7
+    latest = max(f["modified"] for f in mock.files if "/folder10/" in f["server_relative_url"])
+    assert folder10["time_last_modified"] == latest.ctime()
+    assert json.loads(json.dumps(tree)) == tree
+
+    # library root folder + form digest + one paged listing (37 files, 3 folders: 4 full pages
+    # and an empty one), no per folder requests
+    assert len([path for method, path in mock.requests if path.endswith("/GetItems")]) == 5
+    assert len(mock.requests) == 1 + 1 + 5
+
+
+def test_get_folder_tree_subfolder(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+
+    tree = site.get_folder_tree("Documents/folder1")
+
+    assert tree["server_relative_url"] == Library_Path + "/folder1"
+    assert tree["name"] == "folder1"
+    assert tree["files"] == 30
+    assert [(child["name"], child["files"], child["folders"]) for child in tree["folders"]] == [("nested", 5, [])]
+
+
+def test_get_folder_tree_case_and_failure(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+
+    # urls listed in their own case, not the case of input_path
+    tree = site.get_folder_tree("Documents/FOLDER1")
+    assert tree["files"] == 30
+    assert [(child["name"], child["files"]) for child in tree["folders"]] == [("nested", 5)]
+
+    # a failed listing page, no partial tree
+    mock.fail_get_items = 1
+    assert site.get_folder_tree("Documents") is None
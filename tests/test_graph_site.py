@@ -0,0 +1,107 @@
+import datetime
+
+import vowelsharepoint.office365sdk as office365sdk
+from vowelsharepoint.msgraphapi import Backend_Graph, Backend_Rest, GraphSharePointSite, new_site
+from vowelsharepoint.office365sdk import SharePointSite
+
+from conftest import Library_Path, Tag_Column_Title
+
+
+def _count(mock, suffix):
+    return len([path for method, path in mock.requests if path.lower().endswith(suffix.lower())])
+
+
+def _by_url(files):
+    return sorted(files, key=lambda f: f["server_relative_url"])
+
+
+def test_files_in_folder_same_as_rest(graph_site, site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+
+    graph_files = graph_site.get_files_in_folder("Documents/folder1")
+
+    assert len(graph_files) == 30
+    assert _by_url(graph_files) == _by_url(site.get_files_in_folder("Documents/folder1"))
+    # site + drives lookups, one children listing per folder (folder1, nested), no REST listing
+    assert _count(mock, "/children") == 2
+    assert _count(mock, "/GetItems") == 1
+
+
+def test_files_in_library_with_delta(graph_site, site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+
+    graph_files = list(graph_site.iter_files_in_folder("Documents", page_size=10))
+
+    assert _by_url(graph_files) == _by_url(site.get_files_in_folder("Documents"))
+    # root + 3 folders + 37 files in pages of 10
+    assert _count(mock, "/root/delta") == 5
+    assert _count(mock, "/children") == 0
+
+
+def test_delta_items_before_their_parent_folder(graph_site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    items = list(reversed([None] + mock.folders + mock.files))
+    mock.delta = lambda position, top: (items[position:position + top],
+                                        position + top if position + top < len(items) else None)
+
+    graph_files = list(graph_site.iter_files_in_folder("Documents", page_size=10))
+
+    assert len(graph_files) == 37
+    assert {f["server_relative_url"] for f in graph_files} == {f["server_relative_url"] for f in mock.files}
+
+
+def test_files_in_folder_tag_and_modified_after(graph_site, site, sharepoint_mock):
+    modified_after = datetime.datetime(2024, 2, 20)
+
+    graph_files = graph_site.get_files_in_folder("Documents", Tag_Column_Title, modified_after)
+
+    assert graph_files and all(f["tag"].startswith("tag-") for f in graph_files)
+    assert _by_url(graph_files) == _by_url(site.get_files_in_folder("Documents", Tag_Column_Title, modified_after))
+
+
+def test_folder_and_doc_lib(graph_site, site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+
+    assert graph_site.get_folder("Documents/folder1") == site.get_folder("Documents/folder1")
+    assert graph_site.get_folder("Documents/missing") is None
+    assert graph_site.get_folder("Documents/folder1/file-01.docx") is None
+
+    doc_lib = graph_site.get_doc_lib("Documents")
+    assert doc_lib["server_relative_url"] == Library_Path
+    assert doc_lib["size_bytes"] == sum(f["size"] for f in mock.files)
+
+    # an unknown library does not relist the drives on every call
+    assert graph_site.get_folder("Missing/folder1") is None
+    assert graph_site.get_folder("Missing/folder1") is None
+    assert _count(mock, "/drives") == 1
+
+
+def test_download_file_from_download_url(graph_site, sharepoint_mock, tmp_path, monkeypatch):
+    mock, _ = sharepoint_mock
+    monkeypatch.setattr(office365sdk, "Download_LargeFileSizeBytes", 1)
+    f = mock.find_file(Library_Path + "/folder10/file-02.docx")
+
+    # the emulator rejects download url requests carrying a token
+    summary, ok = graph_site.download_file(f["server_relative_url"], None, str(tmp_path), chunk_size_bytes=1024)
+
+    assert ok
+    assert summary["file_size_bytes"] == f["size"]
+    assert open(summary["file_name"], "rb").read() == mock.content(f)
+    assert _count(mock, "/download.aspx") == 3
+    assert _count(mock, "/$value") == 0
+
+    summary, ok = graph_site.download_file(Library_Path + "/folder10/missing.docx", None, str(tmp_path))
+    assert not ok
+
+
+def test_access_check_through_rest(graph_site):
+    file_path = Library_Path + "/folder1/file-01.docx"
+
+    assert graph_site.check_user_access_for_file("alice@contoso.com", file_path, "OPEN_ITEMS")
+    assert not graph_site.check_user_access_for_file("bob@contoso.com", file_path, "OPEN_ITEMS")
+
+
+def test_new_site_backends():
+    assert type(new_site("https://contoso.sharepoint.com/sites/test-site-1", Backend_Rest)) is SharePointSite
+    assert isinstance(new_site("https://contoso.sharepoint.com/sites/test-site-1", Backend_Graph), GraphSharePointSite)
+    assert new_site("https://contoso.sharepoint.com/sites/test-site-1", "ftp") is None
@@ -0,0 +1,108 @@
+import logging
+import time
+
+import vowelsharepoint.office365sdk as office365sdk
+from vowelsharepoint.instrumentation import add_listener, collect_metrics, get_endpoint, remove_listener
+
+from conftest import Library_Path
+
+GetItems = "_api/web/lists/getbytitle(*)/getitems"
+
+
+def test_call_and_endpoint_metrics(site, sharepoint_mock, monkeypatch):
+    mock, _ = sharepoint_mock
+    monkeypatch.setattr(office365sdk, "ListItems_PageSize", 10)
+
+    with collect_metrics() as metrics:
+        assert len(site.get_files_in_folder("Documents/folder1", "custom-metadata")) == 30
+
+    stats = metrics.stats()
+    call = stats["calls"]["SharePointSite.get_files_in_folder"]
+    assert call["count"] == 1
+    assert call["requests"] == len(mock.requests) == 7
+    assert call["bytes"] > 0
+    assert call["latency"]["count"] == 1
+    # the nested iterator call is accounted too
+    assert stats["calls"]["SharePointSite.iter_files_in_folder"]["requests"] == 7
+    assert stats["endpoints"][GetItems]["requests"] == 4
+    assert stats["endpoints"]["_api/web/lists/getbytitle(*)/fields"]["requests"] == 1
+    assert sum(e["requests"] for e in stats["endpoints"].values()) == 7
+
+
+def test_worker_thread_requests_attributed(site, sharepoint_mock, tmp_path, monkeypatch):
+    mock, _ = sharepoint_mock
+    monkeypatch.setattr(office365sdk, "Download_LargeFileSizeBytes", 1)
+    f = mock.find_file(Library_Path + "/folder10/file-02.docx")
+
+    with collect_metrics() as metrics:
+        summary, ok = site.download_file(f["server_relative_url"], str(f["size"]), str(tmp_path),
+                                         chunk_size_bytes=256, max_workers=3)
+
+    assert ok
+    call = metrics.stats()["calls"]["SharePointSite.download_file"]
+    # every request, including the 12 ranges downloaded by the worker threads
+    assert call["requests"] == len(mock.requests) == 13
+    assert metrics.stats()["endpoints"]["_api/web/getfilebyserverrelativepath(*)/$value"]["bytes"] == f["size"]
+
+
+def test_throttles_and_listeners(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    mock.throttle = 1
+    events = []
+
+    def failing_listener(event):
+        raise ValueError("listener bug")
+
+    add_listener(failing_listener)
+    add_listener(events.append)
+    try:
+        assert site.get_folder("Documents/folder1/nested") is not None
+    finally:
+        remove_listener(failing_listener)
+        remove_listener(events.append)
+
+    call = [e for e in events if e["type"] == "call"][0]
+    assert call["method"] == "SharePointSite.get_folder"
+    assert call["throttles"] == 1
+    assert call["retries"] == 1
+    assert call["requests"] == 3
+    assert call["error"] is None
+    requests = [e for e in events if e["type"] == "request"]
+    assert [e["status"] for e in requests] == [429, 200, 200]
+    assert requests[1]["retry"]
+    assert all(e["call"] == "SharePointSite.get_folder" for e in requests)
+
+
+def test_log_records_carry_call(site, sharepoint_mock, caplog):
+    with caplog.at_level(logging.WARNING, logger="vowelsharepoint"):
+        assert site.get_folder("Documents/missing") is None
+
+    record = [r for r in caplog.records if "does not belong to site" in r.getMessage()][0]
+    assert record.sharepoint_call == "SharePointSite.get_folder"
+
+
+def test_get_endpoint():
+    assert get_endpoint("https://contoso.sharepoint.com/sites/a/_api/Web/lists/GetByTitle('Docs%20A')/items(42)?$select=Id") \
+        == "_api/web/lists/getbytitle(*)/items(*)"
+    assert get_endpoint("https://contoso.sharepoint.com/sites/a/_api/web/getFileByServerRelativePath("
+                        "DecodedUrl='/sites/a/it''s (1).docx')/$value") == "_api/web/getfilebyserverrelativepath(*)/$value"
+    assert get_endpoint("https://graph.microsoft.com/v1.0/drives/b!x9/root:/folder1/a%20b:/children?$top=999") \
+        == "v1.0/drives/*/root:*/children"
+    assert get_endpoint("https://graph.microsoft.com/v1.0/drives/b!x9/items/01AB/children") == "v1.0/drives/*/items/*/children"
+
+
+def test_generator_latency_excludes_consumer_time(site, sharepoint_mock):
+    events = []
+    add_listener(events.append)
+    try:
+        start = time.perf_counter()
+        for _ in site.iter_files_in_folder("Documents/folder1", page_size=10):
+            time.sleep(0.01)
+        consumer_secs = time.perf_counter() - start
+    finally:
+        remove_listener(events.append)
+
+    call = [e for e in events if e.get("method") == "SharePointSite.iter_files_in_folder"][0]
+    # 30 items, 0.3 secs spent by the consumer
+    assert call["requests"] == 6
+    assert call["elapsed_secs"] < consumer_secs - 0.25
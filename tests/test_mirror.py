@@ -0,0 +1,175 @@
+import datetime
+import json
+import os
+
+import pytest
+
+from office365.runtime.client_request_exception import ClientRequestException
+
+import vowelsharepoint.office365sdk as office365sdk
+from vowelsharepoint.mirror import Mirror_ManifestName
+
+from conftest import Library_Path
+
+
+def _local_files(root):
+    return sorted(os.path.relpath(os.path.join(folder, name), root)
+                  for folder, _, names in os.walk(root) for name in names)
+
+
+def _content_requests(mock):
+    return len([p for m, p in mock.requests if p.endswith("/$value")])
+
+
+def test_mirror_folder_downloads_only_changes(site, sharepoint_mock, tmp_path):
+    mock, _ = sharepoint_mock
+
+    stats = site.mirror_folder("Documents/folder1", str(tmp_path))
+
+    assert stats["files"] == stats["downloaded"] == 30
+    assert stats["bytes"] == sum(f["size"] for f in mock.files if "/folder1/" in f["server_relative_url"])
+    assert _local_files(str(tmp_path)) == sorted(
+        [Mirror_ManifestName] + ["file-{0:02d}.docx".format(i) for i in range(25)]
+        + [os.path.join("nested", "file-{0:02d}.docx".format(i)) for i in range(5)])
+    f = mock.find_file(Library_Path + "/folder1/nested/file-01.docx")
+    local_file_name = str(tmp_path / "nested" / "file-01.docx")
+    assert open(local_file_name, "rb").read() == mock.content(f)
+    assert os.path.getmtime(local_file_name) == f["modified"].replace(tzinfo=datetime.timezone.utc).timestamp()
+
+    # unchanged: no content request
+    del mock.requests[:]
+    stats = site.mirror_folder("Documents/folder1", str(tmp_path))
+    assert stats["skipped"] == 30 and stats["downloaded"] == stats["bytes"] == 0
+    assert _content_requests(mock) == 0
+
+    # a new version and a new size, only those files
+    mock.find_file(Library_Path + "/folder1/file-03.docx")["version"] = 2
+    f["size"] += 10
+    del mock.requests[:]
+    stats = site.mirror_folder("Documents/folder1", str(tmp_path))
+    assert stats["downloaded"] == 2 and stats["skipped"] == 28
+    assert _content_requests(mock) == 2
+    assert open(local_file_name, "rb").read() == mock.content(f)
+
+
+def test_mirror_folder_removes_deleted_files(site, sharepoint_mock, tmp_path):
+    mock, _ = sharepoint_mock
+    site.mirror_folder("Documents", str(tmp_path))
+    assert (tmp_path / "folder1" / "nested" / "file-00.docx").exists()
+
+    mock.files = [f for f in mock.files if "/nested/" not in f["server_relative_url"]
+                  and not f["server_relative_url"].endswith("/folder10/file-06.docx")]
+    stats = site.mirror_folder("Documents", str(tmp_path))
+
+    assert stats["deleted"] == 6 and stats["downloaded"] == 0
+    assert not (tmp_path / "folder1" / "nested").exists()
+    assert not (tmp_path / "folder10" / "file-06.docx").exists()
+    manifest = json.load(open(str(tmp_path / Mirror_ManifestName)))
+    assert len(manifest["files"]) == 31
+
+
+def test_mirror_folder_failed_listing_removes_nothing(site, sharepoint_mock, tmp_path, monkeypatch):
+    mock, _ = sharepoint_mock
+    site.mirror_folder("Documents", str(tmp_path))
+    before = _local_files(str(tmp_path))
+    manifest = json.load(open(str(tmp_path / Mirror_ManifestName)))
+
+    # the second page of the listing fails, files of the missing pages must not look removed
+    monkeypatch.setattr(office365sdk, "ListItems_PageSize", 10)
+    iter_files_in_folder = site.iter_files_in_folder
+
+    def partial_listing(input_path):
+        for i, file_summary in enumerate(iter_files_in_folder(input_path)):
+            if i == 5:
+                mock.fail_get_items = 1
+            yield file_summary
+    monkeypatch.setattr(site, "iter_files_in_folder", partial_listing)
+    with pytest.raises(ClientRequestException):
+        site.mirror_folder("Documents", str(tmp_path))
+
+    assert _local_files(str(tmp_path)) == before
+    assert len(json.load(open(str(tmp_path / Mirror_ManifestName)))["files"]) == len(manifest["files"])
+
+
+def test_mirror_folder_resumes_part_file(site, sharepoint_mock, tmp_path):
+    mock, _ = sharepoint_mock
+    site.mirror_folder("Documents/folder10", str(tmp_path))
+    f = mock.find_file(Library_Path + "/folder10/file-02.docx")
+    f["version"] = 2
+    file_summary = [s for s in site.iter_files_in_folder("Documents/folder10")
+                    if s["server_relative_url"] == f["server_relative_url"]][0]
+    local_file_name = str(tmp_path / "file-02.docx")
+
+    # an interrupted download of the new version, first 1000 bytes received,
+    # marked to tell a resumed transfer from a restarted one. A part of another version is dropped
+    with open(site._get_mirror_part_file_name(local_file_name, file_summary), "wb") as part:
+        part.write(b"x" * 1000)
+    with open(local_file_name + ".000000000000.part", "wb") as part:
+        part.write(b"y" * 10)
+    stats = site.mirror_folder("Documents/folder10", str(tmp_path))
+
+    assert stats["downloaded"] == stats["resumed"] == 1
+    assert open(local_file_name, "rb").read() == b"x" * 1000 + mock.content(f)[1000:]
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(".part")]
+
+
+def test_mirror_folder_resumes_only_the_same_version(site, sharepoint_mock, tmp_path):
+    mock, _ = sharepoint_mock
+    f = mock.find_file(Library_Path + "/folder10/file-02.docx")
+    file_summary = [s for s in site.iter_files_in_folder("Documents/folder10")
+                    if s["server_relative_url"] == f["server_relative_url"]][0]
+    local_file_name = str(tmp_path / "file-02.docx")
+    part_file_name = site._get_mirror_part_file_name(local_file_name, file_summary)
+    with open(part_file_name, "wb") as part:
+        part.write(mock.content(f)[:1000])
+
+    # changed (same size) after it was listed, the range is answered with the whole new version
+    f["data"], f["version"] = bytes(reversed(mock.content(f))), 2
+    result = site._mirror_file(file_summary, "file-02.docx", str(tmp_path))
+    assert result[2] and open(local_file_name, "rb").read() == f["data"]
+
+    # without etag, a range of a file of another size is dropped, never appended to the part
+    del f["data"]
+    with open(part_file_name, "wb") as part:
+        part.write(mock.content(f)[:1000])
+    expected_size = f["size"]
+    f["size"] += 10
+    assert not site._download_content(site._get_file_content_url(f["server_relative_url"]), local_file_name,
+                                      expected_size, None, 1, part_file_name=part_file_name)
+    assert not os.path.exists(part_file_name)
+    assert open(local_file_name, "rb").read() == bytes(reversed(mock.content(dict(f, size=expected_size))))
+
+
+def test_mirror_folder_keeps_part_on_failure(site, sharepoint_mock, tmp_path, monkeypatch):
+    mock, _ = sharepoint_mock
+    site.mirror_folder("Documents/folder10", str(tmp_path))
+    f = mock.find_file(Library_Path + "/folder10/file-02.docx")
+    f["version"] = 2
+    previous = open(str(tmp_path / "file-02.docx"), "rb").read()
+
+    def interrupted(content_url, local_file_name, part_file_name, expected_size, resume, etag=None):
+        with open(part_file_name, "wb") as part:
+            part.write(b"x" * 10)
+        return False
+    monkeypatch.setattr(site, "_download_stream", interrupted)
+    stats = site.mirror_folder("Documents/folder10", str(tmp_path))
+
+    assert stats["failed"] == 1 and stats["downloaded"] == 0
+    # the previous version stays until the new one is complete, the part is kept to resume
+    assert open(str(tmp_path / "file-02.docx"), "rb").read() == previous
+    assert len([name for name in os.listdir(str(tmp_path)) if name.endswith(".part")]) == 1
+
+
+def test_mirror_folder_graph(graph_site, sharepoint_mock, tmp_path):
+    mock, _ = sharepoint_mock
+
+    stats = graph_site.mirror_folder("Documents", str(tmp_path))
+
+    assert stats["downloaded"] == 37
+    assert graph_site.mirror_folder("Documents", str(tmp_path))["skipped"] == 37
+
+
+def test_mirror_folder_invalid_input(site, tmp_path):
+    assert site.mirror_folder("", str(tmp_path)) is None
+    assert site.mirror_folder("Documents", str(tmp_path / "missing")) is None
+    assert site.mirror_folder("Missing", str(tmp_path)) is None
@@ -0,0 +1,57 @@
+import time
+
+from conftest import Library_Path
+from vowelsharepoint.office365sdk import SharePointSite
+from vowelsharepoint.ratelimit import RateLimiter, get_rate_limiter
+
+
+def test_throttled_requests_are_retried(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    mock.throttle = 2
+
+    start = time.monotonic()
+    folder_summary = site.get_folder("Documents/folder1/nested")
+
+    assert folder_summary["server_relative_url"] == Library_Path + "/folder1/nested"
+    # each 429 paused every request for its Retry-After
+    assert time.monotonic() - start >= 0.2
+    stats = site.get_rate_limit_stats()
+    assert stats["throttled"] == 2
+    assert stats["retries"] == 2
+    assert stats["tenant"]["throttled"] == 2
+    assert stats["rate"] < 20
+
+    # site objects of the same site share the limiter
+    other = SharePointSite(site.site_url)
+    assert other.get_rate_limit_stats()["throttled"] == 2
+
+
+def test_retry_after_pauses_tenant():
+    site_a = get_rate_limiter("tenant-pause", "https://contoso.sharepoint.com/sites/a")
+    site_b = get_rate_limiter("tenant-pause", "https://contoso.sharepoint.com/sites/b")
+    assert site_a.parent is site_b.parent
+
+    site_a.on_throttled(0.2)
+
+    start = time.monotonic()
+    site_b.acquire()
+    assert time.monotonic() - start >= 0.15
+    assert site_b.stats()["tenant"]["throttled"] == 1
+    assert site_b.stats()["throttled"] == 0
+
+
+def test_token_bucket_rate():
+    limiter = RateLimiter(rate=50, burst=5, increase_per_request=0)
+
+    start = time.monotonic()
+    for _ in range(15):
+        limiter.acquire()
+
+    # 5 from the burst, 10 at 50 per second
+    assert 0.15 <= time.monotonic() - start < 1
+    assert limiter.stats()["waits"] == 10
+
+    limiter.on_throttled(0)
+    assert limiter.rate == 25
+    limiter.on_success()
+    assert limiter.rate == 25
@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from concurrent.futures import wait
+
+import pytest
+
+from office365.runtime.auth.token_response import TokenResponse
+
+import vowelsharepoint.sitepool as sitepool
+from vowelsharepoint.httpsession import PooledClientContext, get_session
+from vowelsharepoint.office365sdk import SharePointSite
+from vowelsharepoint.sitepool import SitePool
+
+from conftest import Site_Path, SharePointMock, start_server
+
+
+@pytest.fixture
+def site_mocks():
+    """two SharePoint mocks (one site each), yields [](SharePointMock, site url)"""
+
+    mocks = []
+    servers = []
+    for sizes in ({"folder1/a-{0:02d}.docx".format(i): 500 + i for i in range(12)},
+                  {"folder1/b-{0:02d}.docx".format(i): 800 + i for i in range(12)}):
+        mock = SharePointMock(sizes)
+        server, base_url = start_server(mock)
+        servers.append(server)
+        mocks.append((mock, base_url + Site_Path))
+    yield mocks
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _pool(site_mocks, **kwargs):
+    pool = SitePool([site_url for _, site_url in site_mocks], **kwargs)
+    for site in pool.sites.values():
+        site.ctx = PooledClientContext(site.site_url, site.session).with_access_token(
+            lambda: TokenResponse(access_token="token", token_type="Bearer")
+        )
+    return pool
+
+
+def test_download_files_across_sites(site_mocks, tmp_path, monkeypatch):
+    monkeypatch.setattr(sitepool, "SitePool_ListBatchFiles", 5)
+    pool = _pool(site_mocks, max_workers=4, max_per_site=2)
+
+    stats = pool.download_files("Documents", str(tmp_path))
+    pool.close()
+
+    assert stats["sites"] == 2 and stats["files"] == 24 and stats["failed"] == 0
+    for mock, site_url in site_mocks:
+        assert stats["by_site"][site_url]["files"] == 12
+        assert stats["by_site"][site_url]["bytes"] == sum(f["size"] for f in mock.files)
+        f = mock.files[3]
+        local_file_name = os.path.join(str(tmp_path), sitepool._get_site_folder(site_url),
+                                       f["server_relative_url"][len(Site_Path) + 1:])
+        assert open(local_file_name, "rb").read() == mock.content(f)
+
+    pool_stats = pool.get_stats()
+    assert pool_stats["files"] == 24 and pool_stats["queued"] == pool_stats["running"] == 0
+    # 3 listing batches (5, 5, 2 files) and 12 downloads per site
+    assert all(site_stats["tasks"] == 15 for site_stats in pool_stats["by_site"].values())
+
+
+def test_slow_site_does_not_stall_others(site_mocks, tmp_path):
+    (slow, slow_url), (fast, fast_url) = site_mocks
+    slow.latency_secs = 0.1
+    pool = _pool(site_mocks, max_workers=4, max_per_site=2)
+
+    stats = pool.download_files("Documents", str(tmp_path))
+    pool.close()
+
+    assert stats["files"] == 24 and stats["failed"] == 0
+    assert stats["by_site"][fast_url]["elapsed_secs"] < stats["by_site"][slow_url]["elapsed_secs"] / 2
+
+
+def test_concurrency_limits(site_mocks):
+    pool = _pool(site_mocks, max_workers=3, max_per_site=2)
+    lock = threading.Lock()
+    running = {"pool": 0, "max_pool": 0}
+
+    def task(site):
+        with lock:
+            running[site.site_url] = running.get(site.site_url, 0) + 1
+            running["pool"] += 1
+            running["max_" + site.site_url] = max(running.get("max_" + site.site_url, 0), running[site.site_url])
+            running["max_pool"] = max(running["max_pool"], running["pool"])
+        time.sleep(0.02)
+        with lock:
+            running[site.site_url] -= 1
+            running["pool"] -= 1
+        return site.site_url
+
+    futures = [pool.submit(site_url, task) for _, site_url in site_mocks for _ in range(8)]
+    assert [future.result() for future in futures] == [site_url for _, site_url in site_mocks for _ in range(8)]
+    pool.close()
+
+    assert running["max_pool"] == 3
+    assert all(running["max_" + site_url] <= 2 for _, site_url in site_mocks)
+    assert pool.submit("https://contoso.sharepoint.com/sites/other", task) is None
+
+
+def test_iter_files_and_map_sites(site_mocks):
+    pool = _pool(site_mocks)
+
+    files = list(pool.iter_files("Documents/folder1"))
+    assert len(files) == 24
+    assert {site_url for site_url, _ in files} == {site_url for _, site_url in site_mocks}
+
+    # stopped early, the listings stop
+    for _ in zip(range(3), pool.iter_files("Documents")):
+        pass
+
+    doc_libs = pool.map_sites(SharePointSite.get_doc_lib, "Documents")
+    assert all(doc_lib["server_relative_url"].endswith("/Shared Documents") for doc_lib in doc_libs.values())
+    pool.close()
+
+
+def test_listing_failure_is_isolated(site_mocks, tmp_path):
+    (broken, broken_url), (mock, site_url) = site_mocks
+    pool = _pool(site_mocks)
+    # not connected
+    pool.sites[broken_url].ctx = None
+
+    stats = pool.download_files("Documents", str(tmp_path))
+    pool.close()
+
+    assert stats["by_site"][broken_url]["listed"] is False
+    assert stats["by_site"][site_url]["files"] == 12
+    assert pool.get_stats()["errors"] == 1
+
+
+def test_unexpected_listing_error_ends_site(site_mocks, tmp_path):
+    (broken, broken_url), (mock, site_url) = site_mocks
+    pool = _pool(site_mocks)
+    iter_files_in_folder = pool.sites[broken_url].iter_files_in_folder
+
+    def broken_listing(*args):
+        for i, file_summary in enumerate(iter_files_in_folder(*args)):
+            if i == 2:
+                raise KeyError("ServerRelativeUrl")
+            yield file_summary
+    pool.sites[broken_url].iter_files_in_folder = broken_listing
+
+    # neither waits forever on the broken site
+    files = list(pool.iter_files("Documents"))
+    assert len([site for site, _ in files if site == broken_url]) == 2
+    assert len([site for site, _ in files if site == site_url]) == 12
+
+    stats = pool.download_files("Documents", str(tmp_path))
+    pool.close()
+    assert stats["by_site"][broken_url]["listed"] is False and stats["by_site"][broken_url]["files"] == 2
+    assert stats["by_site"][site_url]["files"] == 12
+    assert pool.get_stats()["errors"] == 2
+
+
+def test_close_cancels_queued_tasks(site_mocks):
+    (_, site_url), _ = site_mocks
+    pool = _pool(site_mocks, max_workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking(site):
+        started.set()
+        release.wait(5)
+        return "done"
+    running = pool.submit(site_url, blocking)
+    assert started.wait(5)
+    queued = pool.submit(site_url, lambda site: "queued")
+
+    closing = threading.Thread(target=pool.close)
+    closing.start()
+    # callers waiting on queued tasks return
+    assert wait([queued], timeout=5).done == {queued}
+    assert queued.cancelled()
+    release.set()
+    closing.join(5)
+
+    assert running.result() == "done"
+    assert pool.submit(site_url, blocking).cancelled()
+    assert pool.map_sites(lambda site: "late") == {url: None for _, url in site_mocks}
+
+
+def test_sessions_share_host_connections():
+    a = get_session("tenant", "https://contoso.sharepoint.com/sites/a")
+    b = get_session("tenant", "https://contoso.sharepoint.com/sites/b")
+    other = get_session("tenant", "https://fabrikam.sharepoint.com/sites/a")
+
+    assert a is not b
+    assert a.get_adapter("https://contoso.sharepoint.com") is b.get_adapter("https://contoso.sharepoint.com")
+    assert a.get_adapter("https://contoso.sharepoint.com") is not other.get_adapter("https://fabrikam.sharepoint.com")
@@ -0,0 +1,118 @@
+import threading
+import time
+import warnings
+
+import msal
+
+from vowelsharepoint.httpsession import PooledClientContext, get_session
+from vowelsharepoint.office365sdk import SharePointSite
+import vowelsharepoint.tokenmanager as tokenmanager
+from vowelsharepoint.tokenmanager import ManagedAuthenticationContext, TokenManager
+
+
+class _Acquirer:
+
+    """fake msal acquire_token_for_client, slow enough for callers to pile up"""
+
+    def __init__(self, expires_in):
+        self.expires_in = expires_in
+        self.calls = []
+
+    def __call__(self, force):
+        self.calls.append(force)
+        time.sleep(0.05)
+        return {"access_token": "token-{0}".format(len(self.calls)), "token_type": "Bearer",
+                "expires_in": self.expires_in}
+
+
+def test_concurrent_callers_share_one_refresh():
+    acquirer = _Acquirer(3600)
+    manager = TokenManager(acquirer)
+
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(manager.get_token().accessToken)) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert acquirer.calls == [False]
+    assert tokens == ["token-1"] * 20
+    stats = manager.stats()
+    assert stats["blocking_refreshes"] == 1
+    assert 3500 < stats["expires_in_secs"] <= 3600
+
+
+def test_background_refresh_before_expiry(monkeypatch):
+    # 1 sec tokens, refreshed half way through their lifetime
+    monkeypatch.setattr(tokenmanager, "Token_ExpiryMarginSecs", 0)
+    acquirer = _Acquirer(1)
+    manager = TokenManager(acquirer, refresh_before_secs=0.75)
+    manager.start()
+    try:
+        deadline = time.monotonic() + 5
+        while manager.peek_token() is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        while len(acquirer.calls) < 3 and time.monotonic() < deadline:
+            assert manager.get_token() is not None
+            time.sleep(0.01)
+    finally:
+        manager.stop()
+
+    # first token prefetched, then forced refreshes (bypassing the msal cache)
+    assert acquirer.calls[:3] == [False, True, True]
+    stats = manager.stats()
+    assert stats["blocking_refreshes"] == 0
+    assert stats["background_refreshes"] >= 3
+
+
+def test_site_requests_use_managed_token(sharepoint_mock):
+    mock, base_url = sharepoint_mock
+    site_url = base_url + "/sites/test-site-1"
+    acquirer = _Acquirer(3600)
+    manager = TokenManager(acquirer)
+
+    site = SharePointSite(site_url)
+    site.ctx = PooledClientContext(site_url, get_session(None, site_url), ManagedAuthenticationContext(site_url, manager))
+
+    assert site.check_connection_valid(site_url)
+    assert len(site.get_files_in_folder("Documents/folder10")) == 7
+    assert acquirer.calls == [False]
+    assert site.get_token_stats()["refreshes"] == 1
+
+
+def test_certificate_rotation_replaces_manager(monkeypatch):
+    credentials = []
+
+    class App:
+        def __init__(self, client_id, authority=None, client_credential=None):
+            credentials.append(client_credential["thumbprint"])
+
+    monkeypatch.setattr(msal, "ConfidentialClientApplication", App)
+    scopes = ["https://rotation.sharepoint.com/.default"]
+
+    manager = tokenmanager.get_token_manager("rotation-tenant", "client", "old", "old-pem", scopes)
+    assert tokenmanager.get_token_manager("rotation-tenant", "client", "old", "old-pem", scopes) is manager
+    manager.start()
+
+    rotated = tokenmanager.get_token_manager("rotation-tenant", "client", "new", "new-pem", scopes)
+    assert rotated is not manager and credentials == ["old", "new"]
+    # the previous manager no longer refreshes in the background
+    assert manager._thread is None
+
+
+def test_remove_client_tokens():
+    token_cache = msal.TokenCache()
+    for client_id in ("client", "other-client"):
+        token_cache.add({
+            "client_id": client_id, "scope": ["https://contoso.sharepoint.com/.default"],
+            "token_endpoint": "https://login.microsoftonline.com/tenant/oauth2/v2.0/token",
+            "response": {"access_token": "token-" + client_id, "token_type": "Bearer", "expires_in": 3600},
+        })
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        tokenmanager._remove_client_tokens(token_cache, "client")
+
+    access_tokens = token_cache._cache[msal.TokenCache.CredentialType.ACCESS_TOKEN].values()
+    assert [access_token["secret"] for access_token in access_tokens] == ["token-other-client"]
@@ -0,0 +1,106 @@
+import os
+
+import vowelsharepoint.office365sdk as office365sdk
+
+from conftest import Library_Path
+
+
+def _count(mock, operation):
+    return len([p for m, p in mock.requests if operation.lower() in p.lower()])
+
+
+def _write(path, size):
+    data = bytes((i * 7) % 256 for i in range(size))
+    with open(str(path), "wb") as local_file:
+        local_file.write(data)
+    return data
+
+
+def test_upload_file_small(site, sharepoint_mock, tmp_path):
+    mock, _ = sharepoint_mock
+    data = _write(tmp_path / "summary.txt", 1500)
+
+    summary, ok = site.upload_file(str(tmp_path / "summary.txt"), "Documents/folder1")
+
+    assert ok
+    assert summary["server_relative_url"] == Library_Path + "/folder1/summary.txt"
+    assert summary["file_size_bytes"] == 1500 and summary["chunks"] == 1
+    assert mock.content(mock.find_file(summary["server_relative_url"])) == data
+    assert _count(mock, "/Files/AddUsingPath") == 1
+    assert summary["server_relative_url"] in [f["server_relative_url"] for f in site.get_files_in_folder("Documents/folder1")]
+
+
+def test_upload_file_session(site, sharepoint_mock, tmp_path, monkeypatch):
+    mock, _ = sharepoint_mock
+    monkeypatch.setattr(office365sdk, "Upload_LargeFileSizeBytes", 1)
+    data = _write(tmp_path / "artifact.bin", 4500)
+
+    summary, ok = site.upload_file(str(tmp_path / "artifact.bin"), "Documents", chunk_size_bytes=1000,
+                                   file_name="renamed.bin")
+
+    assert ok
+    assert summary["server_relative_url"] == Library_Path + "/renamed.bin"
+    assert summary["chunks"] == 5
+    assert mock.content(mock.find_file(Library_Path + "/renamed.bin")) == data
+    assert [_count(mock, op) for op in ("/StartUpload", "/ContinueUpload", "/FinishUpload")] == [1, 3, 1]
+
+    # a new version of the file
+    data = _write(tmp_path / "artifact.bin", 2500)
+    summary, ok = site.upload_file(str(tmp_path / "artifact.bin"), "Documents", chunk_size_bytes=1000,
+                                   file_name="renamed.bin")
+    assert ok and summary["chunks"] == 3
+    assert mock.content(mock.find_file(Library_Path + "/renamed.bin")) == data
+
+
+def test_upload_chunk_retry(site, sharepoint_mock, tmp_path, monkeypatch):
+    mock, _ = sharepoint_mock
+    monkeypatch.setattr(office365sdk, "Upload_LargeFileSizeBytes", 1)
+    data = _write(tmp_path / "artifact.bin", 3500)
+
+    # 2 failed chunks, retried
+    mock.fail_chunks = 2
+    summary, ok = site.upload_file(str(tmp_path / "artifact.bin"), "Documents/folder10", chunk_size_bytes=1000)
+    assert ok
+    assert mock.content(mock.find_file(Library_Path + "/folder10/artifact.bin")) == data
+
+    # retries exhausted, the session is cancelled
+    mock.fail_chunks = office365sdk.Upload_ChunkRetries
+    summary, ok = site.upload_file(str(tmp_path / "artifact.bin"), "Documents/folder10", chunk_size_bytes=1000)
+    assert not ok and summary == {}
+    assert _count(mock, "/CancelUpload") == 1
+    assert mock.uploads == {}
+
+
+def test_upload_folder(site, sharepoint_mock, tmp_path, monkeypatch):
+    mock, _ = sharepoint_mock
+    monkeypatch.setattr(office365sdk, "Upload_LargeFileSizeBytes", 3000)
+    local_path = tmp_path / "out"
+    os.makedirs(str(local_path / "reports" / "2024"))
+    _write(local_path / "index.txt", 100)
+    _write(local_path / "reports" / "a.txt", 200)
+    big = _write(local_path / "reports" / "2024" / "b.bin", 5000)
+
+    results, stats = site.upload_folder(str(local_path), "Documents/folder10", max_workers=3, chunk_size_bytes=2048)
+
+    assert stats["files"] == 3 and stats["failed"] == 0 and stats["bytes"] == 5300
+    assert [summary["server_relative_url"] for summary, ok in results] == [
+        Library_Path + "/folder10/index.txt", Library_Path + "/folder10/reports/a.txt",
+        Library_Path + "/folder10/reports/2024/b.bin"]
+    assert results[2][0]["chunks"] == 3
+    assert mock.content(mock.find_file(Library_Path + "/folder10/reports/2024/b.bin")) == big
+    assert site.get_folder("Documents/folder10/reports/2024")["server_relative_url"] == Library_Path + "/folder10/reports/2024"
+    assert len(site.get_files_in_folder("Documents/folder10/reports")) == 2
+
+
+def test_upload_invalid_input(site, sharepoint_mock, tmp_path):
+    _write(tmp_path / "a.txt", 10)
+
+    assert site.upload_file(str(tmp_path / "missing.txt"), "Documents") == ({}, False)
+    assert site.upload_file(str(tmp_path / "a.txt"), "") == ({}, False)
+    assert site.upload_file(str(tmp_path / "a.txt"), "Documents/missing-folder") == ({}, False)
+    assert site.upload_file(str(tmp_path / "a.txt"), "Missing") == ({}, False)
+    assert site.upload_folder(str(tmp_path / "missing"), "Documents")[0] == []
+
+    # existing file, no overwrite
+    summary, ok = site.upload_file(str(tmp_path / "a.txt"), "Documents/folder1", overwrite=False, file_name="file-00.docx")
+    assert not ok
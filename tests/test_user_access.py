@@ -0,0 +1,68 @@
+from conftest import Library_Path
+
+File_Path = Library_Path + "/folder1/file-01.docx"
+
+
+def test_check_user_access_for_file(site):
+    assert site.check_user_access_for_file("alice@contoso.com", File_Path, "OPEN_ITEMS") == True
+    assert site.check_user_access_for_file("bob@contoso.com", File_Path, "OPEN_ITEMS") == False
+    assert site.check_user_access_for_file("nobody@contoso.com", File_Path, "OPEN_ITEMS") == False
+    assert site.check_user_access_for_file("alice@contoso.com", Library_Path + "/missing.docx", "OPEN_ITEMS") == False
+
+
+def test_check_user_access_for_file_cached(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    site.enable_access_cache(ttl_secs=60, max_entries=100)
+
+    assert site.check_user_access_for_file("alice@contoso.com", File_Path, "OPEN_ITEMS") == True
+    requests_after_first_check = len(mock.requests)
+
+    for i in range(5):
+        assert site.check_user_access_for_file("Alice@contoso.com", File_Path, "OPEN_ITEMS") == True
+    assert len(mock.requests) == requests_after_first_check
+
+    # user and file item are reused for a new file/user pair, only the permission is requested
+    assert site.check_user_access_for_file("alice@contoso.com", Library_Path + "/folder10/file-01.docx", "OPEN_ITEMS") == False
+    assert site.check_user_access_for_file("bob@contoso.com", File_Path, "OPEN_ITEMS") == False
+    stats = site.get_access_cache_stats()
+    assert stats["permissions"]["hits"] == 5
+    assert stats["users"]["hits"] == 1
+    assert stats["items"]["hits"] == 1
+
+    # revoked grant is served until invalidated
+    mock.grants.clear()
+    assert site.check_user_access_for_file("alice@contoso.com", File_Path, "OPEN_ITEMS") == True
+    assert site.invalidate_access_cache(file_path=File_Path) == 3
+    assert site.check_user_access_for_file("alice@contoso.com", File_Path, "OPEN_ITEMS") == False
+
+
+def test_check_user_access_for_file_cache_expiry(site, sharepoint_mock):
+    mock, _ = sharepoint_mock
+    site.enable_access_cache(ttl_secs=0)
+
+    assert site.check_user_access_for_file("alice@contoso.com", File_Path, "OPEN_ITEMS") == True
+    mock.grants.clear()
+    assert site.check_user_access_for_file("alice@contoso.com", File_Path, "OPEN_ITEMS") == False
+
+
+def test_check_user_access_for_files_batched(site, sharepoint_mock, monkeypatch):
+    import vowelsharepoint.office365sdk as office365sdk
+    mock, _ = sharepoint_mock
+    monkeypatch.setattr(office365sdk, "Batch_MaxRequests", 4)
+    file_paths = [f["server_relative_url"] for f in mock.files[25:35]] + [Library_Path + "/missing.docx"]
+
+    access_by_path = site.check_user_access_for_files("alice@contoso.com", file_paths, "OPEN_ITEMS")
+
+    assert access_by_path == {
+        file_path: "/folder1/" in file_path and not file_path.endswith("missing.docx") for file_path in file_paths
+    }
+    assert list(access_by_path.values()).count(True) == 5
+    # one user lookup, 11 checks in 3 $batch requests
+    assert len([p for m, p in mock.requests if p.endswith("/$batch")]) == 3
+    assert len([p for m, p in mock.requests if m.startswith("BATCH")]) == 11
+    assert len([p for m, p in mock.requests if not m.startswith("BATCH")]) == 4
+
+
+def test_check_user_access_for_files_missing_user(site):
+    access_by_path = site.check_user_access_for_files("nobody@contoso.com", [File_Path], "OPEN_ITEMS")
+    assert access_by_path == {File_Path: False}
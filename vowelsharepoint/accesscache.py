@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+
+from typing import Any
+
+AccessCache_TTLSecs = 300
+AccessCache_MaxEntries = 10000
+
+# cache tiers used by SharePointSite.check_user_access_for_file(...)
+Users = "users"              # user_email -> User principal
+Items = "items"              # file_path -> ListItem
+Permissions = "permissions"  # (user_email, file_path) -> BasePermissions mask
+
+_Missing = object()
+
+
+class TTLCache:
+
+    """
+    thread safe, size bounded LRU cache where each entry expires ttl_secs after it was set
+    """
+
+    def __init__(self, ttl_secs=AccessCache_TTLSecs, max_entries=AccessCache_MaxEntries) -> Any:
+
+        self.ttl_secs = ttl_secs
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict() # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None) -> Any:
+        """
+        gets value for key, if present and not expired
+
+        Returns: value on hit, default on miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _Missing)
+            if entry is not _Missing and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _Missing:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value) -> None:
+        """
+        sets value for key, evicting least recently used entries above max_entries
+        """
+        expires_at = time.monotonic() + self.ttl_secs
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, match=None) -> int:
+        """
+        removes entries. match: optional, callable(key) -> bool, all entries if not provided
+
+        Returns: number of entries removed
+        """
+        with self._lock:
+            if match is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            keys = [key for key in self._entries if match(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class AccessCache:
+
+    """
+    caches the lookups made by an access check, in separate tiers:
+    users (email -> user principal), items (path -> list item), permissions ((email, path) -> permission mask).
+    Emails are matched case insensitively.
+    """
+
+    def __init__(self, ttl_secs=AccessCache_TTLSecs, max_entries=AccessCache_MaxEntries) -> Any:
+
+        self.tiers = {
+            Users: TTLCache(ttl_secs, max_entries),
+            Items: TTLCache(ttl_secs, max_entries),
+            Permissions: TTLCache(ttl_secs, max_entries),
+        }
+
+    def get_user(self, user_email) -> Any:
+        return self.tiers[Users].get(user_email.lower())
+
+    def set_user(self, user_email, user) -> None:
+        self.tiers[Users].set(user_email.lower(), user)
+
+    def get_item(self, file_path) -> Any:
+        return self.tiers[Items].get(file_path)
+
+    def set_item(self, file_path, item) -> None:
+        self.tiers[Items].set(file_path, item)
+
+    def get_permissions(self, user_email, file_path) -> Any:
+        return self.tiers[Permissions].get((user_email.lower(), file_path))
+
+    def set_permissions(self, user_email, file_path, permissions) -> None:
+        self.tiers[Permissions].set((user_email.lower(), file_path), permissions)
+
+    def invalidate(self, user_email=None, file_path=None) -> int:
+        """
+        removes cached entries for user_email and/or file_path, everything if neither is provided.
+        Eg. after a permission change on a file, invalidate(file_path=...)
+
+        Returns: number of entries removed
+        """
+        if user_email is None and file_path is None:
+            return sum(tier.invalidate() for tier in self.tiers.values())
+
+        removed = 0
+        if user_email is not None:
+            user_email = user_email.lower()
+            removed += self.tiers[Users].invalidate(lambda key: key == user_email)
+        if file_path is not None:
+            removed += self.tiers[Items].invalidate(lambda key: key == file_path)
+        removed += self.tiers[Permissions].invalidate(
+            lambda key: (user_email is None or key[0] == user_email) and (file_path is None or key[1] == file_path)
+        )
+        return removed
+
+    def stats(self) -> dict:
+        """
+        Returns: dict of tier -> {entries, hits, misses, evictions}
+        """
+        return {name: tier.stats() for name, tier in self.tiers.items()}
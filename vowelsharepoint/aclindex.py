@@ -0,0 +1,218 @@
+import json
+import time
+
+from typing import Any
+
+from vowelsharepoint.instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+# claims of the built-in "Everyone" / "Everyone except external users" principals,
+# granted to any user of the site
+Everyone_LoginNames = ("c:0(.s|true", "c:0-.f|rolemanager|spo-grid-all-users")
+
+AclIndex_Version = 1
+
+
+class AclIndex:
+
+    """
+    in-memory snapshot of the permissions of one document library, built by SharePointSite.build_acl_index(...)
+    and kept fresh by SharePointSite.refresh_acl_index(...).
+    Answers check_user_access_for_file(..., "OPEN_ITEMS") locally:
+    an item's permission scope is its own (unique role assignments) or the nearest parent folder's with
+    unique role assignments, else the library's. A scope is the set of principals (users, site groups)
+    granted a role with PermissionKind.OpenItems.
+
+    Note: members of Azure AD security groups granted directly are not expanded (SharePoint REST
+    does not list them), use check_user_access_for_file(...) for those users.
+    """
+
+    def __init__(self, site_url=None, doc_lib=None) -> Any:
+
+        self.site_url = site_url
+        self.doc_lib = doc_lib
+        self.change_token = None  # list change token the snapshot is current to
+        self.built_at = None      # epoch secs
+        self.refreshed_at = None  # epoch secs
+
+        self.list_scope = frozenset()  # principal ids for items inheriting from the library
+        # urls are case insensitive, path keys are lower case
+        self.unique_scopes = {}        # server relative url (lower case) -> frozenset principal ids
+        self.items = {}                # item id -> server relative url (files and folders)
+        self.paths = {}                # server relative url (lower case) -> item id
+        self.users = {}                # email (lower case) -> user id
+        self.groups = {}               # group id -> frozenset user ids
+        self.everyone = frozenset()    # principal ids granted to every user
+
+        self._user_principals = {}     # user id -> frozenset of user id, group ids and everyone ids
+        self._scopes = {}              # interned scopes, frozenset -> the shared frozenset
+
+    def has_access(self, user_email, file_path) -> bool:
+        """
+        checks if user has OpenItems access to the file, without any SharePoint request
+        user_email: Azure AD principal for user
+        file_path: file path relative to sharepoint site Eg./sites/test-site-1/Shared Documents/sharepoint-doc.docx
+
+        Return: True if user has access, False for unknown users and files
+        """
+        if not user_email or not file_path:
+            return False
+
+        user_id = self.users.get(user_email.lower())
+        if user_id is None or file_path.lower() not in self.paths:
+            return False
+
+        principals = self._user_principals.get(user_id)
+        if principals is None:
+            principals = self._get_user_principals(user_id)
+
+        return not principals.isdisjoint(self.get_scope(file_path))
+
+    def get_scope(self, path) -> frozenset:
+        """
+        Returns: principal ids of the nearest unique scope for path (itself or a parent folder), else the list scope
+        """
+        path = path.lower()
+        while path:
+            scope = self.unique_scopes.get(path)
+            if scope is not None:
+                return scope
+            path = path.rsplit('/', 1)[0]
+        return self.list_scope
+
+    ################################### Update functions (used by SharePointSite) ###################
+
+    def set_principals(self, users, groups, everyone) -> None:
+        """
+        users: dict email -> user id, groups: dict group id -> user ids, everyone: principal ids
+        """
+        self.users = {email.lower(): user_id for email, user_id in users.items()}
+        self.groups = {group_id: frozenset(user_ids) for group_id, user_ids in groups.items()}
+        self.everyone = frozenset(everyone)
+        self._user_principals = {}
+
+    def set_item(self, item_id, path, unique_scope=None) -> None:
+        """
+        adds or updates an item, moving the unique scopes and items under it if a folder path changed.
+        unique_scope: principal ids if the item has unique role assignments, None if it inherits
+        """
+        key = path.lower()
+        old_path = self.items.get(item_id)
+        if old_path is not None and old_path.lower() != key:
+            self._move(old_path, path)
+
+        self.items[item_id] = path
+        self.paths[key] = item_id
+        if unique_scope is None:
+            self.unique_scopes.pop(key, None)
+        else:
+            self.unique_scopes[key] = self._intern(unique_scope)
+
+    def remove_item(self, item_id) -> None:
+        """
+        removes an item, and every item under it for a folder
+        """
+        path = self.items.pop(item_id, None)
+        if path is None:
+            return
+        key = path.lower()
+        prefix = key + "/"
+        for child_path in [p for p in self.paths if p == key or p.startswith(prefix)]:
+            child_id = self.paths.pop(child_path)
+            self.items.pop(child_id, None)
+            self.unique_scopes.pop(child_path, None)
+
+    def set_list_scope(self, principals) -> None:
+        self.list_scope = self._intern(principals)
+
+    ################################### Persistence ###################################
+
+    def save(self, file_name) -> None:
+        """
+        persists the index as json to file_name
+        """
+        data = {
+            "version": AclIndex_Version,
+            "site_url": self.site_url,
+            "doc_lib": self.doc_lib,
+            "change_token": self.change_token,
+            "built_at": self.built_at,
+            "refreshed_at": self.refreshed_at,
+            "list_scope": sorted(self.list_scope),
+            "unique_scopes": {path: sorted(scope) for path, scope in self.unique_scopes.items()},
+            "items": {str(item_id): path for item_id, path in self.items.items()},
+            "users": self.users,
+            "groups": {str(group_id): sorted(user_ids) for group_id, user_ids in self.groups.items()},
+            "everyone": sorted(self.everyone),
+        }
+        with open(file_name, "w") as f:
+            json.dump(data, f)
+
+    @staticmethod
+    def load(file_name) -> "AclIndex":
+        """
+        loads an index persisted with save(...)
+
+        Returns: AclIndex, None if file_name is not a compatible index
+        """
+        with open(file_name, "r") as f:
+            data = json.load(f)
+
+        if data.get("version") != AclIndex_Version:
+            logger.warning("invalid input:unsupported acl index version: %s", data.get("version"))
+            return None
+
+        index = AclIndex(data["site_url"], data["doc_lib"])
+        index.change_token = data["change_token"]
+        index.built_at = data["built_at"]
+        index.refreshed_at = data["refreshed_at"]
+        index.set_principals(
+            data["users"], {int(group_id): user_ids for group_id, user_ids in data["groups"].items()}, data["everyone"]
+        )
+        index.set_list_scope(data["list_scope"])
+        for item_id, path in data["items"].items():
+            index.items[int(item_id)] = path
+            index.paths[path.lower()] = int(item_id)
+        for path, scope in data["unique_scopes"].items():
+            index.unique_scopes[path.lower()] = index._intern(scope)
+        return index
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self.items),
+            "unique_scopes": len(self.unique_scopes),
+            "users": len(self.users),
+            "groups": len(self.groups),
+            "change_token": self.change_token,
+            "age_secs": time.time() - (self.refreshed_at or self.built_at or time.time()),
+        }
+
+    ################################### Internal functions #################################
+
+    def _get_user_principals(self, user_id) -> frozenset:
+        principals = {user_id}
+        principals.update(group_id for group_id, user_ids in self.groups.items() if user_id in user_ids)
+        principals.update(self.everyone)
+        principals = frozenset(principals)
+        self._user_principals[user_id] = principals
+        return principals
+
+    def _intern(self, principals) -> frozenset:
+        # identical scopes (common when permissions are broken per folder) share one frozenset, one lookup per item
+        principals = frozenset(principals)
+        return self._scopes.setdefault(principals, principals)
+
+    def _move(self, old_path, new_path) -> None:
+        old_key, new_key = old_path.lower(), new_path.lower()
+        prefix = old_key + "/"
+        for key in [p for p in self.paths if p.startswith(prefix)]:
+            item_id = self.paths.pop(key)
+            moved_path = new_path + self.items[item_id][len(old_path):]
+            self.paths[moved_path.lower()] = item_id
+            self.items[item_id] = moved_path
+            if key in self.unique_scopes:
+                self.unique_scopes[moved_path.lower()] = self.unique_scopes.pop(key)
+        self.paths.pop(old_key, None)
+        if old_key in self.unique_scopes:
+            self.unique_scopes[new_key] = self.unique_scopes.pop(old_key)
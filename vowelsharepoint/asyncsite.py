@@ -0,0 +1,623 @@
+import asyncio
+import datetime
+import os
+import time
+from urllib.parse import quote
+
+try:
+    import aiohttp
+    # failed requests (error status, connection errors, timeouts), mapped to the error results of the sync API
+    _Request_Errors = (aiohttp.ClientError, asyncio.TimeoutError)
+except ImportError:  # optional dependency, pip install vowelsharepoint[async]
+    aiohttp = None
+    _Request_Errors = ()
+
+from office365.runtime.http.request_options import RequestOptions
+from office365.sharepoint.files.system_object_type import FileSystemObjectType
+from office365.sharepoint.permissions.kind import PermissionKind
+from office365.sharepoint.views.scope import ViewScope
+
+from typing import Any, AsyncIterator
+
+from vowelsharepoint.instrumentation import get_logger, record_request
+import vowelsharepoint.office365sdk as office365sdk
+from vowelsharepoint.office365sdk import SharePointSite, File_SummaryFields, _get_content_range_size, _to_base_permissions
+from vowelsharepoint.ratelimit import Throttle_MaxRetries, Throttle_StatusCodes, get_retry_after_secs
+from vowelsharepoint.tokenmanager import ManagedAuthenticationContext
+
+logger = get_logger(__name__)
+
+# connections shared by all in-flight requests of an AsyncSharePointSite
+Async_MaxConnections = 100
+Async_MaxConnectionsPerHost = 0  # 0 = no per host limit, bounded by Async_MaxConnections
+
+_Verbose_Json = "application/json;odata=verbose"
+
+
+class AsyncSharePointSite:
+
+    """
+    asyncio counterpart of SharePointSite: coroutines for connection, folder and file listing,
+    downloads and access checks, sent over one aiohttp session (connection pool shared by all
+    in-flight requests). Authentication reuses the office365 SDK context of a SharePointSite,
+    a token is only acquired (in a worker thread) when missing or rejected. The SDK context is not
+    thread safe, its worker thread calls run one at a time. Requests share the site's RateLimiter
+    (and Retry-After pauses) with the sync client, and are recorded like its requests (see instrumentation).
+
+    Usage:
+        async with AsyncSharePointSite(site_url) as site:
+            await site.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem)
+            files = await site.get_files_in_folder("Documents/sharepoint-test-folder1")
+    """
+
+    async def connect_with_client_certificate(self, tenant_id=None, client_id=None, cert_thumbprint=None, cert_pem=None) -> bool:
+        """
+        create new context/connection to this Sharepoint site using certificate credentials,
+        see SharePointSite.connect_with_client_certificate(...)
+
+        Return: True on success
+        """
+        # loads the certificate and prefetches the token (blocking), off the event loop
+        async with self._sdk_lock:
+            if not await asyncio.to_thread(self.site.connect_with_client_certificate,
+                                           tenant_id, client_id, cert_thumbprint, cert_pem):
+                return False
+
+        self._auth_headers = None
+        return True
+
+    async def check_connection_valid(self, siteurl) -> bool:
+        """
+        checks if the existing context/connection is valid for provided site_url
+
+        Return: True on success
+        """
+
+        if self.ctx is None:
+            logger.error("invalid context")
+            return False
+
+        try:
+            web = await self._request_json("GET", self._service_root_url() + "/web?$select=Url")
+        except _Request_Errors as e:
+            logger.error("invalid context for site: %s", e)
+            return False
+
+        site = web.get("Url")
+        logger.debug("site: %s", site)
+        if not site or site.lower() != siteurl.lower():
+            logger.error("invalid context for site")
+            return False
+
+        return True
+
+    async def get_doc_lib(self, list_title) -> Any:
+        """
+        get list summary.
+        list_title: List Title for the Document Library (as recognized by Sharepoint)
+
+        Returns: dict on success, None on error
+        """
+
+        url = "{0}/RootFolder?$select=ServerRelativeUrl,TimeLastModified,StorageMetrics&$expand=StorageMetrics".format(
+            self._get_list_url(list_title))
+        try:
+            root_folder = await self._request_json("GET", url)
+        except _Request_Errors as e:
+            logger.error("doc_lib: %s %s", list_title, e)
+            return None
+
+        return self._get_folder_summary(root_folder, root_folder["StorageMetrics"]["TotalSize"])
+
+    async def get_folder(self, input_path) -> Any:
+        """
+        get folder summary.
+        input_path: Folder path, starting at Document Library for Eg. Documents/sharepoint-test-folder1
+
+        Returns: dict on success, None if the folder does not exist
+        """
+
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return None
+
+        doc_lib = self.site._get_doclib_from_inputpath(input_path)
+        folder_path = await self._get_folderpath_from_inputpath(input_path)
+
+        # Eg input_path=Documents (doclib only usecase)
+        if not folder_path:
+            return await self.get_doc_lib(doc_lib)
+
+        url = (
+            "{0}/web/GetFolderByServerRelativePath(decodedurl='{1}')"
+            "?$select=ServerRelativeUrl,TimeLastModified,StorageMetrics&$expand=StorageMetrics"
+        ).format(self._service_root_url(), _quote_path(self.site._get_server_relative_url(folder_path)))
+        try:
+            folder = await self._request_json("GET", url)
+        except _Request_Errors as e:
+            if getattr(e, "status", None) == 404:
+                logger.warning("folder:%s does not belong to site", input_path)
+                return None
+            logger.error("folder: %s %s", input_path, e)
+            return None
+
+        return self._get_folder_summary(folder, folder["StorageMetrics"]["TotalFileStreamSize"])
+
+    async def get_files_in_folder(self, input_path, tag_column_name=None, modified_after=None) -> Any:
+        """
+        get all files under given folder (including files under sub folders).
+        see SharePointSite.get_files_in_folder(...)
+
+        Returns []dict on success
+        """
+
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return None
+
+        return [f async for f in self.iter_files_in_folder(input_path, tag_column_name, modified_after)]
+
+    async def iter_files_in_folder(self, input_path, tag_column_name=None, modified_after=None, page_size=None) -> AsyncIterator[dict]:
+        """
+        iterate all files under given folder (including files under sub folders), one page per request.
+        see SharePointSite.iter_files_in_folder(...)
+
+        Yields: dict per file, as returned by get_files_in_folder(...)
+        """
+
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return
+
+        doc_lib = self.site._get_doclib_from_inputpath(input_path)
+        folder_path = await self._get_folderpath_from_inputpath(input_path)
+        list_url = self._get_list_url(doc_lib)
+
+        tag_column_name_internal = ""
+        if tag_column_name:
+            tag_column_name_internal = await self._get_lib_field_internal(list_url, tag_column_name)
+
+        folder_server_relative_url = None
+        if folder_path:
+            folder_server_relative_url = self.site._get_server_relative_url(folder_path)
+
+        select = ["Id", "FileSystemObjectType"] + File_SummaryFields
+        if tag_column_name_internal:
+            select.append(tag_column_name_internal)
+        url = "{0}/GetItems?$select={1}&$expand=File".format(list_url, ",".join(select))
+
+        page_size = min(page_size or office365sdk.ListItems_PageSize, office365sdk.ListView_Threshold)
+        last_item_id = None
+        while True:
+            qry = self.site._get_folder_items_query(
+                folder_server_relative_url, modified_after, last_item_id, page_size, ViewScope.Recursive
+            )
+            page = (await self._request_json("POST", url, {"query": _to_caml_query_json(qry)}))["results"]
+
+            for item in page:
+                if item["FileSystemObjectType"] == FileSystemObjectType.File:
+                    yield self._get_file_summary(item, tag_column_name_internal)
+            if page:
+                last_item_id = page[-1]["Id"]
+            if len(page) < page_size:
+                break
+
+    async def download_file(self, input_path, input_size_bytes, download_path,
+                            chunk_size_bytes=office365sdk.Download_ChunkSizeBytes,
+                            max_workers=office365sdk.Download_MaxWorkers) -> (dict, bool):
+        """
+        download file provided at input_path to download_path, large files as concurrent byte ranges.
+        see SharePointSite.download_file(...)
+
+        Returns: Dict of downloaded file details, bool
+                 Caller to check bool for success/failure detection
+        """
+
+        file_download_summary = {}
+
+        if not os.path.isdir(download_path):
+            logger.warning("Provided download_path does not exist")
+            return file_download_summary, False
+
+        url = "{0}/web/GetFileByServerRelativePath(decodedurl='{1}')?$select=Length".format(
+            self._service_root_url(), _quote_path(input_path))
+        try:
+            expected_size = int((await self._request_json("GET", url))["Length"])
+        except _Request_Errors as e:
+            logger.warning("file:%s does not belong to site: %s", input_path, e)
+            return file_download_summary, False
+
+        # byte ranges are computed from the size on the server, never from a stale listed size
+        if input_size_bytes and int(input_size_bytes) != expected_size:
+            logger.error("file size mismatch: %s,size:%s bytes,expected:%s bytes (changed since listed)",
+                         input_path, expected_size, input_size_bytes)
+            return file_download_summary, False
+
+        local_file_name = os.path.join(download_path, os.path.basename(input_path))
+        content_url = self.site._get_file_content_url(input_path)
+        if not await self._download_content(content_url, local_file_name, expected_size, chunk_size_bytes, max_workers):
+            return file_download_summary, False
+
+        file_download_summary = {
+            "file_name": local_file_name,
+            "file_size_bytes": expected_size,
+        }
+        return file_download_summary, True
+
+    async def check_user_access_for_file(self, user_email, file_path, access) -> bool:
+        """
+        checks if user has provided access to the file
+        user_email: Azure AD principal for user
+        file_path: file path relative to sharepoint site Eg./sites/test-site-1/Shared Documents/sharepoint-doc.docx
+        access: OPEN_ITEMS
+
+        Return: True on success
+        """
+
+        if not user_email:
+            logger.warning("invalid input:missing user_email")
+            return False
+
+        if not file_path:
+            logger.warning("invalid input:missing file_path")
+            return False
+
+        if access != "OPEN_ITEMS": access = "OPEN_ITEMS" #only supported type for now
+        if access == "OPEN_ITEMS":
+            permission_kind = PermissionKind.OpenItems
+
+        service_root_url = self._service_root_url()
+        try:
+            user = await self._request_json(
+                "GET", "{0}/web/siteUsers/GetByEmail('{1}')".format(service_root_url, quote(user_email.replace("'", "''")))
+            )
+        except _Request_Errors as e:
+            logger.warning("user:%s does not belong to site: %s", user_email, e)
+            return False
+
+        url = (
+            "{0}/web/GetFileByServerRelativePath(decodedurl='{1}')"
+            "/ListItemAllFields/GetUserEffectivePermissions(@user)?@user='{2}'"
+        ).format(service_root_url, _quote_path(file_path), quote(user["LoginName"].replace("'", "''"), safe=""))
+        try:
+            result = await self._request_json("GET", url)
+        except _Request_Errors as e:
+            logger.error("user access check failed: %s %s %s", user["LoginName"], file_path, e)
+            return False
+
+        return self.site._has_permission(
+            _to_base_permissions(result.get("GetUserEffectivePermissions", result)), permission_kind, user_email, file_path
+        )
+
+    async def close(self) -> None:
+        """
+        closes the HTTP session (and its pooled connections), if owned by this site
+        """
+        if self.session is not None and self._owns_session:
+            await self.session.close()
+        self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def ctx(self):
+        return self.site.ctx
+
+    @ctx.setter
+    def ctx(self, ctx):
+        self.site.ctx = ctx
+        self._auth_headers = None
+
+    ################################### Internal functions #################################
+
+    def _service_root_url(self) -> str:
+        return self.ctx.service_root_url()
+
+    def _get_list_url(self, list_title) -> str:
+        return self.site._get_list_url(list_title)
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        # created on first use, inside the running event loop
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=Async_MaxConnectionsPerHost)
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=office365sdk.Download_TimeoutSecs)
+            )
+            self._owns_session = True
+        return self.session
+
+    async def _get_folderpath_from_inputpath(self, input_path) -> str:
+        # the library root folder mapping is resolved (once per site) by the SDK context, off the event loop
+        async with self._sdk_lock:
+            return await asyncio.to_thread(self.site._get_folderpath_from_inputpath, input_path)
+
+    async def _get_auth_headers(self, rejected_headers=None) -> dict:
+        """
+        authorization headers from the SDK context, acquired in a worker thread (token requests block)
+        rejected_headers: optional, headers of a request rejected with a 401, a new token is acquired
+        """
+        auth_context = self.ctx.authentication_context
+        if isinstance(auth_context, ManagedAuthenticationContext):
+            token_manager = auth_context.token_manager
+            if rejected_headers is not None:
+                # the rejected token may not be expired yet, the token manager would serve it again
+                rejected_token = rejected_headers.get("Authorization", "").partition(" ")[2]
+                token = await asyncio.to_thread(token_manager.refresh_token, rejected_token)
+            else:
+                # token kept fresh in the background, only wait (in a thread) when it is missing or expiring
+                token = token_manager.peek_token() or await asyncio.to_thread(token_manager.get_token)
+            return {"Authorization": "{0} {1}".format(token.tokenType, token.accessToken)}
+
+        if self._auth_headers is None or rejected_headers is not None:
+            # other contexts (Eg. with_access_token(...)) keep their own token
+            request = RequestOptions(self._service_root_url())
+            async with self._sdk_lock:
+                await asyncio.to_thread(auth_context.authenticate_request, request)
+            self._auth_headers = dict(request.headers)
+        return self._auth_headers
+
+    async def _get_form_digest(self) -> str:
+        """
+        form digest for POST requests, cached until it expires
+        """
+        if self._form_digest is None or time.monotonic() >= self._form_digest_expires_at:
+            info = (await self._request_json("POST", self._service_root_url() + "/contextinfo", digest=False))
+            info = info.get("GetContextWebInformation", info)
+            self._form_digest = info["FormDigestValue"]
+            self._form_digest_expires_at = time.monotonic() + int(info["FormDigestTimeoutSeconds"]) - 60
+        return self._form_digest
+
+    async def _request(self, method, url, headers=None, json_body=None, digest=True) -> "aiohttp.ClientResponse":
+        """
+        authenticated request, paced by the site's RateLimiter (shared with the sync client, see ThrottledSession).
+        Throttled responses (429/503) slow the limiter down and are retried after their Retry-After,
+        up to Throttle_MaxRetries, a rejected token (401) is replaced and the request retried once.
+        Every attempt is recorded (see instrumentation.record_request(...)). Caller releases the response.
+
+        Returns: aiohttp.ClientResponse, raises aiohttp.ClientResponseError on error status
+        """
+        request_headers = {"Accept": _Verbose_Json}
+        if method == "POST":
+            request_headers["Content-Type"] = _Verbose_Json
+            if digest:
+                request_headers["X-RequestDigest"] = await self._get_form_digest()
+        request_headers.update(headers or {})
+        request_headers.update(await self._get_auth_headers())
+
+        rate_limiter = self.site.session.rate_limiter
+        attempt = 0
+        reauthenticated = False
+        while True:
+            # never blocks the event loop, the wait for a token (or a Retry-After pause) is awaited
+            await asyncio.sleep(rate_limiter.reserve())
+            start = time.perf_counter()
+            try:
+                response = await self._get_session().request(method, url, headers=request_headers, json=json_body)
+            except _Request_Errors:
+                record_request(method, url, None, time.perf_counter() - start, 0, retry=attempt > 0)
+                raise
+            throttled = response.status in Throttle_StatusCodes
+            record_request(method, url, response.status, time.perf_counter() - start,
+                           response.content_length or 0, throttled, attempt > 0)
+
+            if throttled:
+                rate_limiter.on_throttled(get_retry_after_secs(response))
+                if attempt >= Throttle_MaxRetries:
+                    break
+                attempt += 1
+                logger.warning("throttled: %s %s %s, retry: %s", response.status, method, url, attempt)
+                response.release()
+                continue
+
+            rate_limiter.on_success()
+            if response.status != 401 or reauthenticated:
+                break
+            reauthenticated = True
+            attempt += 1
+            response.release()
+            request_headers.update(await self._get_auth_headers(request_headers))
+
+        if response.status >= 400:
+            response.release()
+            response.raise_for_status()
+        return response
+
+    async def _request_json(self, method, url, json_body=None, digest=True) -> dict:
+        """
+        Returns: json "d" payload of the response
+        """
+        response = await self._request(method, url, json_body=json_body, digest=digest)
+        async with response:
+            return (await response.json(content_type=None))["d"]
+
+    async def _get_lib_field_internal(self, list_url, field_ext_name) -> str:
+        """
+        gets field_internal_name from input field_ext_name
+
+        Returns: field_internal_name if found, "" on error
+        """
+        fields = await self._request_json("GET", list_url + "/fields?$select=Title,InternalName")
+        for field in fields["results"]:
+            if field["Title"] == field_ext_name:
+                return field["InternalName"]
+
+        logger.warning("invalid input:column not found in Sharepoint: %s", field_ext_name)
+        return ""
+
+    async def _download_content(self, content_url, local_file_name, expected_size, chunk_size_bytes, max_workers) -> bool:
+        """
+        downloads content_url into local_file_name, as concurrent byte ranges for large files,
+        and verifies the size against expected_size (the size on the server). Content is written to a part file,
+        renamed to local_file_name once complete and removed on failure, so local_file_name is never left partial.
+        Local file io (open, preallocation, writes, rename) runs in worker threads, never on the event loop.
+
+        Returns: True on success
+        """
+        part_file_name = local_file_name + office365sdk.Download_PartSuffix
+        fd = await asyncio.to_thread(os.open, part_file_name, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            if expected_size >= office365sdk.Download_LargeFileSizeBytes and chunk_size_bytes and expected_size > chunk_size_bytes:
+                ranges = [(start, min(start + chunk_size_bytes, expected_size) - 1)
+                          for start in range(0, expected_size, chunk_size_bytes)]
+                semaphore = asyncio.Semaphore(max_workers)
+
+                await asyncio.to_thread(os.ftruncate, fd, expected_size)
+                results = await asyncio.gather(
+                    *[self._download_range(content_url, fd, start, end, expected_size, semaphore) for start, end in ranges]
+                )
+                ok = all(results)
+                if not ok:
+                    logger.error("file download failed: %s,%s of %s chunks failed",
+                                 local_file_name, results.count(False), len(ranges))
+            else:
+                ok = await self._download_stream(content_url, local_file_name, fd, expected_size)
+        finally:
+            await asyncio.to_thread(os.close, fd)
+
+        if ok:
+            file_size = (await asyncio.to_thread(os.stat, part_file_name)).st_size
+            if file_size != expected_size:
+                logger.error("file size mismatch: %s,size:%s bytes,expected:%s bytes",
+                             local_file_name, file_size, expected_size)
+                ok = False
+
+        if not ok:
+            await asyncio.to_thread(os.remove, part_file_name)
+            return False
+
+        await asyncio.to_thread(os.replace, part_file_name, local_file_name)
+        logger.info("file has been downloaded: %s,size:%s bytes", local_file_name, expected_size)
+        return True
+
+    async def _download_stream(self, content_url, local_file_name, fd, expected_size) -> bool:
+        """
+        streams content_url into fd, the Content-Length of the response is checked against expected_size
+
+        Returns: True on success
+        """
+        try:
+            response = await self._request("GET", content_url, headers={"Accept": "*/*"})
+            async with response:
+                if response.content_length is not None and response.content_length != expected_size:
+                    logger.error("file download of a changed file: %s,size:%s bytes,expected:%s bytes",
+                                 local_file_name, response.content_length, expected_size)
+                    return False
+                await self._write_content(response, fd, 0)
+        except _Request_Errors as e:
+            logger.error("file download failed: %s: %s", local_file_name, e)
+            return False
+        return True
+
+    async def _download_range(self, content_url, fd, start, end, file_size, semaphore) -> bool:
+        """
+        downloads bytes start-end (inclusive) of content_url into fd at offset start,
+        retrying the range up to Download_ChunkRetries times.
+        The complete size in the Content-Range of the response is checked against file_size.
+
+        Returns: True on success
+        """
+        async with semaphore:
+            for retry in range(1, office365sdk.Download_ChunkRetries + 1):
+                try:
+                    response = await self._request(
+                        "GET", content_url, headers={"Accept": "*/*", "Range": "bytes={0}-{1}".format(start, end)}
+                    )
+                    async with response:
+                        if response.status != 206:
+                            raise ValueError("byte range not supported, status:{0}".format(response.status))
+                        content_size = _get_content_range_size(response.headers.get("Content-Range"))
+                        if content_size is not None and content_size != file_size:
+                            logger.error("chunk %s-%s of a changed file: size:%s bytes,expected:%s bytes",
+                                         start, end, content_size, file_size)
+                            return False
+
+                        offset = await self._write_content(response, fd, start)
+                    if offset == end + 1:
+                        return True
+                    logger.warning("chunk %s-%s incomplete, received %s bytes", start, end, offset - start)
+                except _Request_Errors + (ValueError,) as e:
+                    logger.warning("chunk %s-%s error (attempt %s): %s", start, end, retry, e)
+        return False
+
+    async def _write_content(self, response, fd, offset) -> int:
+        """
+        writes the response body into fd from offset, each block written (pwrite) in a worker thread
+
+        Returns: offset after the last byte written
+        """
+        async for chunk in response.content.iter_chunked(office365sdk.Download_StreamBlockBytes):
+            offset += await asyncio.to_thread(os.pwrite, fd, chunk, offset)
+        return offset
+
+    def _get_file_summary(self, item, tag_column_name_internal="") -> dict:
+        """
+        file summary (as returned by SharePointSite.get_files_in_folder(...)) from a REST list item
+        """
+        file = item["File"]
+        summary = {
+            "site_url": self.site_url,
+            "item_id": item["Id"],
+            "server_relative_url": file["ServerRelativeUrl"],
+            "time_last_modified": _to_datetime(file["TimeLastModified"]).ctime(),
+            "size_bytes": file["Length"],
+            "etag": file.get("ETag"),
+        }
+        if tag_column_name_internal:
+            summary["tag"] = item.get(tag_column_name_internal) or ""
+        return summary
+
+    def _get_folder_summary(self, folder, size_bytes) -> dict:
+        return {
+            "site_url": self.site_url,
+            "server_relative_url": folder["ServerRelativeUrl"],
+            "time_last_modified": _to_datetime(folder["TimeLastModified"]).ctime(),
+            "size_bytes": int(size_bytes),
+        }
+
+    def __init__(self, site_url=None, session=None, max_connections=Async_MaxConnections) -> Any:
+
+        if aiohttp is None:
+            raise ImportError("AsyncSharePointSite requires aiohttp, pip install vowelsharepoint[async]")
+
+        # sync site, provides the SDK context (authentication) and path helpers
+        self.site = SharePointSite(site_url)
+        self.site_url = site_url
+
+        # aiohttp.ClientSession, optional, shared with the caller. Created on first use otherwise
+        self.session = session
+        self.max_connections = max_connections
+        self._owns_session = False
+
+        self._auth_headers = None
+        self._form_digest = None
+        self._form_digest_expires_at = 0
+        # serializes the worker thread calls on the SDK context (not thread safe)
+        self._sdk_lock = asyncio.Lock()
+
+
+def _quote_path(server_relative_url) -> str:
+    return quote(server_relative_url.replace("'", "''"))
+
+
+def _to_datetime(value) -> datetime.datetime:
+    # REST datetimes, Eg. 2024-02-01T10:00:00Z
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _to_caml_query_json(qry) -> dict:
+    """
+    verbose json of a CamlQuery (as built by SharePointSite._get_folder_items_query(...))
+    """
+    query = {"__metadata": {"type": "SP.CamlQuery"}, "ViewXml": qry.ViewXml}
+    if qry.FolderServerRelativeUrl:
+        query["FolderServerRelativeUrl"] = qry.FolderServerRelativeUrl
+    if qry.ListItemCollectionPosition is not None:
+        query["ListItemCollectionPosition"] = {
+            "__metadata": {"type": "SP.ListItemCollectionPosition"},
+            "PagingInfo": qry.ListItemCollectionPosition.PagingInfo,
+        }
+    return query
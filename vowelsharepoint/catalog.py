@@ -0,0 +1,242 @@
+import datetime
+import sqlite3
+import threading
+import time
+
+from typing import Any
+
+Catalog_MaxStalenessSecs = 300
+
+# ctime() format of file summary time_last_modified, Eg. Thu Feb  1 10:00:00 2024
+_CTime_Format = "%a %b %d %H:%M:%S %Y"
+
+_Schema = """
+CREATE TABLE IF NOT EXISTS files (
+    doc_lib TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    server_relative_url TEXT NOT NULL COLLATE NOCASE,
+    site_url TEXT,
+    size_bytes INTEGER,
+    time_last_modified TEXT,
+    tag TEXT,
+    etag TEXT,
+    PRIMARY KEY (doc_lib, item_id)
+);
+DROP INDEX IF EXISTS files_server_relative_url;
+CREATE INDEX IF NOT EXISTS files_server_relative_url_nocase ON files (doc_lib, server_relative_url COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS files_time_last_modified ON files (doc_lib, time_last_modified);
+CREATE TABLE IF NOT EXISTS sync_state (
+    doc_lib TEXT PRIMARY KEY,
+    change_token TEXT,
+    tag_column_name TEXT,
+    root_folder_url TEXT,
+    synced_at REAL
+);
+CREATE TABLE IF NOT EXISTS doc_libs (
+    doc_lib TEXT PRIMARY KEY,
+    server_relative_url TEXT,
+    size_bytes INTEGER,
+    time_last_modified TEXT
+);
+"""
+
+
+class MetadataCatalog:
+
+    """
+    local SQLite mirror of the file metadata of document libraries (url, size, modified time, tag, etag),
+    kept in sync by SharePointSite.sync_catalog(...).
+    Files are indexed by server relative url (folder subtree = url range, case-insensitive as SharePoint urls are)
+    and modified time, so folder listings and summaries are local queries.
+    """
+
+    def __init__(self, db_path, max_staleness_secs=Catalog_MaxStalenessSecs) -> Any:
+
+        self.db_path = db_path
+        self.max_staleness_secs = max_staleness_secs
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(_Schema)
+        self._lock = threading.Lock()
+
+    def get_sync_state(self, doc_lib) -> dict:
+        """
+        Returns: dict {change_token, tag_column_name, root_folder_url, synced_at}, None if doc_lib was never synced
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT change_token, tag_column_name, root_folder_url, synced_at FROM sync_state WHERE doc_lib = ?",
+                (doc_lib,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"change_token": row[0], "tag_column_name": row[1], "root_folder_url": row[2], "synced_at": row[3]}
+
+    def is_fresh(self, doc_lib, tag_column_name=None) -> bool:
+        """
+        Returns: True if doc_lib was synced within max_staleness_secs (with tag_column_name, if provided)
+        """
+        state = self.get_sync_state(doc_lib)
+        if state is None or not state["change_token"]:
+            return False
+        if tag_column_name and state["tag_column_name"] != tag_column_name:
+            return False
+        return time.time() - state["synced_at"] <= self.max_staleness_secs
+
+    def replace_files(self, doc_lib, file_summaries, change_token, tag_column_name=None, root_folder_url=None) -> None:
+        """
+        replaces every file of doc_lib with file_summaries (full crawl)
+        root_folder_url: doc_lib root folder, Eg. /sites/test-site-1/Shared Documents
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE doc_lib = ?", (doc_lib,))
+            self._conn.executemany(_Upsert_File, (_to_row(doc_lib, f) for f in file_summaries))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (doc_lib, change_token, tag_column_name, root_folder_url, synced_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (doc_lib, change_token, tag_column_name, root_folder_url, time.time()),
+            )
+
+    def apply_changes(self, doc_lib, file_changes) -> bool:
+        """
+        applies file_changes (as returned by SharePointSite.get_file_changes(...)) to doc_lib
+
+        Returns: True on success, False if a deleted item is unknown (Eg. a deleted folder,
+                 whose files are not listed by the change log), a full crawl is needed
+        """
+        with self._lock, self._conn:
+            changed = file_changes["added"] + file_changes["modified"] + file_changes["renamed"]
+            self._conn.executemany(_Upsert_File, (_to_row(doc_lib, f) for f in changed))
+
+            unknown = 0
+            for deleted in file_changes["deleted"]:
+                cursor = self._conn.execute(
+                    "DELETE FROM files WHERE doc_lib = ? AND item_id = ?", (doc_lib, deleted["item_id"])
+                )
+                unknown += cursor.rowcount == 0
+            if unknown:
+                self._conn.execute("UPDATE sync_state SET change_token = NULL WHERE doc_lib = ?", (doc_lib,))
+                return False
+
+            self._conn.execute(
+                "UPDATE sync_state SET change_token = ?, synced_at = ? WHERE doc_lib = ?",
+                (file_changes["change_token"], time.time(), doc_lib),
+            )
+            return True
+
+    def get_files(self, doc_lib, folder_url=None, modified_after=None, include_tag=False) -> list:
+        """
+        files under folder_url (including sub folders), all files of doc_lib if not provided
+        folder_url: optional, Eg. /sites/test-site-1/Shared Documents/sharepoint-test-folder1
+        modified_after: optional, get only files modified after datetime
+
+        Returns: []dict file summaries, as returned by SharePointSite.get_files_in_folder(...)
+        """
+        where, params = self._get_where(doc_lib, folder_url, modified_after)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT site_url, item_id, server_relative_url, time_last_modified, size_bytes, etag, tag "
+                "FROM files WHERE " + where + " ORDER BY item_id", params
+            ).fetchall()
+
+        file_summaries = []
+        for site_url, item_id, server_relative_url, time_last_modified, size_bytes, etag, tag in rows:
+            summary = {
+                "site_url": site_url,
+                "item_id": item_id,
+                "server_relative_url": server_relative_url,
+                "time_last_modified": datetime.datetime.fromisoformat(time_last_modified).ctime(),
+                "size_bytes": str(size_bytes),
+                "etag": etag,
+            }
+            if include_tag:
+                summary["tag"] = tag or ""
+            file_summaries.append(summary)
+        return file_summaries
+
+    def get_folder_summary(self, doc_lib, folder_url=None) -> dict:
+        """
+        Returns: dict {files, size_bytes, time_last_modified} of the files under folder_url,
+                 None if there are no files
+        """
+        where, params = self._get_where(doc_lib, folder_url)
+        with self._lock:
+            files, size_bytes, time_last_modified = self._conn.execute(
+                "SELECT COUNT(*), SUM(size_bytes), MAX(time_last_modified) FROM files WHERE " + where, params
+            ).fetchone()
+        if not files:
+            return None
+        return {
+            "files": files,
+            "size_bytes": size_bytes,
+            "time_last_modified": datetime.datetime.fromisoformat(time_last_modified).ctime(),
+        }
+
+    def set_doc_lib_summary(self, doc_lib, doc_lib_summary) -> None:
+        """
+        stores doc_lib_summary, as returned by SharePointSite.get_doc_lib(...) at sync time
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO doc_libs (doc_lib, server_relative_url, size_bytes, time_last_modified) "
+                "VALUES (?, ?, ?, ?)",
+                (doc_lib, doc_lib_summary["server_relative_url"], doc_lib_summary["size_bytes"],
+                 doc_lib_summary["time_last_modified"]),
+            )
+
+    def get_doc_lib_summary(self, doc_lib) -> dict:
+        """
+        Returns: dict {server_relative_url, size_bytes, time_last_modified} as stored by set_doc_lib_summary(...),
+                 None if not stored
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT server_relative_url, size_bytes, time_last_modified FROM doc_libs WHERE doc_lib = ?",
+                (doc_lib,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"server_relative_url": row[0], "size_bytes": row[1], "time_last_modified": row[2]}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    ################################### Internal functions #################################
+
+    def _get_where(self, doc_lib, folder_url=None, modified_after=None) -> (str, tuple):
+        where = "doc_lib = ?"
+        params = [doc_lib]
+        if folder_url:
+            # subtree of folder_url as an index range: folder_url/ <= url < folder_url0 ('0' follows '/'),
+            # case-insensitive (explicit collation, catalogs created before the column collation use the index too)
+            prefix = folder_url.rstrip('/')
+            where += " AND server_relative_url COLLATE NOCASE >= ? AND server_relative_url COLLATE NOCASE < ?"
+            params += [prefix + "/", prefix + "0"]
+        if modified_after:
+            if modified_after.tzinfo is not None:
+                modified_after = modified_after.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+            where += " AND time_last_modified > ?"
+            params.append(modified_after.isoformat())
+        return where, tuple(params)
+
+
+_Upsert_File = (
+    "INSERT OR REPLACE INTO files "
+    "(doc_lib, item_id, server_relative_url, site_url, size_bytes, time_last_modified, tag, etag) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _to_row(doc_lib, file_summary) -> tuple:
+    time_last_modified = datetime.datetime.strptime(file_summary["time_last_modified"], _CTime_Format)
+    return (
+        doc_lib,
+        file_summary["item_id"],
+        file_summary["server_relative_url"],
+        file_summary["site_url"],
+        int(file_summary["size_bytes"]),
+        time_last_modified.isoformat(),
+        file_summary.get("tag"),
+        file_summary.get("etag"),
+    )
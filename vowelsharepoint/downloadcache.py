@@ -0,0 +1,247 @@
+import contextlib
+import fcntl
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from typing import Any
+
+from vowelsharepoint.instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+DownloadCache_MaxBytes = 10 * 1024 * 1024 * 1024
+
+# layout of the cache directory
+_Index_Name = "index.db"
+_Lock_Name = "cache.lock"
+_Objects_Dir = "objects"
+_Tmp_Dir = "tmp"
+
+_Schema = """
+CREATE TABLE IF NOT EXISTS entries (
+    site_url TEXT NOT NULL,
+    server_relative_url TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (site_url, server_relative_url)
+);
+CREATE INDEX IF NOT EXISTS entries_sha256 ON entries (sha256);
+CREATE TABLE IF NOT EXISTS objects (
+    sha256 TEXT PRIMARY KEY,
+    size_bytes INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS objects_last_access ON objects (last_access);
+"""
+
+
+class DownloadCache:
+
+    """
+    on-disk cache of downloaded file content, shared by the processes of a node using the same cache_dir.
+    Files are keyed by (site url, server relative url, etag), a new etag replaces the cached version.
+    Content is stored once per SHA-256 (hashed while streaming, files with the same content share it),
+    read-only, and least recently used content is evicted above max_bytes.
+    Index updates and evictions hold an exclusive lock on cache_dir/cache.lock (flock), so processes
+    sharing the cache never see a partial file. Files are handed out as read-only cache paths or as
+    hardlinks (no copy, a hardlink outlives the eviction of its cache entry).
+    """
+
+    def __init__(self, cache_dir, max_bytes=DownloadCache_MaxBytes) -> Any:
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(os.path.join(cache_dir, _Objects_Dir), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, _Tmp_Dir), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._lock_fd = os.open(os.path.join(cache_dir, _Lock_Name), os.O_RDWR | os.O_CREAT, 0o644)
+        self._conn = sqlite3.connect(os.path.join(cache_dir, _Index_Name), timeout=60, check_same_thread=False)
+        with self._locked():
+            self._conn.executescript(_Schema)
+
+    def get(self, site_url, server_relative_url, etag) -> str:
+        """
+        read-only path of the cached content of server_relative_url at version etag,
+        marked as the most recently used
+
+        Returns: str, None if not cached
+        """
+        key = self._get_key(site_url, server_relative_url)
+        with self._locked():
+            row = self._conn.execute(
+                "SELECT sha256 FROM entries WHERE site_url = ? AND server_relative_url = ? AND etag = ?",
+                key + (etag,),
+            ).fetchone()
+            if row is None or not os.path.isfile(self._get_object_path(row[0])):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE objects SET last_access = ? WHERE sha256 = ?", (time.time(), row[0]))
+            self._conn.commit()
+            self.hits += 1
+        return self._get_object_path(row[0])
+
+    def add(self, site_url, server_relative_url, etag, chunks, expected_size=None) -> str:
+        """
+        stores the content of server_relative_url at version etag, written to a temp file and hashed
+        as chunks are read, then moved into the cache. Least recently used content is evicted above max_bytes.
+        chunks: iterable of bytes, Eg. a streamed response iter_content(...)
+        expected_size: optional, content of another size is not stored
+
+        Returns: read-only path of the cached content, None if the size does not match
+                 or the content is larger than max_bytes (not stored)
+        """
+        if expected_size is not None and expected_size > self.max_bytes:
+            logger.debug("file larger than the cache, not cached: %s,size:%s bytes", server_relative_url, expected_size)
+            return None
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.cache_dir, _Tmp_Dir))
+        try:
+            sha256 = hashlib.sha256()
+            size_bytes = 0
+            with os.fdopen(fd, "wb") as tmp_file:
+                for chunk in chunks:
+                    sha256.update(chunk)
+                    tmp_file.write(chunk)
+                    size_bytes += len(chunk)
+            if expected_size is not None and size_bytes != expected_size:
+                logger.error("cache file size mismatch: %s,size:%s bytes,expected:%s bytes",
+                             server_relative_url, size_bytes, expected_size)
+                return None
+            if size_bytes > self.max_bytes:
+                # stored, it would be the first evicted
+                logger.debug("file larger than the cache, not cached: %s,size:%s bytes", server_relative_url, size_bytes)
+                return None
+
+            digest = sha256.hexdigest()
+            object_path = self._get_object_path(digest)
+            key = self._get_key(site_url, server_relative_url)
+            with self._locked():
+                if os.path.isfile(object_path):
+                    os.remove(tmp_path)
+                else:
+                    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                    os.chmod(tmp_path, 0o444)
+                    os.replace(tmp_path, object_path)
+
+                previous = self._conn.execute(
+                    "SELECT sha256 FROM entries WHERE site_url = ? AND server_relative_url = ?", key
+                ).fetchone()
+                self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", key + (etag, digest))
+                self._conn.execute("INSERT OR REPLACE INTO objects VALUES (?, ?, ?)", (digest, size_bytes, time.time()))
+                if previous is not None and previous[0] != digest:
+                    self._remove_unreferenced(previous[0])
+                self._evict()
+                self._conn.commit()
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        logger.debug("file cached: %s,sha256:%s,size:%s bytes", server_relative_url, digest, size_bytes)
+        return object_path
+
+    def link(self, path, local_file_name) -> bool:
+        """
+        hands out cached path as local_file_name (replaced atomically): a hardlink, sharing the read-only
+        content of the cache, or a copy if the cache is on another file system
+
+        Returns: True on success, False if path was evicted
+        """
+        tmp_file_name = local_file_name + ".link"
+        if os.path.lexists(tmp_file_name):
+            os.remove(tmp_file_name)
+        try:
+            os.link(path, tmp_file_name)
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.debug("cache hardlink failed, copying: %s %s", local_file_name, e)
+            try:
+                shutil.copyfile(path, tmp_file_name)
+            except FileNotFoundError:
+                return False
+        os.replace(tmp_file_name, local_file_name)
+        return True
+
+    def stats(self) -> dict:
+        """
+        Returns: dict {entries, objects, bytes, max_bytes, hits, misses, evictions},
+                 hits, misses and evictions of this process
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            objects, size_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM objects").fetchone()
+        return {
+            "entries": entries,
+            "objects": objects,
+            "bytes": size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        self._conn.close()
+        os.close(self._lock_fd)
+
+    ################################### Internal functions #################################
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """
+        holds the cache lock of this process (threads) and of the cache directory (processes)
+        """
+        with self._lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _evict(self) -> None:
+        """
+        removes least recently used content until the cache is within max_bytes (cache lock held)
+        """
+        total_bytes = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM objects").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        for digest, size_bytes in self._conn.execute(
+                "SELECT sha256, size_bytes FROM objects ORDER BY last_access").fetchall():
+            self._conn.execute("DELETE FROM entries WHERE sha256 = ?", (digest,))
+            self._remove_object(digest)
+            self.evictions += 1
+            total_bytes -= size_bytes
+            if total_bytes <= self.max_bytes:
+                break
+
+    def _remove_unreferenced(self, digest) -> None:
+        """
+        removes content no longer referenced by an entry (cache lock held)
+        """
+        if self._conn.execute("SELECT 1 FROM entries WHERE sha256 = ? LIMIT 1", (digest,)).fetchone() is None:
+            self._remove_object(digest)
+
+    def _remove_object(self, digest) -> None:
+        self._conn.execute("DELETE FROM objects WHERE sha256 = ?", (digest,))
+        try:
+            os.remove(self._get_object_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _get_object_path(self, digest) -> str:
+        # Eg. objects/3f/3f2a9c...
+        return os.path.join(self.cache_dir, _Objects_Dir, digest[:2], digest)
+
+    def _get_key(self, site_url, server_relative_url) -> tuple:
+        # urls are case insensitive
+        return (site_url or "").rstrip('/').lower(), server_relative_url.lower()
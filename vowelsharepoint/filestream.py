@@ -0,0 +1,96 @@
+import io
+
+from typing import Any
+
+# read buffer of open_file_stream(...), reads smaller than this are served from memory
+Stream_BufferBytes = 256 * 1024
+
+
+class FileStream(io.RawIOBase):
+
+    """
+    read-only, seekable file-like view of the content of a SharePoint file, read from a streamed HTTP response
+    (no local file, no full-file buffer). Seeking drops the response, the next read requests the content from
+    the new position (a byte range request), so sequential reads cost one request.
+    A response ending before size bytes raises IOError, a truncated file is never read as end of file.
+    open_response(offset): returns a streamed requests.Response of the content from offset
+                           (a 206 byte range, or the whole content, skipped up to offset)
+    """
+
+    def __init__(self, open_response, size, name=None) -> Any:
+
+        super().__init__()
+        self.size = size
+        self.name = name
+
+        self._open_response = open_response
+        self._response = None
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError("invalid whence: {0}".format(whence))
+        if position < 0:
+            raise ValueError("negative seek position: {0}".format(position))
+        if position != self._position:
+            self._close_response()
+            self._position = position
+        return self._position
+
+    def readinto(self, b) -> int:
+        """
+        reads up to len(b) bytes into b, from the response body (no intermediate buffer)
+
+        Returns: bytes read, 0 at end of file
+        Raises: IOError if the response ends before the end of the file
+        """
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        if self._position >= self.size or not len(b):
+            return 0
+        if self._response is None:
+            self._response = self._open_at(self._position)
+        read_bytes = self._response.raw.readinto(b)
+        if not read_bytes:
+            self._close_response()
+            raise IOError("file stream ended at {0} of {1} bytes: {2}".format(self._position, self.size, self.name))
+        self._position += read_bytes
+        return read_bytes
+
+    def close(self) -> None:
+        self._close_response()
+        super().close()
+
+    ################################### Internal functions #################################
+
+    def _open_at(self, position) -> Any:
+        response = self._open_response(position)
+        if position and response.status_code != 206:
+            # byte range not supported, the whole content is skipped up to position
+            skip = position
+            while skip:
+                skipped = len(response.raw.read(min(skip, Stream_BufferBytes)))
+                if not skipped:
+                    break
+                skip -= skipped
+        return response
+
+    def _close_response(self) -> None:
+        if self._response is not None:
+            self._response.close()
+            self._response = None
@@ -0,0 +1,375 @@
+import array
+import calendar
+import datetime
+import json
+import re
+from collections.abc import Mapping
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional dependency, pip install vowelsharepoint[columnar]
+    pyarrow = None
+
+from typing import Any, Iterator
+
+from vowelsharepoint.instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+# rows per Parquet row group (and per chunk buffered by write_parquet(...) from an iterator)
+Parquet_BatchRows = 100000
+
+# keys of a file summary (as returned by SharePointSite.get_files_in_folder(...)), tag is optional
+File_SummaryKeys = ("site_url", "item_id", "server_relative_url", "time_last_modified", "size_bytes", "etag")
+
+# SharePoint / Graph file ETag, Eg. "{5D4F0A53-2A3B-4C3D-9E1F-0123456789AB},3", stored as 16 bytes + version
+_Etag = re.compile(r'^"\{([0-9A-F]{8}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{12})\},(\d+)"$')
+
+_Months = {name: idx for idx, name in enumerate(
+    ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), start=1)}
+
+
+class FileTable:
+
+    """
+    columnar, memory compact list of file summaries: numbers are kept in typed arrays (timestamps as
+    UTC epoch seconds), site urls, folders and tags are interned (stored once per table) and etags
+    packed to 16 bytes + version: about 130 bytes per file instead of about 700 for a summary dict.
+    Rows are read as FileRecord, a read only dict compatible view (same keys and values as the summary).
+
+    Usage:
+        files = site.get_file_table("Documents")
+        for file_record in files:
+            print(file_record["server_relative_url"], file_record.size, file_record.modified)
+        with open("files.ndjson", "w") as f:
+            files.write_ndjson(f)
+    """
+
+    def append(self, summary) -> None:
+        """
+        adds a file summary (dict, as returned by SharePointSite.get_files_in_folder(...), or FileRecord)
+        """
+        if isinstance(summary, FileRecord):
+            summary = summary.to_dict()
+
+        row = len(self._names)
+        folder, name = summary["server_relative_url"].rsplit('/', 1)
+        self._site_idx.append(self._intern(self._sites, self._site_ids, summary["site_url"]))
+        self._folder_idx.append(self._intern(self._folders, self._folder_ids, folder))
+        self._names.append(name)
+        self._item_ids.append(summary.get("item_id") or 0)
+        self._sizes.append(int(summary["size_bytes"]))
+        self._modified.append(_parse_ctime(summary["time_last_modified"]))
+        self._append_etag(row, summary.get("etag"))
+        if "tag" in summary:
+            if not self.has_tags:
+                # rows added before carry an empty tag
+                self.has_tags = True
+                self._tag_idx.extend([self._intern(self._tags, self._tag_ids, "")] * row)
+            self._tag_idx.append(self._intern(self._tags, self._tag_ids, summary["tag"] or ""))
+        elif self.has_tags:
+            self._tag_idx.append(self._intern(self._tags, self._tag_ids, ""))
+
+    def extend(self, summaries) -> "FileTable":
+        """
+        adds every file summary of summaries (Eg. SharePointSite.iter_files_in_folder(...))
+
+        Returns: self
+        """
+        for summary in summaries:
+            self.append(summary)
+        return self
+
+    def write_ndjson(self, fp) -> int:
+        """
+        writes rows to text file fp as newline delimited JSON, see write_ndjson(...)
+
+        Returns: rows written
+        """
+        return write_ndjson(self, fp)
+
+    def write_parquet(self, path, batch_rows=Parquet_BatchRows) -> int:
+        """
+        writes rows to a Parquet file at path, see write_parquet(...)
+
+        Returns: rows written
+        """
+        return write_parquet(self, path, batch_rows)
+
+    def to_arrow(self, start=0, stop=None) -> "pyarrow.Table":
+        """
+        rows start..stop as a pyarrow Table: site_url, item_id, server_relative_url, time_last_modified
+        (timestamp, seconds, UTC), size_bytes (int64), etag and tag (if any). Site urls and tags are
+        dictionary encoded.
+
+        Returns: pyarrow.Table
+        """
+        if pyarrow is None:
+            raise ImportError("FileTable.to_arrow requires pyarrow, pip install vowelsharepoint[columnar]")
+
+        rows = range(len(self))[start:stop]
+        columns = {
+            "site_url": pyarrow.DictionaryArray.from_arrays(
+                pyarrow.array(self._site_idx[rows.start:rows.stop], pyarrow.int32()), pyarrow.array(self._sites, pyarrow.string())),
+            "item_id": pyarrow.array(self._item_ids[rows.start:rows.stop], pyarrow.int64()),
+            "server_relative_url": pyarrow.array([self._get_url(row) for row in rows], pyarrow.string()),
+            "time_last_modified": pyarrow.array(self._modified[rows.start:rows.stop], pyarrow.int64())
+                                         .cast(pyarrow.timestamp("s", tz="UTC")),
+            "size_bytes": pyarrow.array(self._sizes[rows.start:rows.stop], pyarrow.int64()),
+            "etag": pyarrow.array([self._get_etag(row) for row in rows], pyarrow.string()),
+        }
+        if self.has_tags:
+            columns["tag"] = pyarrow.DictionaryArray.from_arrays(
+                pyarrow.array(self._tag_idx[rows.start:rows.stop], pyarrow.int32()), pyarrow.array(self._tags, pyarrow.string()))
+        return pyarrow.table(columns)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __getitem__(self, idx) -> "FileRecord":
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("FileTable index out of range")
+        return FileRecord(self, idx)
+
+    def __iter__(self) -> Iterator["FileRecord"]:
+        for row in range(len(self)):
+            yield FileRecord(self, row)
+
+    ################################### Internal functions #################################
+
+    def _intern(self, values, ids, value) -> int:
+        idx = ids.get(value)
+        if idx is None:
+            idx = ids[value] = len(values)
+            values.append(value)
+        return idx
+
+    def _append_etag(self, row, etag) -> None:
+        m = _Etag.match(etag) if etag else None
+        if m is None:
+            # not a GUID,version etag (or None), kept as is
+            self._etag_guids.extend(bytes(16))
+            self._etag_versions.append(0)
+            self._etag_others[row] = etag
+            return
+        self._etag_guids.extend(bytes.fromhex(m.group(1).replace('-', '')))
+        self._etag_versions.append(int(m.group(2)))
+
+    def _get_etag(self, row) -> Any:
+        if row in self._etag_others:
+            return self._etag_others[row]
+        guid = self._etag_guids[row * 16:row * 16 + 16].hex().upper()
+        return '"{{{0}-{1}-{2}-{3}-{4}}},{5}"'.format(guid[:8], guid[8:12], guid[12:16], guid[16:20], guid[20:],
+                                                     self._etag_versions[row])
+
+    def _get_url(self, row) -> str:
+        return self._folders[self._folder_idx[row]] + "/" + self._names[row]
+
+    def _get_tag(self, row) -> Any:
+        return self._tags[self._tag_idx[row]] if self.has_tags else None
+
+    def __init__(self, summaries=None) -> Any:
+
+        # instance variables
+        self.has_tags = False # True once a summary with a tag (tag column) is added
+
+        # interned values, value -> index
+        self._sites = []
+        self._site_ids = {}
+        self._folders = []
+        self._folder_ids = {}
+        self._tags = []
+        self._tag_ids = {}
+
+        # one entry per row
+        self._site_idx = array.array('I')
+        self._folder_idx = array.array('I')
+        self._names = []
+        self._item_ids = array.array('q')
+        self._sizes = array.array('q')
+        self._modified = array.array('q')  # UTC epoch seconds
+        self._etag_guids = bytearray()     # 16 bytes per row
+        self._etag_versions = array.array('I')
+        self._etag_others = {}             # row -> etag not in GUID,version form
+        self._tag_idx = array.array('I')
+
+        if summaries is not None:
+            self.extend(summaries)
+
+
+class FileRecord(Mapping):
+
+    """
+    read only, dict compatible view of one FileTable row: same keys and values as the file summary
+    dict (record["size_bytes"], record.get("tag"), dict(record), record == summary), plus numeric
+    properties (size, modified) that need no parsing. Use to_dict() for JSON serialisation.
+    """
+
+    __slots__ = ("table", "row")
+
+    def __init__(self, table, row) -> Any:
+        self.table = table
+        self.row = row
+
+    @property
+    def site_url(self) -> str:
+        return self.table._sites[self.table._site_idx[self.row]]
+
+    @property
+    def item_id(self) -> int:
+        return self.table._item_ids[self.row]
+
+    @property
+    def server_relative_url(self) -> str:
+        return self.table._get_url(self.row)
+
+    @property
+    def modified(self) -> int:
+        """
+        time last modified, UTC epoch seconds
+        """
+        return self.table._modified[self.row]
+
+    @property
+    def size(self) -> int:
+        return self.table._sizes[self.row]
+
+    @property
+    def etag(self) -> Any:
+        return self.table._get_etag(self.row)
+
+    @property
+    def tag(self) -> Any:
+        return self.table._get_tag(self.row)
+
+    def to_dict(self) -> dict:
+        """
+        Returns: dict, the file summary of the row
+        """
+        return {key: self[key] for key in self}
+
+    def __getitem__(self, key) -> Any:
+        if key == "site_url":
+            return self.site_url
+        if key == "item_id":
+            return self.item_id
+        if key == "server_relative_url":
+            return self.server_relative_url
+        if key == "time_last_modified":
+            return datetime.datetime.fromtimestamp(self.modified, datetime.timezone.utc).ctime()
+        if key == "size_bytes":
+            return str(self.size)
+        if key == "etag":
+            return self.etag
+        if key == "tag" and self.table.has_tags:
+            return self.tag
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from File_SummaryKeys
+        if self.table.has_tags:
+            yield "tag"
+
+    def __len__(self) -> int:
+        return len(File_SummaryKeys) + self.table.has_tags
+
+    def __repr__(self) -> str:
+        return "FileRecord({0!r})".format(self.to_dict())
+
+
+def write_ndjson(summaries, fp) -> int:
+    """
+    streams file summaries to text file fp as newline delimited JSON, one object per file with the
+    summary keys, time_last_modified as UTC epoch seconds and size_bytes as a number (no date parsing
+    downstream). Memory stays bounded when summaries is an iterator, Eg.
+        write_ndjson(site.iter_files_in_folder("Documents"), fp)
+    summaries: iterable of file summaries (dict or FileRecord), Eg. a FileTable
+
+    Returns: rows written
+    """
+    rows = 0
+    for summary in summaries:
+        if isinstance(summary, FileRecord):
+            row = summary.to_dict()
+            row["time_last_modified"] = summary.modified
+        else:
+            row = dict(summary)
+            row["time_last_modified"] = _parse_ctime(summary["time_last_modified"])
+        row["size_bytes"] = int(row["size_bytes"])
+        fp.write(json.dumps(row))
+        fp.write("\n")
+        rows += 1
+    return rows
+
+
+def write_parquet(summaries, path, batch_rows=Parquet_BatchRows) -> int:
+    """
+    streams file summaries to a Parquet file at path (columns as FileTable.to_arrow(...)), one row group
+    per batch_rows files. An iterator is buffered batch_rows files at a time in a FileTable, Eg.
+        write_parquet(site.iter_files_in_folder("Documents"), "files.parquet")
+    summaries: iterable of file summaries (dict or FileRecord), Eg. a FileTable
+
+    Returns: rows written
+    """
+    if pyarrow is None:
+        raise ImportError("write_parquet requires pyarrow, pip install vowelsharepoint[columnar]")
+
+    writer = None
+    rows = 0
+    try:
+        for batch in _iter_arrow_batches(summaries, batch_rows):
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(path, batch.schema)
+            elif batch.schema != writer.schema:
+                # tags only in some batches, the columns of the first batch are kept
+                batch = _conform(batch, writer.schema)
+            writer.write_table(batch, row_group_size=batch_rows)
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        pyarrow.parquet.write_table(FileTable().to_arrow(), path)
+    logger.info("files written to parquet: %s,rows:%s", path, rows)
+    return rows
+
+
+################################### Internal functions #################################
+
+def _iter_arrow_batches(summaries, batch_rows) -> Iterator["pyarrow.Table"]:
+    if isinstance(summaries, FileTable):
+        for start in range(0, len(summaries), batch_rows):
+            yield summaries.to_arrow(start, start + batch_rows)
+        return
+
+    table = FileTable()
+    for summary in summaries:
+        table.append(summary)
+        if len(table) == batch_rows:
+            yield table.to_arrow()
+            table = FileTable()
+    if len(table):
+        yield table.to_arrow()
+
+
+def _conform(batch, schema) -> "pyarrow.Table":
+    # columns of schema in schema order, empty strings for those missing from batch
+    columns = []
+    for field in schema:
+        if field.name in batch.schema.names:
+            columns.append(batch.column(field.name).cast(field.type))
+        else:
+            columns.append(pyarrow.array([""] * batch.num_rows, pyarrow.string()).cast(field.type))
+    return pyarrow.Table.from_arrays(columns, schema=schema)
+
+
+def _parse_ctime(value) -> int:
+    """
+    UTC epoch seconds of a summary time_last_modified (datetime.ctime() of a UTC time,
+    Eg. "Thu Feb  1 10:00:00 2024"), parsed by position (much faster than strptime)
+    """
+    return calendar.timegm((int(value[20:24]), _Months[value[4:7]], int(value[8:10]),
+                            int(value[11:13]), int(value[14:16]), int(value[17:19])))
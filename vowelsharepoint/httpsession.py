@@ -0,0 +1,176 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from office365.runtime.http.http_method import HttpMethod
+from office365.runtime.http.request_options import RequestOptions
+from office365.runtime.odata.request import ODataRequest
+from office365.runtime.odata.v3.json_light_format import JsonLightFormat
+from office365.runtime.types.event_handler import EventHandler
+from office365.sharepoint.client_context import ClientContext
+from office365.sharepoint.webs.context_web_information import ContextWebInformation
+
+from typing import Any
+
+from vowelsharepoint.instrumentation import get_logger, record_request
+from vowelsharepoint.ratelimit import RateLimiter, Throttle_MaxRetries, Throttle_StatusCodes, get_rate_limiter, get_retry_after_secs
+
+logger = get_logger(__name__)
+
+# connections kept alive per pooled session
+Session_PoolConnections = 4
+Session_PoolMaxSize = 32
+
+# process wide HTTP sessions, (tenant_id, site url) -> requests.Session
+_sessions = {}
+# connection pools shared by the sessions of a host, (tenant_id, host) -> HTTPAdapter
+_adapters = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(tenant_id, site_url, pool_maxsize=Session_PoolMaxSize) -> requests.Session:
+    """
+    process wide, pooled (keep-alive) HTTP session for site_url of tenant_id,
+    shared by every SharePointSite / PooledClientContext of that site.
+    Sessions of the sites of a host share one connection pool (Eg. every site of contoso.sharepoint.com).
+    Requests are rate limited by the site's (and tenant's) RateLimiter, see ThrottledSession.
+    tenant_id: Azure AD tenant id, None for contexts created outside connect_with_client_certificate(...)
+
+    Returns: ThrottledSession
+    """
+    key = (tenant_id, site_url.rstrip('/').lower())
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = ThrottledSession(get_rate_limiter(tenant_id, site_url))
+            adapter_key = (tenant_id, urlparse(site_url).netloc.lower())
+            adapter = _adapters.get(adapter_key)
+            if adapter is None:
+                adapter = requests.adapters.HTTPAdapter(pool_connections=Session_PoolConnections, pool_maxsize=pool_maxsize)
+                _adapters[adapter_key] = adapter
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[key] = session
+        return session
+
+
+def close_sessions() -> None:
+    """
+    closes every pooled session (Eg. at process shutdown, or after fork)
+    """
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _adapters.clear()
+
+
+class ThrottledSession(requests.Session):
+
+    """
+    requests.Session whose requests are sent at the pace of rate_limiter. Throttled responses
+    (429/503) slow the limiter down and are retried after their Retry-After, up to Throttle_MaxRetries
+    (requests with a stream body are not retried, the throttled response is returned).
+    """
+
+    def __init__(self, rate_limiter=None) -> Any:
+        super(ThrottledSession, self).__init__()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.retries = 0
+
+    def request(self, method, url, *args, **kwargs) -> requests.Response:
+        retryable = not hasattr(kwargs.get("data"), "read")
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = super(ThrottledSession, self).request(method, url, *args, **kwargs)
+            except requests.RequestException:
+                record_request(method, url, None, time.perf_counter() - start, 0, retry=attempt > 0)
+                raise
+            throttled = response.status_code in Throttle_StatusCodes
+            record_request(method, url, response.status_code, time.perf_counter() - start,
+                           _get_response_bytes(response, kwargs.get("stream")), throttled, attempt > 0)
+            if not throttled:
+                self.rate_limiter.on_success()
+                return response
+
+            self.rate_limiter.on_throttled(get_retry_after_secs(response))
+            if not retryable or attempt >= Throttle_MaxRetries:
+                return response
+            attempt += 1
+            self.retries += 1
+            logger.warning("throttled: %s %s %s, retry: %s", response.status_code, method, url, attempt)
+            response.close()
+
+
+def _get_response_bytes(response, stream) -> int:
+    # a streamed body is not read yet, count its announced length
+    if stream:
+        return int(response.headers.get("Content-Length") or 0)
+    return len(response.content)
+
+
+class PooledODataRequest(ODataRequest):
+
+    """
+    SDK OData request sent over a pooled requests.Session (the SDK sends each request
+    with module level requests.get/post, a new connection and TLS handshake per request)
+    """
+
+    def __init__(self, json_format, session) -> Any:
+        super(PooledODataRequest, self).__init__(json_format)
+        self.session = session
+
+    def execute_request_direct(self, request):
+        # type: (RequestOptions) -> requests.Response
+        self.beforeExecute.notify(request)
+        kwargs = {
+            "headers": request.headers,
+            "auth": request.auth,
+            "verify": request.verify,
+            "proxies": request.proxies,
+        }
+        if request.method == HttpMethod.Get:
+            kwargs["stream"] = request.stream
+        elif request.method == HttpMethod.Put or (request.method == HttpMethod.Post and (request.is_bytes or request.is_file)):
+            kwargs["data"] = request.data
+        elif request.method != HttpMethod.Delete:
+            kwargs["json"] = request.data
+        return self.session.request(request.method, request.url, **kwargs)
+
+
+class PooledClientContext(ClientContext):
+
+    """
+    ClientContext whose requests (queries and form digest) go through a pooled requests.Session
+    """
+
+    def __init__(self, base_url, session, auth_context=None) -> Any:
+        super(PooledClientContext, self).__init__(base_url, auth_context)
+        self.session = session
+
+    def pending_request(self):
+        if self._pending_request is None:
+            self._pending_request = PooledODataRequest(JsonLightFormat(), self.session)
+            self._pending_request.beforeExecute += self._authenticate_request
+            self._pending_request.beforeExecute += self._build_modification_query
+        return self._pending_request
+
+    def _get_context_web_information(self):
+        client = PooledODataRequest(JsonLightFormat(), self.session)
+        client.beforeExecute += self._authenticate_request
+        for e in self.pending_request().beforeExecute:
+            if not EventHandler.is_system(e):
+                client.beforeExecute += e
+        request = RequestOptions("{0}/contextInfo".format(self.service_root_url()))
+        request.method = HttpMethod.Post
+        response = client.execute_request_direct(request)
+        json_format = JsonLightFormat()
+        json_format.function = "GetContextWebInformation"
+        return_value = ContextWebInformation()
+        client.map_json(response.json(), return_value, json_format)
+        return return_value
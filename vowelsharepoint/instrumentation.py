@@ -0,0 +1,363 @@
+import bisect
+import contextlib
+import contextvars
+import functools
+import inspect
+import logging
+import re
+import threading
+import time
+from urllib.parse import unquote, urlparse
+
+from typing import Any, Callable, Iterator
+
+# upper bounds (secs) of the latency histogram buckets of MetricsCollector, the last bucket is unbounded
+Latency_BucketsSecs = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# event types passed to listeners
+Call = "call"         # a public SharePointSite method returned (or its iterator was exhausted / closed)
+Request = "request"   # an HTTP request (attempt) completed
+
+# instrumented calls in progress in the current thread / task, outermost first
+_active_calls = contextvars.ContextVar("vowelsharepoint_active_calls", default=())
+
+# process wide listeners, callable(event dict)
+_listeners = []
+_listeners_lock = threading.Lock()
+
+# REST call arguments, Eg. getbytitle('Documents'), items(42), GetUserEffectivePermissions(@user)
+_Parenthesized_Args = re.compile(r"\((?:[^()']|'(?:[^']|'')*')*\)")
+# Graph resource ids and paths, Eg. drives/b!x9/items/01AB/children, drives/b!x9/root:/folder1:/children
+_Graph_Ids = re.compile(r"/(sites|drives|items)/[^/]+")
+_Graph_Paths = re.compile(r"/root:/.*?(:(?=/)|:?$)")
+
+logger = logging.getLogger(__name__)
+
+
+def add_listener(listener) -> None:
+    """
+    registers listener, called with every event (dict) of every instrumented call and HTTP request:
+        call:    {type, method, elapsed_secs, requests, bytes, retries, throttles, error, parent}
+        request: {type, http_method, endpoint, status (None on connection error), elapsed_secs, bytes,
+                  throttled, retry, call}
+    Listeners run inline on the calling thread, keep them fast, exceptions are logged and ignored.
+    listener: callable(event), Eg. a MetricsCollector
+    """
+    with _listeners_lock:
+        _listeners.append(listener)
+
+
+def remove_listener(listener) -> None:
+    with _listeners_lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+@contextlib.contextmanager
+def collect_metrics(collector=None) -> Iterator["MetricsCollector"]:
+    """
+    collects the metrics of every instrumented call and request made (by any thread) within the block
+
+    Usage:
+        with collect_metrics() as metrics:
+            site.get_files_in_folder("Documents/sharepoint-test-folder1")
+        print(metrics.stats()["calls"]["SharePointSite.get_files_in_folder"]["requests"])
+
+    Yields: MetricsCollector
+    """
+    collector = collector or MetricsCollector()
+    add_listener(collector)
+    try:
+        yield collector
+    finally:
+        remove_listener(collector)
+
+
+def get_logger(name) -> logging.Logger:
+    """
+    Returns: logging.Logger of module name, its records carry sharepoint_call (innermost instrumented
+             method in progress, None outside of one) for structured log formatters / handlers
+    """
+    module_logger = logging.getLogger(name)
+    if not any(isinstance(f, CallContextFilter) for f in module_logger.filters):
+        module_logger.addFilter(CallContextFilter())
+    return module_logger
+
+
+def get_endpoint(url) -> str:
+    """
+    REST (or Graph) endpoint of url, with call arguments, ids and query options removed so requests aggregate
+    by endpoint. Eg. .../_api/Web/lists/GetByTitle('Documents')/items(42)?$select=Id -> _api/web/lists/getbytitle(*)/items(*)
+    https://graph.microsoft.com/v1.0/drives/b!x9/root:/folder1:/children -> v1.0/drives/*/root:*/children
+    """
+    path = unquote(urlparse(url).path)
+    api = path.lower().find("/_api/")
+    if api >= 0:
+        return _Parenthesized_Args.sub("(*)", path[api + 1:]).lower()
+    graph = re.match(r"/(v1\.0|beta)/", path)
+    if graph:
+        path = _Graph_Paths.sub("/root:*", _Graph_Ids.sub(r"/\1/*", path[1:]))
+    return _Parenthesized_Args.sub("(*)", path).lower()
+
+
+def instrumented(func) -> Callable:
+    """
+    decorator of public methods: records latency, HTTP requests, response bytes, retries and throttles
+    of each call (including requests made by nested calls and by worker threads started through
+    run_in_context(...)), and notifies listeners. The latency of generator methods is the time spent inside
+    their next() calls, not the time the caller spends between items.
+    """
+    name = func.__qualname__
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            call = _CallRecord(name)
+            items = func(*args, **kwargs)
+            error = None
+            try:
+                while True:
+                    with _activate(call):
+                        try:
+                            item = next(items)
+                        except StopIteration:
+                            return
+                    yield item
+            except GeneratorExit:
+                raise
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                items.close()
+                _finish(call, error)
+        return generator_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        call = _CallRecord(name)
+        error = None
+        try:
+            with _activate(call):
+                return func(*args, **kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _finish(call, error)
+    return wrapper
+
+
+def run_in_context(func) -> Callable:
+    """
+    Returns: func bound to a copy of the current context, so requests it sends on a worker thread
+             are attributed to the calling instrumented method. Eg. executor.submit(run_in_context(f), ...)
+    """
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+def record_request(http_method, url, status, elapsed_secs, response_bytes, throttled=False, retry=False) -> None:
+    """
+    accounts one HTTP request (attempt) to the instrumented calls in progress, and notifies listeners
+    """
+    calls = _active_calls.get()
+    for call in calls:
+        call.add_request(response_bytes, throttled, retry)
+
+    if not _listeners:
+        return
+    _notify({
+        "type": Request,
+        "http_method": http_method,
+        "endpoint": get_endpoint(url),
+        "status": status,
+        "elapsed_secs": elapsed_secs,
+        "bytes": response_bytes,
+        "throttled": throttled,
+        "retry": retry,
+        "call": calls[-1].name if calls else None,
+    })
+
+
+class CallContextFilter(logging.Filter):
+
+    """
+    adds sharepoint_call (innermost instrumented method in progress, or None) to log records
+    """
+
+    def filter(self, record) -> bool:
+        calls = _active_calls.get()
+        record.sharepoint_call = calls[-1].name if calls else None
+        return True
+
+
+class LatencyHistogram:
+
+    """
+    latency histogram over Latency_BucketsSecs, with count, sum and max
+    """
+
+    def __init__(self, buckets_secs=Latency_BucketsSecs) -> Any:
+        self.buckets_secs = buckets_secs
+        self.counts = [0] * (len(buckets_secs) + 1)
+        self.count = 0
+        self.sum_secs = 0.0
+        self.max_secs = 0.0
+
+    def add(self, secs) -> None:
+        self.counts[bisect.bisect_left(self.buckets_secs, secs)] += 1
+        self.count += 1
+        self.sum_secs += secs
+        self.max_secs = max(self.max_secs, secs)
+
+    def percentile(self, q) -> float:
+        """
+        Returns: upper bound (secs) of the bucket holding the q-th percentile (0 < q <= 100), max_secs
+                 for the unbounded bucket, 0 without samples
+        """
+        rank = q / 100.0 * self.count
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return self.buckets_secs[idx] if idx < len(self.buckets_secs) else self.max_secs
+        return 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_secs": self.sum_secs / self.count if self.count else 0.0,
+            "p50_secs": self.percentile(50),
+            "p95_secs": self.percentile(95),
+            "p99_secs": self.percentile(99),
+            "max_secs": self.max_secs,
+            "buckets": {("+inf" if idx == len(self.buckets_secs) else self.buckets_secs[idx]): count
+                        for idx, count in enumerate(self.counts) if count},
+        }
+
+
+class MetricsCollector:
+
+    """
+    thread safe in-memory listener: aggregates events per public method (calls) and per REST endpoint.
+    Register with add_listener(...) or collect_metrics(...).
+    """
+
+    def __init__(self) -> Any:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __call__(self, event) -> None:
+        with self._lock:
+            if event["type"] == Call:
+                metrics = self._calls.setdefault(event["method"], _new_metrics())
+                metrics["errors"] += event["error"] is not None
+                metrics["requests"] += event["requests"]
+                metrics["retries"] += event["retries"]
+                metrics["throttles"] += event["throttles"]
+            else:
+                metrics = self._endpoints.setdefault(event["endpoint"], _new_metrics())
+                metrics["errors"] += event["status"] is None or event["status"] >= 400
+                metrics["requests"] += 1
+                metrics["retries"] += event["retry"]
+                metrics["throttles"] += event["throttled"]
+            metrics["count"] += 1
+            metrics["bytes"] += event["bytes"]
+            metrics["latency"].add(event["elapsed_secs"])
+
+    def stats(self) -> dict:
+        """
+        Returns: dict {calls: {method: metrics}, endpoints: {endpoint: metrics}}, metrics being
+                 {count, errors, requests, bytes, retries, throttles, latency: {count, mean_secs, p50_secs,
+                 p95_secs, p99_secs, max_secs, buckets}}, request counters of calls are totals over all calls
+        """
+        with self._lock:
+            return {
+                "calls": {name: _to_dict(metrics) for name, metrics in self._calls.items()},
+                "endpoints": {name: _to_dict(metrics) for name, metrics in self._endpoints.items()},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls = {}
+            self._endpoints = {}
+
+
+################################### Internal functions #################################
+
+class _CallRecord:
+
+    def __init__(self, name) -> Any:
+        self.name = name
+        self.parent = None
+        self.started_at = None
+        self.elapsed_secs = 0.0  # time spent inside the call, summed over the next() calls of a generator
+        self.requests = 0
+        self.bytes = 0
+        self.retries = 0
+        self.throttles = 0
+        self._lock = threading.Lock()
+
+    def add_request(self, response_bytes, throttled, retry) -> None:
+        # worker threads of the call account concurrently
+        with self._lock:
+            self.requests += 1
+            self.bytes += response_bytes
+            self.retries += retry
+            self.throttles += throttled
+
+
+@contextlib.contextmanager
+def _activate(call) -> Iterator[None]:
+    calls = _active_calls.get()
+    if call.started_at is None:
+        call.started_at = time.perf_counter()
+        call.parent = calls[-1].name if calls else None
+    token = _active_calls.set(calls + (call,))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        call.elapsed_secs += time.perf_counter() - start
+        _active_calls.reset(token)
+
+
+def _finish(call, error) -> None:
+    if call.started_at is None:
+        # generator closed before its first item was requested
+        return
+    event = {
+        "type": Call,
+        "method": call.name,
+        "elapsed_secs": call.elapsed_secs,
+        "requests": call.requests,
+        "bytes": call.bytes,
+        "retries": call.retries,
+        "throttles": call.throttles,
+        "error": repr(error) if error is not None else None,
+        "parent": call.parent,
+    }
+    logger.debug("%s: %.3f secs, %s requests, %s bytes, %s retries, %s throttles",
+                 call.name, event["elapsed_secs"], call.requests, call.bytes, call.retries, call.throttles,
+                 extra={"sharepoint": event})
+    if _listeners:
+        _notify(event)
+
+
+def _notify(event) -> None:
+    with _listeners_lock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        try:
+            listener(event)
+        except Exception:
+            logger.exception("instrumentation listener failed")
+
+
+def _new_metrics() -> dict:
+    return {"count": 0, "errors": 0, "requests": 0, "bytes": 0, "retries": 0, "throttles": 0,
+            "latency": LatencyHistogram()}
+
+
+def _to_dict(metrics) -> dict:
+    return dict(metrics, latency=metrics["latency"].to_dict())
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+
+from typing import Any
+
+# manifest file kept at the root of a mirrored local folder
+Mirror_ManifestName = ".vowelsharepoint-mirror.json"
+
+_Manifest_Version = 1
+
+
+class MirrorManifest:
+
+    """
+    local state of a folder mirrored by SharePointSite.mirror_folder(...): per file server relative url,
+    the local relative path and the etag, size and modified time of the downloaded version,
+    so unchanged files are skipped and files removed from SharePoint are removed locally.
+    Saved as JSON, replaced atomically (a crash keeps the previous manifest).
+    """
+
+    def __init__(self, path, site_url=None, folder_url=None) -> Any:
+
+        self.path = path
+        self.site_url = site_url
+        self.folder_url = folder_url
+
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        """
+        reads the manifest at path. A missing manifest, or one of another site or folder, is empty.
+
+        Returns: True if files were loaded
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as fp:
+                manifest = json.load(fp)
+        except (OSError, ValueError):
+            return False
+
+        if manifest.get("version") != _Manifest_Version:
+            return False
+        if (manifest.get("site_url"), manifest.get("folder_url")) != (self.site_url, self.folder_url):
+            return False
+
+        with self._lock:
+            self._files = manifest.get("files", {})
+        return True
+
+    def save(self) -> None:
+        """
+        writes the manifest to path (temp file + rename)
+        """
+        with self._lock:
+            manifest = {
+                "version": _Manifest_Version,
+                "site_url": self.site_url,
+                "folder_url": self.folder_url,
+                "files": dict(self._files),
+            }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fp:
+            json.dump(manifest, fp)
+        os.replace(tmp_path, self.path)
+
+    def get(self, url) -> dict:
+        """
+        Returns: dict {path, etag, size_bytes, time_last_modified} of the downloaded version of url, None if unknown
+        """
+        with self._lock:
+            return self._files.get(url)
+
+    def set(self, url, relative_path, file_summary) -> None:
+        """
+        records the downloaded version of url (file summary as returned by iter_files_in_folder(...))
+        """
+        entry = {
+            "path": relative_path,
+            "etag": file_summary.get("etag"),
+            "size_bytes": int(file_summary["size_bytes"]),
+            "time_last_modified": file_summary["time_last_modified"],
+        }
+        with self._lock:
+            self._files[url] = entry
+
+    def remove(self, url) -> dict:
+        """
+        Returns: removed entry, None if unknown
+        """
+        with self._lock:
+            return self._files.pop(url, None)
+
+    def urls(self) -> list:
+        """
+        Returns: []str server relative urls of the manifest files
+        """
+        with self._lock:
+            return list(self._files)
+
+    def is_current(self, url, file_summary) -> bool:
+        """
+        Returns: True if the recorded version of url has the etag, size and modified time of file_summary
+        """
+        entry = self.get(url)
+        if entry is None:
+            return False
+        return (entry["etag"] == file_summary.get("etag")
+                and entry["size_bytes"] == int(file_summary["size_bytes"])
+                and entry["time_last_modified"] == file_summary["time_last_modified"])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._files)
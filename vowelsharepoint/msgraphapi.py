@@ -0,0 +1,397 @@
+import collections
+import datetime
+import threading
+import time
+from urllib.parse import quote, unquote, urlparse
+
+import requests
+
+from typing import Any, Iterator
+
+from vowelsharepoint.instrumentation import get_logger, instrumented
+from vowelsharepoint.office365sdk import SharePointSite, DocLibRoots_MissSecs, Download_TimeoutSecs
+from vowelsharepoint.tokenmanager import get_token_manager
+
+Graph_Url = "https://graph.microsoft.com/v1.0"
+
+# max driveItem page size ($top) of children and delta listings
+Graph_PageSize = 999
+
+# driveItem properties read to build a file summary
+DriveItem_SummaryFields = ["id", "name", "size", "lastModifiedDateTime", "eTag", "file", "folder", "root",
+                           "deleted", "parentReference", "sharepointIds"]
+
+# SharePointSite backends, see new_site(...)
+Backend_Rest = "rest"
+Backend_Graph = "graph"
+
+# process wide (document library title (lower case) -> drive {id, root_url}, monotonic listed at), per (graph url, site url)
+_graph_drives = {}
+_graph_drives_lock = threading.Lock()
+
+# uses Microsoft Graph drive APIs for listings, folder summaries and downloads
+# https://learn.microsoft.com/en-us/graph/api/resources/driveitem
+
+logger = get_logger(__name__)
+
+
+def new_site(site_url, backend=Backend_Rest) -> SharePointSite:
+    """
+    creates a SharePointSite for site_url on the given backend, Eg. from deployment configuration.
+    Both backends have the same methods, arguments and results.
+    backend: Backend_Rest (SharePoint REST API) or Backend_Graph (Microsoft Graph, see GraphSharePointSite)
+
+    Returns: SharePointSite, None for an unknown backend
+    """
+    if backend == Backend_Rest:
+        return SharePointSite(site_url)
+    if backend == Backend_Graph:
+        return GraphSharePointSite(site_url)
+    logger.warning("invalid input:unknown backend: %s", backend)
+    return None
+
+
+class GraphSharePointSite(SharePointSite):
+
+    """
+    SharePointSite backed by Microsoft Graph for file listings, folder and library summaries and single
+    file downloads: listings are read in pages of up to Graph_PageSize driveItems (a whole library with one
+    driveItem delta query), which are not subject to the list view threshold, and downloads go to the
+    pre-authenticated @microsoft.graph.downloadUrl of the file.
+    Everything else (permission checks, ACL index, change log, catalog, folder tree) uses the SharePoint
+    REST API of SharePointSite (Graph has no effective permissions API), so both tokens are needed.
+
+    Usage:
+        site = GraphSharePointSite(site_url)   # or new_site(site_url, Backend_Graph)
+        site.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem)
+        files = site.get_files_in_folder("Documents/sharepoint-test-folder1")
+    """
+
+    @instrumented
+    def connect_with_client_certificate(self, tenant_id=None, client_id=None, cert_thumbprint=None, cert_pem=None) -> bool:
+        """
+        create new context/connection to this Sharepoint site using certificate credentials,
+        see SharePointSite.connect_with_client_certificate(...). The Azure AD App also needs
+        Graph application permissions (Eg. Sites.Read.All).
+
+        Return: True on success
+        """
+        if not super(GraphSharePointSite, self).connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem):
+            return False
+
+        graph_url = urlparse(self.graph_url)
+        scopes = ["{0}://{1}/.default".format(graph_url.scheme, graph_url.netloc)]
+        token_manager = get_token_manager(tenant_id, client_id, cert_thumbprint, cert_pem, scopes)
+        token_manager.start()
+        self._graph_token = token_manager.get_token
+
+        return True
+
+    def with_graph_access_token(self, token_func) -> "GraphSharePointSite":
+        """
+        authorizes Graph requests with the token returned by token_func (Eg. acquired elsewhere),
+        instead of connect_with_client_certificate(...)
+        token_func: callable returning a TokenResponse
+
+        Returns: self
+        """
+        self._graph_token = token_func
+        return self
+
+    ################################### Internal functions #################################
+
+    def _get_doc_lib_summary(self, list_title) -> Any:
+        """
+        get_doc_lib(...) from the drive root item, size is the total size of the files of the library
+        """
+        drive = self._get_drive(list_title)
+        if drive is None:
+            logger.warning("doc_lib:%s does not belong to site", list_title)
+            return None
+        root = self._get_graph_json(self._get_drive_item_url(drive, ""), {"$select": "size,lastModifiedDateTime"})
+        return self._get_drive_item_summary(root, drive["root_url"])
+
+    def _get_folder_summary(self, input_path, folder_server_relative_url) -> Any:
+        """
+        get_folder(...) from the folder driveItem, size is the total size of the files under the folder
+        """
+        drive, item_path = self._get_drive_path(folder_server_relative_url)
+        if drive is None:
+            logger.warning("folder:%s does not belong to site", input_path)
+            return None
+        try:
+            folder = self._get_graph_json(self._get_drive_item_url(drive, item_path),
+                                          {"$select": "size,lastModifiedDateTime,folder"})
+        except requests.HTTPError as e:
+            if e.response.status_code == 404:
+                logger.warning("folder:%s does not belong to site", input_path)
+                return None
+            logger.error("folder: %s %s", input_path, e)
+            return None
+
+        if "folder" not in folder:
+            logger.warning("folder:%s does not belong to site", input_path)
+            return None
+        return self._get_drive_item_summary(folder, folder_server_relative_url)
+
+    def _get_file_content(self, server_relative_url) -> (str, int):
+        """
+        download_file(...) source: pre-authenticated download url of the file (short lived,
+        requested without the Graph token, byte ranges supported) and file size
+        """
+        drive, item_path = self._get_drive_path(server_relative_url)
+        if drive is None or not item_path:
+            logger.warning("file:%s does not belong to site", server_relative_url)
+            return None, 0
+        try:
+            item = self._get_graph_json(self._get_drive_item_url(drive, item_path),
+                                        {"$select": "size,file,@microsoft.graph.downloadUrl"})
+        except requests.HTTPError as e:
+            if e.response.status_code == 404:
+                logger.warning("file:%s does not belong to site", server_relative_url)
+                return None, 0
+            raise ValueError(e.response.text)
+
+        if "file" not in item:
+            logger.warning("file:%s does not belong to site", server_relative_url)
+            return None, 0
+        return item["@microsoft.graph.downloadUrl"], item["size"]
+
+    def _iter_files(self, doc_lib, folder_path, tag_column_name=None, modified_after=None, page_size=None) -> Iterator[dict]:
+        """
+        iter_files_in_folder(...) from Graph: one driveItem delta query for a whole library,
+        a breadth first walk of the folder children otherwise (delta is only supported on the
+        root of SharePoint drives, and cannot expand the list item fields of a tag column)
+        """
+        drive = self._get_drive(doc_lib)
+        if drive is None:
+            logger.warning("doc_lib:%s does not belong to site", doc_lib)
+            return
+
+        tag_column_name_internal = ""
+        if tag_column_name:
+            tag_column_name_internal = self._get_lib_field_internal(self.ctx.web.lists.get_by_title(doc_lib), tag_column_name)
+
+        if modified_after is not None and modified_after.tzinfo is not None:
+            modified_after = modified_after.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+        page_size = min(page_size or Graph_PageSize, Graph_PageSize)
+        if folder_path:
+            folder_server_relative_url = self._get_server_relative_url(folder_path)
+            items = self._iter_folder_items(drive, folder_server_relative_url, tag_column_name_internal, page_size)
+        elif tag_column_name_internal:
+            items = self._iter_folder_items(drive, drive["root_url"], tag_column_name_internal, page_size)
+        else:
+            items = self._iter_delta_items(drive, page_size)
+
+        for item, server_relative_url in items:
+            if modified_after is not None and _to_datetime(item["lastModifiedDateTime"]) <= modified_after:
+                continue
+            yield self._get_drive_item_summary(item, server_relative_url, tag_column_name_internal)
+
+    def _iter_folder_items(self, drive, folder_server_relative_url, tag_column_name_internal, page_size) -> Iterator[tuple]:
+        """
+        iterate files under folder_server_relative_url (including files under sub folders), one
+        children listing (paged by page_size) per folder, empty folders are skipped
+
+        Yields: (file driveItem, server relative url)
+        """
+        drive_path = folder_server_relative_url[len(drive["root_url"]):].strip('/')
+        params = {"$top": page_size, "$select": ",".join(DriveItem_SummaryFields)}
+        if tag_column_name_internal:
+            params["$expand"] = "listItem($expand=fields($select={0}))".format(tag_column_name_internal)
+
+        folders = collections.deque([(self._get_drive_item_url(drive, drive_path, "children"), folder_server_relative_url)])
+        while folders:
+            children_url, folder_url = folders.popleft()
+            try:
+                for page in self._iter_graph_pages(children_url, params):
+                    for item in page:
+                        item_url = folder_url + "/" + item["name"]
+                        if "folder" in item:
+                            if item["folder"].get("childCount") != 0:
+                                folders.append(("{0}/drives/{1}/items/{2}/children".format(self.graph_url, drive["id"], item["id"]), item_url))
+                        elif "file" in item:
+                            yield item, item_url
+            except requests.HTTPError as e:
+                if e.response.status_code != 404:
+                    raise
+                # folder removed while walking, or a missing input folder
+                logger.warning("folder:%s does not belong to site", folder_url)
+
+    def _iter_delta_items(self, drive, page_size) -> Iterator[tuple]:
+        """
+        iterate every file of drive with a driveItem delta query (no token: the current state of the drive).
+        Delta items carry no path, urls are built from the folders listed before, items listed before
+        their parent folder are held until it is.
+
+        Yields: (file driveItem, server relative url)
+        """
+        params = {"$top": page_size, "$select": ",".join(DriveItem_SummaryFields)}
+        folder_urls = {}
+        pending = []
+        for page in self._iter_graph_pages(self._get_drive_item_url(drive, "", "delta"), params):
+            pending.extend(item for item in page if "deleted" not in item)
+            while pending:
+                unresolved = []
+                for item in pending:
+                    if "root" in item:
+                        folder_urls[item["id"]] = drive["root_url"]
+                        continue
+                    parent_url = folder_urls.get(item.get("parentReference", {}).get("id"))
+                    if parent_url is None:
+                        unresolved.append(item)
+                    elif "folder" in item:
+                        folder_urls[item["id"]] = parent_url + "/" + item["name"]
+                    elif "file" in item:
+                        yield item, parent_url + "/" + item["name"]
+                if len(unresolved) == len(pending):
+                    break
+                pending = unresolved
+
+        if pending:
+            logger.warning("%s items of drive %s without a listed parent folder", len(pending), drive["root_url"])
+
+    def _iter_graph_pages(self, url, params=None) -> Iterator[list]:
+        """
+        iterate the pages (value) of a Graph collection, following @odata.nextLink.
+        The next page is only requested once the caller is done with the current one.
+
+        Yields: []dict per page
+        """
+        while url:
+            page = self._get_graph_json(url, params)
+            # nextLink carries the query options
+            params = None
+            yield page.get("value", [])
+            url = page.get("@odata.nextLink")
+
+    def _get_graph_json(self, url, params=None) -> dict:
+        """
+        Returns: dict of the JSON response of a Graph GET request, raises requests.HTTPError on error status
+        """
+        if params:
+            url = url + "?" + "&".join("{0}={1}".format(name, quote(str(value), safe="(),=$@.")) for name, value in params.items())
+        return self._execute_request(url).json()
+
+    def _execute_request(self, url, headers=None, stream=False, method="GET", data=None) -> requests.Response:
+        """
+        requests to Graph are authorized with the Graph token, SharePoint REST requests as SharePointSite,
+        other urls (pre-authenticated download urls) are sent without a token
+        """
+        if "/_api/" in url.lower():
+            return super(GraphSharePointSite, self)._execute_request(url, headers, stream, method, data)
+
+        headers = dict(headers or {})
+        if url.startswith(self.graph_url + "/"):
+            token = self._graph_token()
+            headers["Authorization"] = "{0} {1}".format(token.tokenType, token.accessToken)
+            headers["Accept"] = "application/json"
+        response = self.session.request(method, url, headers=headers, data=data, stream=stream, timeout=Download_TimeoutSecs)
+        response.raise_for_status()
+        return response
+
+    def _get_drive_item_url(self, drive, item_path, action="") -> str:
+        """
+        Graph url of the driveItem at item_path (relative to the drive root, "" for the root),
+        Eg. .../drives/{id}/root:/folder1/a.docx, with an optional action (children, delta)
+        """
+        url = "{0}/drives/{1}/root".format(self.graph_url, drive["id"])
+        if item_path:
+            url += ":/" + quote(item_path.strip('/')) + (":" if action else "")
+        if action:
+            url += "/" + action
+        return url
+
+    def _get_drive_item_summary(self, item, server_relative_url, tag_column_name_internal="") -> dict:
+        """
+        summary of a driveItem, same fields as the SharePointSite summaries (file fields for a file)
+        """
+        summary = {"site_url": self.site_url}
+        if "file" in item:
+            summary["item_id"] = int(item["sharepointIds"]["listItemId"])
+        summary["server_relative_url"] = server_relative_url
+        summary["time_last_modified"] = _to_datetime(item["lastModifiedDateTime"]).ctime()
+        if "file" in item:
+            summary["size_bytes"] = str(item["size"])
+            summary["etag"] = item.get("eTag")
+            if tag_column_name_internal:
+                fields = item.get("listItem", {}).get("fields", {})
+                summary["tag"] = fields.get(tag_column_name_internal) or ""
+        else:
+            summary["size_bytes"] = item["size"]
+        return summary
+
+    def _get_drive_path(self, server_relative_url) -> (Any, str):
+        """
+        Returns: (drive of the document library holding server_relative_url, path relative to its root),
+                 (None, "") if server_relative_url is not under a document library of the site
+        """
+        drives = self._get_drives()
+        url = server_relative_url.rstrip('/')
+        for drive in sorted(drives.values(), key=lambda d: len(d["root_url"]), reverse=True):
+            root_url = drive["root_url"]
+            if url.lower() == root_url.lower() or url.lower().startswith(root_url.lower() + "/"):
+                return drive, url[len(root_url):].strip('/')
+        return None, ""
+
+    def _get_doc_lib_root_url(self, doc_lib) -> str:
+        """
+        server relative url of the root folder of document library doc_lib, from its drive
+        """
+        drive = self._get_drive(doc_lib)
+        return drive["root_url"] if drive is not None else None
+
+    def _get_drive(self, doc_lib) -> Any:
+        """
+        Returns: drive {id, root_url} of document library doc_lib (title, case insensitive), None if missing
+        """
+        drive = self._get_drives().get(doc_lib.lower())
+        if drive is None:
+            # Eg. a library created since the drives were listed, relisted at most once per DocLibRoots_MissSecs
+            drive = self._get_drives(reload=True).get(doc_lib.lower())
+        return drive
+
+    def _get_drives(self, reload=False) -> dict:
+        """
+        document libraries of the site: title (lower case) -> drive {id, root_url}, resolved with two
+        requests (site, drives) per site, process wide
+        reload: relist the drives if listed more than DocLibRoots_MissSecs ago
+
+        Returns: dict, {} if the lookup fails
+        """
+        key = (self.graph_url, (self.site_url or "").rstrip('/').lower())
+        with _graph_drives_lock:
+            drives, listed_at = _graph_drives.get(key, (None, 0))
+        if drives is not None and (not reload or time.monotonic() - listed_at < DocLibRoots_MissSecs):
+            return drives
+
+        site_url = urlparse(self.site_url)
+        try:
+            # sites/{hostname}:/{server relative path}
+            site = self._get_graph_json("{0}/sites/{1}:{2}".format(self.graph_url, site_url.netloc, quote(site_url.path.rstrip('/'))),
+                                        {"$select": "id"})
+            pages = self._iter_graph_pages("{0}/sites/{1}/drives".format(self.graph_url, site["id"]),
+                                           {"$select": "id,name,webUrl"})
+            drives = {drive["name"].lower(): {"id": drive["id"], "root_url": unquote(urlparse(drive["webUrl"]).path)}
+                      for page in pages for drive in page}
+        except requests.RequestException as e:
+            logger.error("document libraries: %s", e)
+            return {}
+
+        with _graph_drives_lock:
+            _graph_drives[key] = (drives, time.monotonic())
+        return drives
+
+    def __init__(self, site_url=None, graph_url=Graph_Url) -> Any:
+
+        super(GraphSharePointSite, self).__init__(site_url)
+
+        # instance variables
+        self.graph_url = graph_url.rstrip('/')
+        self._graph_token = None # callable returning the Graph TokenResponse, see connect_with_client_certificate(...)
+
+
+def _to_datetime(value) -> datetime.datetime:
+    # Graph timestamps are UTC (Eg. 2024-02-01T10:00:00Z), naive as the SharePoint REST ones
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
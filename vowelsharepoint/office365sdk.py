@@ -1,17 +1,124 @@
+import datetime
+import email
+import glob
+import hashlib
+import io
+import json
 import os
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import quote, urlparse
+
+import requests
 
-from office365.sharepoint.client_context import ClientContext
 from office365.runtime.client_request_exception import ClientRequestException
+from office365.runtime.compat import get_absolute_url
+from office365.runtime.http.request_options import RequestOptions
+from office365.runtime.queries.service_operation import ServiceOperationQuery
 from office365.sharepoint.files.system_object_type import FileSystemObjectType
 from office365.sharepoint.listitems.listitem import ListItem
+from office365.sharepoint.listitems.collection import ListItemCollection
+from office365.sharepoint.listitems.collection_position import ListItemCollectionPosition
+from office365.sharepoint.permissions.base_permissions import BasePermissions
 from office365.sharepoint.permissions.kind import PermissionKind
 from office365.sharepoint.listitems.caml.query import CamlQuery
-
-from typing import Any
+from office365.sharepoint.views.scope import ViewScope
+from office365.sharepoint.changes.query import ChangeQuery
+from office365.sharepoint.changes.token import ChangeToken
+from office365.sharepoint.changes.type import ChangeType
+
+from typing import Any, Iterator
+
+from vowelsharepoint.accesscache import AccessCache, AccessCache_MaxEntries, AccessCache_TTLSecs
+from vowelsharepoint.aclindex import AclIndex, Everyone_LoginNames
+from vowelsharepoint.catalog import MetadataCatalog, Catalog_MaxStalenessSecs
+from vowelsharepoint.downloadcache import DownloadCache, DownloadCache_MaxBytes
+from vowelsharepoint.filestream import FileStream, Stream_BufferBytes
+from vowelsharepoint.filetable import FileTable, _parse_ctime
+from vowelsharepoint.httpsession import PooledClientContext, get_session
+from vowelsharepoint.instrumentation import get_logger, instrumented, run_in_context
+from vowelsharepoint.mirror import MirrorManifest, Mirror_ManifestName
+from vowelsharepoint.tokenmanager import ManagedAuthenticationContext, get_token_manager
 
 Documents_DocLibName = "Documents"
 Documents_SitePathName = "Shared Documents"
 
+# SharePoint list view threshold = 5,000 items, pages must stay below it
+ListView_Threshold = 5000
+ListItems_PageSize = 2000
+
+# File fields projected by listing queries to build a file summary
+File_SummaryFields = ["File/ServerRelativeUrl", "File/Length", "File/TimeLastModified", "File/ETag"]
+
+# large file downloads, fetched as concurrent byte ranges
+Download_LargeFileSizeBytes = 32 * 1024 * 1024
+Download_ChunkSizeBytes = 8 * 1024 * 1024
+Download_MaxWorkers = 4
+Download_ChunkRetries = 3
+Download_StreamBlockBytes = 1024 * 1024
+Download_TimeoutSecs = 120
+Download_PoolSize = 32
+# suffix of the file a download is written to, renamed once complete
+Download_PartSuffix = ".part"
+
+# large file uploads (>= Upload_LargeFileSizeBytes), sent as an upload session of chunks, one chunk read ahead
+Upload_LargeFileSizeBytes = 32 * 1024 * 1024
+Upload_ChunkSizeBytes = 10 * 1024 * 1024
+Upload_ChunkRetries = 3
+Upload_MaxWorkers = 4
+
+# upload requests: verbose JSON responses, binary bodies
+_Upload_Headers = {"Accept": "application/json;odata=verbose", "Content-Type": "application/octet-stream"}
+
+# mirror_folder(...): downloads in flight per worker, manifest saved every Mirror_CheckpointFiles downloads
+Mirror_InFlightPerWorker = 2
+Mirror_CheckpointFiles = 100
+
+# check_connection_valid(...) result is trusted for this long, or until the token expires if sooner
+Connection_ValidSecs = 300
+Connection_TokenExpiryMarginSecs = 60
+
+# max requests per OData $batch request
+Batch_MaxRequests = 100
+
+# max changes per change log (GetChanges) request
+ChangeLog_FetchLimit = 1000
+
+# change log ChangeType -> get_file_changes(...) kind, other change types are ignored
+_Change_Kinds = {
+    ChangeType.Add: "added",
+    ChangeType.Restore: "added",
+    ChangeType.Update: "modified",
+    ChangeType.SystemUpdate: "modified",
+    ChangeType.Rename: "renamed",
+    ChangeType.MoveInto: "renamed",
+    ChangeType.DeleteObject: "deleted",
+    ChangeType.MoveAway: "deleted",
+}
+
+# list item fields read to build an AclIndex
+AclIndex_ItemFields = ["Id", "FileRef", "FileSystemObjectType", "HasUniqueRoleAssignments"]
+
+# item fields of the get_folder_tree(...) listing
+FolderTree_ItemFields = ["Id", "FileSystemObjectType", "FileRef", "File/ServerRelativeUrl", "File/Length", "File/TimeLastModified"]
+
+# list template of document libraries, see _get_doc_lib_root_url(...)
+DocumentLibrary_BaseTemplate = 101
+
+# process wide check_connection_valid(...) results, shared by short-lived site objects:
+# (token manager, or session for other contexts, site url lower case) -> monotonic valid until
+_valid_connections = {}
+_valid_connections_lock = threading.Lock()
+
+# a library title missing from the site's mapping relists the libraries at most once per DocLibRoots_MissSecs
+DocLibRoots_MissSecs = 60
+
+# process wide (document library title (lower case) -> root folder server relative url, monotonic listed at), per site url
+_doc_lib_roots = {}
+_doc_lib_roots_lock = threading.Lock()
+
 List = "List"
 Folder = "Folder"
 File = "File"
@@ -20,7 +127,79 @@ File = "File"
 # https://github.com/vgrem/Office365-REST-Python-Client
 
 # todo error handling
-# todo logging
+
+logger = get_logger(__name__)
+
+class _GetItemsQuery(ServiceOperationQuery):
+    """
+    List.GetItems(query) service operation which also sends the $select/$expand
+    query options of the returned ListItemCollection (the SDK drops them for service operations)
+    """
+
+    @property
+    def url(self):
+        url = super(_GetItemsQuery, self).url
+        if not self.return_type.query_options.is_empty:
+            url = url + "?" + str(self.return_type.query_options)
+        return url
+
+def _to_base_permissions(value) -> BasePermissions:
+    """
+    BasePermissions from a REST {High, Low} permission mask
+    """
+    permissions = BasePermissions()
+    permissions.High = int(value["High"])
+    permissions.Low = int(value["Low"])
+    return permissions
+
+def _get_principals_with_permission(role_assignments, permission_kind) -> set:
+    """
+    principal ids (users, groups) of REST role assignments (RoleDefinitionBindings expanded)
+    bound to a role with permission_kind
+    """
+    principals = set()
+    for role_assignment in role_assignments:
+        for role_definition in role_assignment["RoleDefinitionBindings"]["results"]:
+            if _to_base_permissions(role_definition["BasePermissions"]).has(permission_kind):
+                principals.add(role_assignment["PrincipalId"])
+                break
+    return principals
+
+def _new_folder_tree_node(server_relative_url) -> dict:
+    return {"name": server_relative_url.rsplit('/', 1)[1], "files": 0, "size_bytes": 0,
+            "time_last_modified": None, "folders": []}
+
+def _get_folder_tree_node(nodes, server_relative_url, root_key) -> dict:
+    """
+    node of get_folder_tree(...) for server_relative_url, created (with any missing ancestors up to the root,
+    Eg. listed on a later page) and linked to its parent on first use.
+    nodes are keyed by lower case url (SharePoint urls are case insensitive), root_key is the root's key
+
+    Returns: dict, None if server_relative_url is not under the root
+    """
+    key = server_relative_url.lower()
+    node = nodes.get(key)
+    if node is None:
+        if not key.startswith(root_key + "/"):
+            return None
+        parent = _get_folder_tree_node(nodes, server_relative_url.rsplit('/', 1)[0], root_key)
+        node = nodes[key] = _new_folder_tree_node(server_relative_url)
+        parent["folders"].append(node)
+    return node
+
+def _get_content_range_size(content_range) -> Any:
+    """
+    complete size of the content from a Content-Range header, Eg. bytes 0-1023/4096 -> 4096
+
+    Returns: int, None if missing or unknown (bytes 0-1023/*)
+    """
+    size = (content_range or "").rpartition("/")[2].strip()
+    return int(size) if size.isdigit() else None
+
+def _max_time(a, b) -> Any:
+    if a is None or (b is not None and b > a):
+        return b
+    return a
 
 class SharePointSite:
 
@@ -28,10 +207,13 @@ class SharePointSite:
     creates a SharePointSite object associated with a provided SharePoint Site
     """
 
+    @instrumented
     def connect_with_client_certificate(self, tenant_id=None, client_id=None, cert_thumbprint=None, cert_pem=None) -> bool:
 
         """
         create new context/connection to this Sharepoint site using certificate credentials.
+        The token is prefetched and refreshed before expiry in the background, by a token manager
+        shared with every SharePointSite of the same tenant and client (see get_token_stats(...)).
         
         https://github.com/vgrem/Office365-REST-Python-Client/wiki/How-to-connect-to-SharePoint-Online-with-certificate-credentials
         https://learn.microsoft.com/en-us/sharepoint/dev/solution-guidance/security-apponly-azuread
@@ -45,56 +227,98 @@ class SharePointSite:
         """
     
         if not tenant_id:
-            print("invalid input:missing tenant_id")
+            logger.warning("invalid input:missing tenant_id")
             return False
         
         if not client_id:
-            print("invalid input:missing client_id")
+            logger.warning("invalid input:missing client_id")
             return False
         
         if not cert_thumbprint:
-            print("invalid input:missing cert_thumbprint")
+            logger.warning("invalid input:missing cert_thumbprint")
             return False
         
         if not cert_pem:
-            print("invalid input:missing cert_pem")
+            logger.warning("invalid input:missing cert_pem")
             return False
 
-        cert_credentials = {
-            "tenant": tenant_id,
-            "client_id": client_id,
-            "thumbprint": cert_thumbprint,
-            "private_key": cert_pem,
-        }
-        ctx = ClientContext(self.site_url).with_client_certificate(**cert_credentials)
+        scopes = ["{0}/.default".format(get_absolute_url(self.site_url))]
+        token_manager = get_token_manager(tenant_id, client_id, cert_thumbprint, cert_pem, scopes)
+        token_manager.start()
+
+        # requests of every site object of this tenant and site share one pooled session (keep-alive)
+        session = get_session(tenant_id, self.site_url, Download_PoolSize)
+        ctx = PooledClientContext(self.site_url, session, ManagedAuthenticationContext(self.site_url, token_manager))
         if not ctx:
-            print('error getting context for sharepoint site')
+            logger.error("error getting context for sharepoint site")
             return False
 
         self.ctx = ctx
+        self.session = session
 
         return True
 
+    @instrumented
     def check_connection_valid(self, siteurl) -> bool:     
         """
-        checks if the existing context/connection is valid for provided site_url
+        checks if the existing context/connection is valid for provided site_url.
+        A valid result is cached process wide for the credentials (token manager, or pooled session),
+        so site objects sharing them make no request until Connection_ValidSecs elapse
+        or the access token is about to expire.
 
-        Return: True on success
+        Return: True on success, False on error (no retries, a failed connection is reported at once)
         """
 
         if self.ctx is None:
-            print('invalid context')
+            logger.error("invalid context")
             return False
 
-        current_web = self.ctx.web.get().execute_query_retry()
-        site = current_web.url
-        print("site:", site)
+        key = (self._get_connection_key(), siteurl.lower())
+        with _valid_connections_lock:
+            valid_until = _valid_connections.get(key, 0)
+        if time.monotonic() < valid_until:
+            return True
+
+        try:
+            current_web = self.ctx.web.get().execute_query()
+        except (requests.RequestException, ClientRequestException) as e:
+            logger.error("invalid context for site: %s", e)
+            current_web = None
+        site = current_web.url if current_web is not None else None
+        logger.debug("site: %s", site)
         if not site or site.lower() != siteurl.lower():
-            print('invalid context for site')
+            logger.error("invalid context for site")
+            with _valid_connections_lock:
+                _valid_connections.pop(key, None)
             return False
-            
+
+        with _valid_connections_lock:
+            _valid_connections[key] = time.monotonic() + self._get_connection_valid_secs()
         return True
     
+    def get_token_stats(self) -> dict:
+        """
+        Returns: dict of access token metrics (token_age_secs, expires_in_secs, refreshes, background_refreshes,
+                 blocking_refreshes, refresh_failures, last_refresh_secs), {} if not connected with a certificate
+        """
+        if self.ctx is None or not isinstance(self.ctx.authentication_context, ManagedAuthenticationContext):
+            return {}
+        return self.ctx.authentication_context.token_manager.stats()
+
+    def get_rate_limit_stats(self) -> dict:
+        """
+        Every request of this site (SDK queries of a connected context, $batch, downloads) is sent
+        through the rate limiter of its pooled session, shared by every thread and site object of the
+        site, and by the tenant limiter across sites (Retry-After pauses all of them).
+
+        Returns: dict of site rate limiter metrics (rate, paused_secs, requests, throttled, waits, waited_secs,
+                 retries) and tenant (same metrics, for every site of the tenant)
+        """
+        stats = self.session.rate_limiter.stats()
+        stats["retries"] = self.session.retries
+        return stats
+
+    @instrumented
     def get_file_by_path(self, file_path):
         """
         gets file at file_path, if exists
@@ -105,12 +329,13 @@ class SharePointSite:
             return self.ctx.web.get_file_by_server_relative_path(file_path).get().execute_query()
         except ClientRequestException as e:
             if e.response.status_code == 404:
-                print(f'file:{file_path} does not belong to site')
+                logger.warning("file:%s does not belong to site", file_path)
                 return None
             else:
-                print(f'file:{file_path} does not belong to site:', e.response.text)
+                logger.warning("file:%s does not belong to site: %s", file_path, e.response.text)
                 raise ValueError(e.response.text)
     
+    @instrumented
     def get_user_by_email(self, user_email):
         """
         gets file at file_path, if exists
@@ -121,13 +346,14 @@ class SharePointSite:
             return self.ctx.web.site_users.get_by_email(user_email).get().execute_query()
         except ClientRequestException as e:
             if e.response.status_code == 404:
-                print(f'user:{user_email} does not belong to site')
+                logger.warning("user:%s does not belong to site", user_email)
                 return None
             else:
-                print(f'user:{user_email} does not belong to site:', e.response.text)
+                logger.warning("user:%s does not belong to site: %s", user_email, e.response.text)
                 raise ValueError(e.response.text)
 
 
+    @instrumented
     def check_user_access_for_file(self, user_email, file_path, access) -> bool:
         """
         checks if user has provided access to the file
@@ -139,37 +365,230 @@ class SharePointSite:
         """
 
         if not user_email:
-            print("invalid input:missing user_email")
+            logger.warning("invalid input:missing user_email")
             return False
 
         if not file_path:
-            print("invalid input:missing file_path")
+            logger.warning("invalid input:missing file_path")
             return False
 
         if access != "OPEN_ITEMS": access = "OPEN_ITEMS" #only supported type for now
         if access == "OPEN_ITEMS":
             permission_kind = PermissionKind.OpenItems
 
-        user_login_name = self.get_user_by_email(user_email)
+        if self.access_cache is not None:
+            permissions = self.access_cache.get_permissions(user_email, file_path)
+            if permissions is not None:
+                return self._has_permission(permissions, permission_kind, user_email, file_path)
+
+        user_login_name = self._get_user_cached(user_email)
         if user_login_name is None or user_login_name == "":
             return False
         
-        target_file = self.get_file_by_path(file_path)
-        if target_file is None:
+        target_item = self._get_file_item_cached(file_path)
+        if target_item is None:
             return False
         
         try:
-            result = target_file.listItemAllFields.get_user_effective_permissions(user_login_name).execute_query_retry()
-            if result.value.has(permission_kind):
-                print(f'user:{user_email} has access to file:"{file_path}')
-                return True
+            loaded = []
+            result = target_item.get_user_effective_permissions(user_login_name).execute_query_retry(
+                success_callback=loaded.append
+            )
+            if self.access_cache is not None and loaded:
+                self.access_cache.set_permissions(user_email, file_path, result.value)
+            return self._has_permission(result.value, permission_kind, user_email, file_path)
+        except ClientRequestException as e:
+            logger.error("user access check failed: %s %s %s", user_login_name, file_path, e.message)
+            return False
+
+    @instrumented
+    def check_user_access_for_files(self, user_email, file_paths, access) -> dict:
+        """
+        checks if user has provided access to each of the files.
+        The user is resolved once, then permissions are checked with OData $batch requests
+        (Batch_MaxRequests files per request) instead of one check_user_access_for_file(...) per file.
+        user_email: Azure AD principal for user
+        file_paths: []file path relative to sharepoint site Eg./sites/test-site-1/Shared Documents/sharepoint-doc.docx
+        access: OPEN_ITEMS
+
+        Return: dict of file_path -> True if user has access, 
+                False for missing files, all False for a missing user
+        """
+
+        if not user_email:
+            logger.warning("invalid input:missing user_email")
+            return {}
+
+        if access != "OPEN_ITEMS": access = "OPEN_ITEMS" #only supported type for now
+        if access == "OPEN_ITEMS":
+            permission_kind = PermissionKind.OpenItems
+
+        access_by_path = {file_path: False for file_path in file_paths if file_path}
+        
+        pending_paths = []
+        for file_path in access_by_path:
+            permissions = None
+            if self.access_cache is not None:
+                permissions = self.access_cache.get_permissions(user_email, file_path)
+            if permissions is not None:
+                access_by_path[file_path] = permissions.has(permission_kind)
             else:
-                print(f'user:{user_email} does not have access to file:"{file_path}')
+                pending_paths.append(file_path)
+
+        if not pending_paths:
+            return access_by_path
+
+        user_login_name = self._get_user_cached(user_email)
+        if user_login_name is None or user_login_name == "":
+            return access_by_path
+
+        for start in range(0, len(pending_paths), Batch_MaxRequests):
+            batch_paths = pending_paths[start:start + Batch_MaxRequests]
+            try:
+                permissions_by_path = self._get_effective_permissions_batch(user_login_name.login_name, batch_paths)
+            except requests.RequestException as e:
+                logger.error("user access check failed: %s, %s files %s", user_email, len(batch_paths), e)
+                continue
+
+            for file_path, permissions in permissions_by_path.items():
+                if permissions is None:
+                    logger.warning("file:%s does not belong to site", file_path)
+                    continue
+                if self.access_cache is not None:
+                    self.access_cache.set_permissions(user_email, file_path, permissions)
+                access_by_path[file_path] = permissions.has(permission_kind)
+
+        logger.info("user:%s has access to %s of %s files",
+                    user_email, list(access_by_path.values()).count(True), len(access_by_path))
+        return access_by_path
+
+    def enable_access_cache(self, ttl_secs=AccessCache_TTLSecs, max_entries=AccessCache_MaxEntries) -> AccessCache:
+        """
+        caches check_user_access_for_file(...) lookups (user principal, file list item, permission mask),
+        so repeated checks are answered from memory until ttl_secs expires.
+        ttl_secs: seconds a cached lookup is trusted, bounds how long a revoked grant can be served
+        max_entries: max entries per cache tier, least recently used entries are evicted
+
+        Returns: AccessCache
+        """
+        self.access_cache = AccessCache(ttl_secs, max_entries)
+        return self.access_cache
+
+    def invalidate_access_cache(self, user_email=None, file_path=None) -> int:
+        """
+        removes cached lookups for user_email and/or file_path, everything if neither is provided
+
+        Returns: number of entries removed
+        """
+        if self.access_cache is None:
+            return 0
+        return self.access_cache.invalidate(user_email, file_path)
+
+    def get_access_cache_stats(self) -> dict:
+        """
+        Returns: dict of cache tier -> {entries, hits, misses, evictions}, {} if cache not enabled
+        """
+        if self.access_cache is None:
+            return {}
+        return self.access_cache.stats()
+
+    @instrumented
+    def build_acl_index(self, doc_lib) -> AclIndex:
+        """
+        snapshots the permissions of doc_lib into an AclIndex, which answers 
+        check_user_access_for_file(..., "OPEN_ITEMS") locally. 
+        Requests: one $batch for the library role assignments, site groups, site users and change token,
+        one paged listing of all items, one $batch per Batch_MaxRequests items with unique permissions.
+        doc_lib: Document Library title Eg. Documents
+
+        Returns: AclIndex on success, None on error (any failed listing page or scope request,
+                 an incomplete index is never returned)
+        """
+
+        if not doc_lib:
+            logger.warning("invalid input:missing doc_lib")
+            return None
+
+        acl_index = AclIndex(self.site_url, doc_lib)
+        try:
+            if not self._load_acl_principals(acl_index):
+                return None
+
+            lib = self.ctx.web.lists.get_by_title(doc_lib)
+            unique_item_ids = []
+            for page in self._iter_folder_item_pages(lib, AclIndex_ItemFields, scope=ViewScope.RecursiveAll):
+                for idx, item in enumerate(page):  # type: int, ListItem
+                    acl_index.set_item(item.id, item.properties["FileRef"])
+                    if item.properties.get("HasUniqueRoleAssignments"):
+                        unique_item_ids.append(item.id)
+
+            self._load_acl_item_scopes(acl_index, unique_item_ids)
+        except (requests.RequestException, ClientRequestException) as e:
+            logger.error("acl index build failed for doc_lib: %s %s", doc_lib, e)
+            return None
+
+        acl_index.built_at = time.time()
+        logger.info("acl index built for doc_lib:%s: %s", doc_lib, acl_index.stats())
+        return acl_index
+
+    @instrumented
+    def refresh_acl_index(self, acl_index) -> bool:
+        """
+        brings acl_index up to date with the library change log, reading only the items changed
+        (added, updated, renamed, moved, deleted, permissions changed) since acl_index.change_token.
+        Users, groups and library role assignments are re-read with one $batch request.
+        acl_index: AclIndex as returned by build_acl_index(...) or AclIndex.load(...)
+
+        Returns: True on success, False on error (acl_index is left unchanged,
+                 rebuild with build_acl_index(...) if the change token has expired)
+        """
+
+        if acl_index is None or not acl_index.change_token:
+            logger.warning("invalid input:missing acl_index")
+            return False
+
+        lib = self.ctx.web.lists.get_by_title(acl_index.doc_lib)
+        try:
+            changes, change_token = self._get_list_changes(lib, acl_index.change_token)
+
+            changed_item_ids = {}
+            for change in changes:
+                changed_item_ids[change["ItemId"]] = change["ChangeType"]
+
+            deleted_item_ids = [item_id for item_id, change_type in changed_item_ids.items()
+                                if change_type == ChangeType.DeleteObject]
+            updated_item_ids = [item_id for item_id, change_type in changed_item_ids.items()
+                                if change_type != ChangeType.DeleteObject]
+            updated_items = self._get_list_items_batch(acl_index.doc_lib, updated_item_ids, AclIndex_ItemFields)
+
+            # read everything first, so a failed request leaves acl_index unchanged
+            principals_index = AclIndex(acl_index.site_url, acl_index.doc_lib)
+            if not self._load_acl_principals(principals_index):
                 return False
-        except ClientRequestException as e:
-            print("error : User, file, error ",user_login_name, file_path, e.message)
+            unique_item_ids = [item_id for item_id, item in updated_items.items()
+                               if item is not None and item.get("HasUniqueRoleAssignments")]
+            scopes = self._get_item_scopes_batch(acl_index.doc_lib, unique_item_ids)
+        except (requests.RequestException, ClientRequestException) as e:
+            logger.error("acl index refresh failed for doc_lib: %s %s", acl_index.doc_lib, e)
             return False
 
+        acl_index.set_principals(principals_index.users, principals_index.groups, principals_index.everyone)
+        acl_index.set_list_scope(principals_index.list_scope)
+        for item_id in deleted_item_ids:
+            acl_index.remove_item(item_id)
+        for item_id, item in updated_items.items():
+            if item is None or (item.get("HasUniqueRoleAssignments") and item_id not in scopes):
+                # deleted, or deleted before its unique scope was read
+                acl_index.remove_item(item_id)
+            else:
+                acl_index.set_item(item_id, item["FileRef"], scopes.get(item_id))
+
+        acl_index.change_token = change_token
+        acl_index.refreshed_at = time.time()
+        logger.info("acl index refreshed for doc_lib:%s, %s items changed", acl_index.doc_lib, len(changed_item_ids))
+        return True
+
+    @instrumented
     def get_doc_lib(self, list_title) -> Any:
         """
         get list summary.
@@ -178,14 +597,16 @@ class SharePointSite:
         Returns: dict on success
         """
 
-        lib = (
-            self.ctx.web.lists.get_by_title(list_title)
-            .root_folder.expand(["StorageMetrics"])
-            .get()
-            .execute_query()
-        )
-        return _get_system_object_summary(List, lib)
+        catalog = self._get_fresh_catalog(list_title)
+        if catalog is not None:
+            # library summary from SharePoint at the last sync (storage metrics include versions, not only files)
+            doc_lib_summary = catalog.get_doc_lib_summary(list_title)
+            if doc_lib_summary is not None:
+                return self._get_catalog_folder_summary(doc_lib_summary["server_relative_url"], doc_lib_summary)
+
+        return self._get_doc_lib_summary(list_title)
 
+    @instrumented
     def get_folder(self, input_path) -> Any:
         """
         get folder summary.
@@ -195,36 +616,110 @@ class SharePointSite:
         """
 
         if not input_path:
-            print("invalid input:missing input_path")
+            logger.warning("invalid input:missing input_path")
             return None
         
         doc_lib = self._get_doclib_from_inputpath(input_path) 
         folder_path = self._get_folderpath_from_inputpath(input_path) 
 
-        print("doc_lib:", doc_lib)
-        print("folder_path:", folder_path)
+        logger.debug("doc_lib: %s", doc_lib)
+        logger.debug("folder_path: %s", folder_path)
 
         # Eg input_path=Documents (doclib only usecase)
         if not folder_path:
-            return self.get_doc_lib(self.ctx, doc_lib)
+            return self.get_doc_lib(doc_lib)
 
-        lib = self.ctx.web.lists.get_by_title(doc_lib)
-        items = (
-            lib.items.select(["FileSystemObjectType"])
-            .expand(["Folder"]) #office365/sharepoint/files/system_object_type.py
-            .get_all()
-            .execute_query_retry()
-        )
-        
-        for idx, item in enumerate(items):  # type: int, ListItem
-            if folder_path in item.folder.serverRelativeUrl: 
-                return self._get_system_object_summary(Folder, item.folder)
-    
-        return None
+        folder_server_relative_url = self._get_server_relative_url(folder_path)
+
+        catalog = self._get_fresh_catalog(doc_lib)
+        if catalog is not None:
+            folder_summary = catalog.get_folder_summary(doc_lib, folder_server_relative_url)
+            if folder_summary is not None:
+                return self._get_catalog_folder_summary(folder_server_relative_url, folder_summary)
+
+        return self._get_folder_summary(input_path, folder_server_relative_url)
+
+    @instrumented
+    def get_folder_tree(self, input_path, page_size=None) -> Any:
+        """
+        get the folder hierarchy under given folder, with recursive size, file count and latest
+        modified time per folder. Aggregated locally from one paged listing of the folder subtree
+        (files and folders), so the cost does not grow with the number of folders.
+        input_path: Folder path, starting at Document Library for Eg. Documents/sharepoint-test-folder1
+        page_size: optional, items per request (capped below the list view threshold)
+
+        Returns: dict on success, nested per folder (JSON serialisable):
+                 {name, files, size_bytes, time_last_modified (None without files), folders: []dict}
+                 the root also carries site_url and server_relative_url
+                 None on error (any failed listing page, a partial tree is never returned)
+        """
+
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return None
+
+        doc_lib = self._get_doclib_from_inputpath(input_path)
+        folder_path = self._get_folderpath_from_inputpath(input_path)
 
+        # Eg input_path=Documents (doclib only usecase), whole library
+        folder_server_relative_url = None
+        if folder_path:
+            root_url = folder_server_relative_url = self._get_server_relative_url(folder_path)
+        else:
+            root_url = self._get_doc_lib_root_url(doc_lib)
+            if not root_url:
+                logger.warning("doc_lib:%s does not belong to site", doc_lib)
+                return None
+
+        root_key = root_url.lower()
+        nodes = {root_key: _new_folder_tree_node(root_url)}
+        try:
+            lib = self.ctx.web.lists.get_by_title(doc_lib)
+            pages = self._iter_folder_item_pages(
+                lib, FolderTree_ItemFields, ["File"], folder_server_relative_url, None, page_size, ViewScope.RecursiveAll
+            )
+            for page in pages:
+                for item in page:  # type: ListItem
+                    if item.file_system_object_type == FileSystemObjectType.Folder:
+                        _get_folder_tree_node(nodes, item.properties["FileRef"], root_key)
+                        continue
+                    file = item.file
+                    node = _get_folder_tree_node(nodes, file.serverRelativeUrl.rsplit('/', 1)[0], root_key)
+                    if node is None:
+                        logger.warning("folder tree: file outside of %s: %s", root_url, file.serverRelativeUrl)
+                        continue
+                    node["files"] += 1
+                    node["size_bytes"] += int(file.properties['Length'])
+                    node["time_last_modified"] = _max_time(node["time_last_modified"], file.properties['TimeLastModified'])
+        except (requests.RequestException, ClientRequestException) as e:
+            logger.error("folder tree: %s %s", input_path, e)
+            return None
+
+        # deepest folders first, so every folder is complete before it is added to its parent
+        for url in sorted(nodes, key=lambda url: url.count('/'), reverse=True):
+            node = nodes[url]
+            node["folders"].sort(key=lambda child: child["name"])
+            if node["time_last_modified"] is not None:
+                latest = node["time_last_modified"]
+                node["time_last_modified"] = latest.ctime()
+            else:
+                latest = None
+            if url == root_key:
+                continue
+            parent = nodes[url.rsplit('/', 1)[0]]
+            parent["files"] += node["files"]
+            parent["size_bytes"] += node["size_bytes"]
+            parent["time_last_modified"] = _max_time(parent["time_last_modified"], latest)
+
+        tree = nodes[root_key]
+        tree["site_url"] = self.site_url
+        tree["server_relative_url"] = root_url
+        return tree
+
+    @instrumented
     def get_files_in_folder(self, input_path, tag_column_name=None, modified_after=None) -> Any:
         """
-        Note: use with caution
+        Note: use with caution, prefer iter_files_in_folder(...) for large folders
         get all files under given folder (including files under sub folders).
         input_path: Folder path, starting at Document Library for Eg. Documents/sharepoint-test-folder1
         tag_column_name: optional, column name from sharepoint to get tags
@@ -234,64 +729,324 @@ class SharePointSite:
         """
     
         if not input_path:
-            print("invalid input:missing input_path")
+            logger.warning("invalid input:missing input_path")
             return None
-        
+
+        return list(self.iter_files_in_folder(input_path, tag_column_name, modified_after))
+
+    @instrumented
+    def iter_files_in_folder(self, input_path, tag_column_name=None, modified_after=None, page_size=None) -> Iterator[dict]:
+        """
+        iterate all files under given folder (including files under sub folders).
+        Files are fetched one page at a time and yielded as each page arrives,
+        so memory stays bounded by page_size.
+        input_path: Folder path, starting at Document Library for Eg. Documents/sharepoint-test-folder1
+        tag_column_name: optional, column name from sharepoint to get tags
+        modified_after: optional, get only files modified after datetime
+        page_size: optional, items per request (capped below the list view threshold)
+
+        Yields: dict per file, as returned by get_files_in_folder(...)
+        Raises: ClientRequestException / requests.RequestException if a page of the listing fails
+        """
+
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return
+
         doc_lib = self._get_doclib_from_inputpath(input_path) 
         folder_path = self._get_folderpath_from_inputpath(input_path) 
- 
+
+        catalog = self._get_fresh_catalog(doc_lib, tag_column_name)
+        if catalog is not None:
+            folder_server_relative_url = None
+            if folder_path:
+                folder_server_relative_url = self._get_server_relative_url(folder_path)
+            yield from catalog.get_files(doc_lib, folder_server_relative_url, modified_after, bool(tag_column_name))
+            return
+
+        yield from self._iter_files(doc_lib, folder_path, tag_column_name, modified_after, page_size)
+
+    @instrumented
+    def get_file_table(self, input_path, tag_column_name=None, modified_after=None, page_size=None) -> Any:
+        """
+        get all files under given folder (including files under sub folders) as a memory compact FileTable
+        (about a fifth of the memory of get_files_in_folder(...)), for large libraries. Rows are dict compatible
+        FileRecord views, the table streams to NDJSON / Parquet (write_ndjson(...), write_parquet(...)).
+        input_path: Folder path, starting at Document Library for Eg. Documents/sharepoint-test-folder1
+        tag_column_name: optional, column name from sharepoint to get tags
+        modified_after: optional, get only files modified after datetime
+        page_size: optional, items per request (capped below the list view threshold)
+
+        Returns: FileTable on success
+        """
+
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return None
+
+        return FileTable(self.iter_files_in_folder(input_path, tag_column_name, modified_after, page_size))
+
+    def enable_catalog(self, db_path, max_staleness_secs=Catalog_MaxStalenessSecs) -> MetadataCatalog:
+        """
+        serves get_doc_lib(...), get_folder(...), get_files_in_folder(...) and iter_files_in_folder(...)
+        from a local SQLite catalog of file metadata. A library is synced on first use (full crawl),
+        then incrementally from the change log (see sync_catalog(...)) once older than max_staleness_secs.
+        db_path: SQLite database file, Eg. /var/lib/vowel/sharepoint-catalog.db (":memory:" for a process local catalog)
+        max_staleness_secs: seconds catalog results are served without a sync
+
+        Returns: MetadataCatalog
+        """
+        self.catalog = MetadataCatalog(db_path, max_staleness_secs)
+        return self.catalog
+
+    @instrumented
+    def sync_catalog(self, doc_lib, tag_column_name=None) -> bool:
+        """
+        syncs the catalog with doc_lib, from the change log since the last sync if possible,
+        with a full crawl otherwise (first sync, expired change token, deleted folder, new tag_column_name)
+        doc_lib: Document Library title Eg. Documents
+        tag_column_name: optional, column name from sharepoint to get tags, defaults to the one of the last sync
+
+        Returns: True on success, False on error (the catalog is only replaced after a complete listing)
+        """
+
+        if self.catalog is None:
+            logger.warning("invalid input:catalog not enabled")
+            return False
+
+        if not doc_lib:
+            logger.warning("invalid input:missing doc_lib")
+            return False
+
+        state = self.catalog.get_sync_state(doc_lib)
+        if state is not None and not tag_column_name:
+            tag_column_name = state["tag_column_name"]
+
+        try:
+            # served by get_doc_lib(...), as the file sizes do not add up to the library storage metrics
+            doc_lib_summary = self._get_doc_lib_summary(doc_lib)
+        except (requests.RequestException, ClientRequestException) as e:
+            logger.error("catalog sync failed for doc_lib: %s %s", doc_lib, e)
+            return False
+        if doc_lib_summary is None:
+            return False
+
+        if state is not None and state["change_token"] and state["tag_column_name"] == tag_column_name:
+            file_changes = self.get_file_changes(doc_lib, state["change_token"], tag_column_name)
+            if file_changes is not None and self.catalog.apply_changes(doc_lib, file_changes):
+                self.catalog.set_doc_lib_summary(doc_lib, doc_lib_summary)
+                return True
+            logger.info("catalog sync: full crawl needed for doc_lib: %s", doc_lib)
+
+        # change token taken before the crawl, changes made during the crawl are applied by the next sync
+        change_token = self.get_change_token(doc_lib)
+        if change_token is None:
+            return False
+        try:
+            # a failed listing page raises, a partial listing never replaces the catalog
+            file_summaries = list(self._iter_files(doc_lib, "", tag_column_name))
+        except (requests.RequestException, ClientRequestException) as e:
+            logger.error("catalog sync failed for doc_lib: %s %s", doc_lib, e)
+            return False
+
+        self.catalog.replace_files(doc_lib, file_summaries, change_token, tag_column_name,
+                                   doc_lib_summary["server_relative_url"])
+        self.catalog.set_doc_lib_summary(doc_lib, doc_lib_summary)
+        logger.info("catalog synced for doc_lib:%s, %s files", doc_lib, len(file_summaries))
+        return True
+
+    @instrumented
+    def get_change_token(self, input_path) -> str:
+        """
+        gets the current change token of the Document Library of input_path.
+        Take it before a full crawl with get_files_in_folder(...), then pass it to get_file_changes(...).
+        input_path: Folder path, starting at Document Library for Eg. Documents/sharepoint-test-folder1
+
+        Returns: change token on success, None on error
+        """
+
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return None
+
+        doc_lib = self._get_doclib_from_inputpath(input_path)
+        try:
+            lib = self.ctx.web.lists.get_by_title(doc_lib).select(["CurrentChangeToken"]).get().execute_query()
+        except ClientRequestException as e:
+            logger.error("change token for doc_lib: %s %s", doc_lib, e.message)
+            return None
+        return lib.current_change_token.StringValue
+
+    @instrumented
+    def get_file_changes(self, input_path, change_token, tag_column_name=None) -> dict:
+        """
+        get files added, modified, renamed (or moved) and deleted under given folder (including sub folders)
+        since change_token, from the Document Library change log. 
+        Requests are in proportion to the changes: one change log request per ChangeLog_FetchLimit changes,
+        one $batch request per Batch_MaxRequests changed files (+ the files of renamed folders).
+        input_path: Folder path, starting at Document Library for Eg. Documents/sharepoint-test-folder1
+        change_token: as returned by get_change_token(...) or a previous get_file_changes(...)
+        tag_column_name: optional, column name from sharepoint to get tags
+
+        Returns: dict on success
+                 {
+                    "added": []dict, "modified": []dict, "renamed": []dict, file summaries as returned by get_files_in_folder(...)
+                    "deleted": []dict, {"item_id"} of deleted files and folders (any folder, paths are gone from SharePoint),
+                               and of files renamed or moved out of the folder (with the files of such folders)
+                    "change_token": token to persist for the next call
+                 }
+                 None on error, Eg. an expired change token (full crawl needed) or a failed request
+        """
+
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return None
+
+        if not change_token:
+            logger.warning("invalid input:missing change_token")
+            return None
+
+        doc_lib = self._get_doclib_from_inputpath(input_path)
+        folder_path = self._get_folderpath_from_inputpath(input_path)
+        folder_prefix = ""
+        if folder_path:
+            folder_prefix = self._get_server_relative_url(folder_path) + "/"
+
         lib = self.ctx.web.lists.get_by_title(doc_lib)
 
         tag_column_name_internal = ""
         if tag_column_name:
             tag_column_name_internal = self._get_lib_field_internal(lib, tag_column_name)
-        
-        if modified_after:
-            filter_text = "Modified gt datetime'{0}'".format(modified_after.isoformat())
-            items = (
-                lib.items.select(["FileSystemObjectType"])
-                .filter(filter_text)
-                .expand(["File", "Folder"]) #office365/sharepoint/files/system_object_type.py
-                .get_all()
-                .execute_query_retry()
-            )
-        else:
-            items = (
-                lib.items.select(["FileSystemObjectType"])
-                .expand(["File", "Folder"]) #office365/sharepoint/files/system_object_type.py
-                .get_all()
-                .execute_query_retry()
-            )
 
-        file_list = []
+        select = ["Id", "FileSystemObjectType", "FileRef"] + File_SummaryFields
+        if tag_column_name_internal:
+            select.append(tag_column_name_internal)
+
+        file_changes = {"added": [], "modified": [], "renamed": [], "deleted": [], "change_token": change_token}
+        try:
+            changes, file_changes["change_token"] = self._get_list_changes(lib, change_token)
+
+            # one kind per item, a later change only overrides a weaker one 
+            # Eg. added then modified -> added, renamed then modified -> renamed, added then deleted -> deleted
+            change_kind_by_item = {}
+            for change in changes:
+                change_kind = _Change_Kinds.get(change["ChangeType"])
+                if change_kind is None:
+                    continue
+                previous_kind = change_kind_by_item.get(change["ItemId"])
+                if change_kind == "modified" and previous_kind in ("added", "renamed"):
+                    continue
+                if change_kind == "renamed" and previous_kind == "added":
+                    continue
+                change_kind_by_item[change["ItemId"]] = change_kind
+
+            changed_item_ids = [item_id for item_id, change_kind in change_kind_by_item.items() if change_kind != "deleted"]
+            items = self._get_list_items_batch(doc_lib, changed_item_ids, select, ["File"])
+
+            for item_id, change_kind in change_kind_by_item.items():
+                if change_kind == "deleted" or items[item_id] is None:
+                    file_changes["deleted"].append({"item_id": item_id})
+                    continue
+
+                item = lib.items.get_by_id(item_id)
+                for name, value in items[item_id].items():
+                    if not name.startswith("__"):
+                        item.set_property(name, value, False)
+                # urls are case insensitive
+                if not item.properties["FileRef"].lower().startswith(folder_prefix.lower()):
+                    if change_kind == "renamed":
+                        # renamed or moved out of the folder, gone for the caller
+                        file_changes["deleted"].append({"item_id": item_id})
+                        if item.file_system_object_type != FileSystemObjectType.File:
+                            for page in self._iter_folder_item_pages(lib, ["Id"], None, item.properties["FileRef"]):
+                                file_changes["deleted"].extend({"item_id": child.id} for child in page)
+                    continue
 
-        if folder_path == "": 
-            # return all files from doc_lib as folder_path is empty. Eg.input_path = Documents
-            for idx, item in enumerate(items):  # type: int, ListItem       
-                if item.file_system_object_type == FileSystemObjectType.File:
-                    summary = self._get_system_object_summary(File, item.file, tag_column_name_internal)
-                    file_list.append(summary)
-        else:
-            # return files under input_path. Eg.Files under input_path = Documents/sharepoint-test-folder1
-            folder = self.get_folder(input_path)
-            for idx, item in enumerate(items):  # type: int, ListItem       
                 if item.file_system_object_type == FileSystemObjectType.File:
-                    #if folder_path in item.file.serverRelativeUrl:
-                    if folder['server_relative_url'] in item.file.serverRelativeUrl:
-                        summary = self._get_system_object_summary(File, item.file, tag_column_name_internal)
-                        file_list.append(summary)
-        
-        return file_list
+                    file_changes[change_kind].append(self._get_system_object_summary(File, item, tag_column_name_internal))
+                elif change_kind == "renamed":
+                    # a renamed or moved folder changes the url of every file under it
+                    # (a failed listing page fails the call, never a short list of renamed files)
+                    pages = self._iter_folder_item_pages(lib, select, ["File"], item.properties["FileRef"])
+                    for page in pages:
+                        for idx, child in enumerate(page):  # type: int, ListItem
+                            file_changes["renamed"].append(
+                                self._get_system_object_summary(File, child, tag_column_name_internal)
+                            )
+        except (requests.RequestException, ClientRequestException) as e:
+            logger.error("file changes for input_path: %s %s", input_path, e)
+            return None
+
+        logger.info("file changes for input_path:%s, added:%s, modified:%s, renamed:%s, deleted:%s", input_path,
+                    len(file_changes["added"]), len(file_changes["modified"]), len(file_changes["renamed"]), len(file_changes["deleted"]))
+        return file_changes
+
+    def enable_download_cache(self, cache_dir, max_bytes=DownloadCache_MaxBytes) -> DownloadCache:
+        """
+        serves download_file(...) (with etag), download_many(...) and get_cached_file(...) from an on-disk cache
+        of file content keyed by site, server relative url and etag, so repeat downloads of a file version are
+        local disk reads. Processes of a node can share cache_dir, downloaded files are hardlinks to the
+        read-only cache content (a copy if download_path is on another file system).
+        cache_dir: cache directory, created if missing, Eg. /var/cache/vowel/sharepoint
+        max_bytes: cache size budget, least recently used content is evicted above it
+
+        Returns: DownloadCache
+        """
+        self.download_cache = DownloadCache(cache_dir, max_bytes)
+        return self.download_cache
+
+    def get_download_cache_stats(self) -> dict:
+        """
+        Returns: dict {entries, objects, bytes, max_bytes, hits, misses, evictions}, {} if cache not enabled
+        """
+        if self.download_cache is None:
+            return {}
+        return self.download_cache.stats()
+
+    @instrumented
+    def get_cached_file(self, file_summary) -> str:
+        """
+        get a local, read-only path to the content of a file, downloaded into the download cache if
+        the file version is not cached yet (see enable_download_cache(...)). The path is shared,
+        do not modify or remove it, a later eviction removes it (open files stay readable).
+        file_summary: dict as returned by get_files_in_folder(...) / iter_files_in_folder(...)
 
-    def download_file(self, input_path, input_size_bytes, download_path) -> (dict, bool):
+        Returns: str on success
+        """
+
+        if self.download_cache is None:
+            logger.warning("download cache not enabled")
+            return None
+
+        server_relative_url = file_summary["server_relative_url"]
+        expected_size = int(file_summary["size_bytes"])
+        if not self._is_cacheable(file_summary.get("etag"), expected_size):
+            logger.warning("invalid input:file can not be cached: %s", server_relative_url)
+            return None
+
+        return self._get_cached_content(self._get_file_content_url(server_relative_url), server_relative_url,
+                                        file_summary["etag"], expected_size)
+
+    @instrumented
+    def download_file(self, input_path, input_size_bytes, download_path,
+                      chunk_size_bytes=Download_ChunkSizeBytes, max_workers=Download_MaxWorkers, etag=None) -> (dict, bool):
         """
         download file provided at input_path to download_path. 
         (open or checked out files will also be downloaded)
+        Large files (>= Download_LargeFileSizeBytes) are split into byte ranges of chunk_size_bytes,
+        fetched concurrently by max_workers threads and written in place into a preallocated part file,
+        renamed to the local file once complete (a failed download leaves no partial local file).
 
         input_path: File path (as returned by get_files_in_folder(...)), 
                     starting at Document Library for Eg. /sites/test-site-1/Shared Documents/{file_name}
                     todo support automatic path conversion here ?            
+        input_size_bytes: file size (as returned by get_files_in_folder(...)), verified against the size on the server,
+                          a file changed since it was listed is not downloaded
         download_path : local path to download file. local path must be pre-existing.
+        chunk_size_bytes: optional, byte range size for large files
+        max_workers: optional, concurrent byte range requests for large files
+        etag: optional, file etag (as returned by get_files_in_folder(...)), with a download cache enabled
+              (see enable_download_cache(...)) the file is served from the cache, as a hardlink
 
         Returns: Dict of downloaded file details, bool
                  Caller to check bool for success/failure detection
@@ -301,52 +1056,1286 @@ class SharePointSite:
         
         # todo any other checks w+, r+ permissions (volume mounts ok?)
         if not os.path.isdir(download_path):
-            print("Provided download_path does not exist")
+            logger.warning("Provided download_path does not exist")
             return file_download_summary, False
 
-        #source_file = self.ctx.web.get_file_by_server_relative_path(input_path)
-        source_file = self.get_file_by_path(input_path)
-        if source_file is None:
+        content_url, expected_size = self._get_file_content(input_path)
+        if content_url is None:
             return file_download_summary, False
 
-        local_file_name = os.path.join(download_path, os.path.basename(input_path))
+        # byte ranges are computed from the size on the server, never from a stale listed size
+        if input_size_bytes and int(input_size_bytes) != expected_size:
+            logger.error("file size mismatch: %s,size:%s bytes,expected:%s bytes (changed since listed)",
+                         input_path, expected_size, input_size_bytes)
+            return file_download_summary, False
 
-        with open(local_file_name, "wb") as local_file:
-            # todo add large file checks ?
-            #source_file.download_session(local_file, print_download_progress).execute_query() #-> large files download
-            source_file.download(local_file).execute_query()
-            file_stats = os.stat(local_file_name)
-            print("[Ok] file has been downloaded: {0},size:{1} bytes".format(local_file_name, file_stats.st_size))
-            file_download_summary = {
-                "file_name": local_file_name,
-                "file_size_bytes": file_stats.st_size,
-            }
-            return file_download_summary, True
+        local_file_name = os.path.join(download_path, os.path.basename(input_path))
 
-        return file_download_summary, False
+        if not self._download_content(content_url, local_file_name, expected_size, chunk_size_bytes, max_workers,
+                                      cache_key=(input_path, etag)):
+            return file_download_summary, False
 
-    
-    ################################### Internal functions #################################
+        file_download_summary = {
+            "file_name": local_file_name,
+            "file_size_bytes": expected_size,
+        }
+        return file_download_summary, True
 
-    def _get_lib_field_internal(self, lib, field_ext_name) -> str:
+    @instrumented
+    def open_file_stream(self, input_path, buffer_size=Stream_BufferBytes) -> io.BufferedReader:
         """
-        gets field_internal_name from input field_ext_name
+        open a file provided at input_path for reading, streamed from SharePoint without a local file,
+        Eg. for parsers reading documents directly:
+            with site.open_file_stream(path) as fp:
+                data = fp.read(4096)
+        The file is seekable (zip based formats, Eg. docx, read the end of the file first),
+        each seek is a new byte range request, sequential reads share one request.
+
+        input_path: File path (as returned by get_files_in_folder(...)),
+                    starting at Document Library for Eg. /sites/test-site-1/Shared Documents/{file_name}
+        buffer_size: optional, read buffer size
 
-        Returns: field_internal_name if found, 
-                 "" on error
+        Returns: binary file object (read, readinto, seek), None on failure. Caller to close it
         """
-        fields = lib.fields.get().execute_query()
-        for field in fields:
-            #print("Field name Internal {0}".format(field.internal_name))
-            #print("Field name Internal {0}".format(field.title))
-            #print(field._properties)
-            if field.title == field_ext_name:
-                return field.internal_name
 
-    
-        print("invalid input:column not found in Sharepoint:", field_ext_name)
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return None
 
-        return ""
+        content_url, size = self._get_file_content(input_path)
+        if content_url is None:
+            return None
+
+        def open_response(offset):
+            headers = {"Accept-Encoding": "identity"}
+            if offset:
+                headers["Range"] = "bytes={0}-".format(offset)
+            return self._execute_request(content_url, headers, stream=True)
+
+        return io.BufferedReader(FileStream(open_response, size, input_path), buffer_size)
+
+    @instrumented
+    def iter_file_chunks(self, input_path, chunk_size=Download_StreamBlockBytes, reuse_buffer=False) -> Iterator[bytes]:
+        """
+        iterate the content of a file provided at input_path, streamed from SharePoint without a local file
+        and without buffering the whole file, Eg. to hash, upload or parse a document as it arrives.
+
+        input_path: File path (as returned by get_files_in_folder(...)),
+                    starting at Document Library for Eg. /sites/test-site-1/Shared Documents/{file_name}
+        chunk_size: optional, max bytes per chunk
+        reuse_buffer: optional, yield memoryview chunks of one reused buffer (no allocation per chunk),
+                      a chunk is only valid until the next one is requested
+
+        Yields: bytes (memoryview if reuse_buffer) per chunk, nothing if the file does not exist
+        Raises: IOError if the content is not the size of the file (Eg. the connection closed early)
+        """
+
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return
+
+        content_url, size = self._get_file_content(input_path)
+        if content_url is None:
+            return
+
+        received_bytes = 0
+        response = self._execute_request(content_url, {"Accept-Encoding": "identity"}, stream=True)
+        with response:
+            if not reuse_buffer:
+                for chunk in response.iter_content(chunk_size):
+                    received_bytes += len(chunk)
+                    yield chunk
+            else:
+                buffer = memoryview(bytearray(chunk_size))
+                while True:
+                    read_bytes = response.raw.readinto(buffer)
+                    if not read_bytes:
+                        break
+                    received_bytes += read_bytes
+                    yield buffer[:read_bytes]
+
+        # a truncated file is never passed off as complete
+        if received_bytes != size:
+            logger.error("file stream size mismatch: %s,size:%s bytes,expected:%s bytes", input_path, received_bytes, size)
+            raise IOError("file stream size mismatch: {0},size:{1} bytes,expected:{2} bytes".format(
+                input_path, received_bytes, size))
+
+    @instrumented
+    def download_many(self, file_summaries, download_path, max_workers=Download_MaxWorkers,
+                      chunk_size_bytes=Download_ChunkSizeBytes) -> (list, dict):
+        """
+        download many files concurrently to download_path, over the shared HTTP session.
+        Files keep their folder structure relative to the site, 
+        Eg. /sites/test-site-1/Shared Documents/folder1/a.docx -> {download_path}/Shared Documents/folder1/a.docx
+
+        With a download cache enabled (see enable_download_cache(...)), files are served from the cache by etag.
+
+        file_summaries: []dict as returned by get_files_in_folder(...) / iter_files_in_folder(...),
+                        a file whose size changed since it was listed fails (it is never truncated to size_bytes)
+        download_path : local path to download files. local path must be pre-existing.
+        max_workers: optional, concurrent file downloads
+        chunk_size_bytes: optional, byte range size for large files
+
+        Returns: [](dict, bool) per file in file_summaries order (as returned by download_file(...)),
+                 dict of stats: files, failed, bytes, elapsed_secs, files_per_sec, bytes_per_sec
+        """
+
+        stats = {
+            "files": 0,
+            "failed": 0,
+            "bytes": 0,
+            "elapsed_secs": 0.0,
+            "files_per_sec": 0.0,
+            "bytes_per_sec": 0.0,
+        }
+
+        if not os.path.isdir(download_path):
+            logger.warning("Provided download_path does not exist")
+            return [], stats
+
+        start_time = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(run_in_context(self._download_summary_file), file_summary, download_path, chunk_size_bytes)
+                for file_summary in file_summaries
+            ]
+            results = [future.result() for future in futures]
+        elapsed_secs = time.monotonic() - start_time
+
+        for file_download_summary, ok in results:
+            stats["files"] += 1
+            if ok:
+                stats["bytes"] += file_download_summary["file_size_bytes"]
+            else:
+                stats["failed"] += 1
+        stats["elapsed_secs"] = elapsed_secs
+        if elapsed_secs > 0:
+            stats["files_per_sec"] = (stats["files"] - stats["failed"]) / elapsed_secs
+            stats["bytes_per_sec"] = stats["bytes"] / elapsed_secs
+
+        logger.info("downloaded %s files, %s failed, %s bytes in %.2f secs",
+                    stats["files"] - stats["failed"], stats["failed"], stats["bytes"], elapsed_secs)
+
+        return results, stats
+
+    @instrumented
+    def mirror_folder(self, input_path, local_root, max_workers=Download_MaxWorkers, delete_removed=True) -> dict:
+        """
+        keeps local_root a mirror of the files under given folder (including files under sub folders).
+        A manifest of the downloaded versions (etag, size, modified time) is kept in local_root,
+        so a run only downloads new and changed files. Files are written to a part file renamed once
+        complete (local files are never partial), an interrupted download resumes from the part file
+        on the next run, and files no longer in the folder are removed locally.
+        Files keep their folder structure relative to the mirrored folder,
+        Eg. Documents/folder1 : /sites/test-site-1/Shared Documents/folder1/nested/a.docx -> {local_root}/nested/a.docx
+
+        input_path: Folder path, starting at Document Library for Eg. Documents/sharepoint-test-folder1
+        local_root: local path of the mirror. local path must be pre-existing.
+        max_workers: optional, concurrent file downloads
+        delete_removed: optional, remove local files no longer in the folder (only after a complete listing)
+
+        Returns: dict of stats: files, downloaded, resumed, skipped, deleted, failed, bytes, elapsed_secs
+                 None on invalid input
+        Raises: ClientRequestException / requests.RequestException if the listing fails (nothing is removed locally)
+        """
+
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return None
+
+        if not os.path.isdir(local_root):
+            logger.warning("Provided local_root does not exist")
+            return None
+
+        folder_url = self._get_folder_url_from_inputpath(input_path)
+        if not folder_url:
+            logger.warning("invalid input:document library not found: %s", input_path)
+            return None
+
+        manifest = MirrorManifest(os.path.join(local_root, Mirror_ManifestName), self.site_url, folder_url)
+        manifest.load()
+
+        stats = {
+            "files": 0,
+            "downloaded": 0,
+            "resumed": 0,
+            "skipped": 0,
+            "deleted": 0,
+            "failed": 0,
+            "bytes": 0,
+            "elapsed_secs": 0.0,
+        }
+
+        # url -> local relative path of every file in the folder
+        seen = {}
+        start_time = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                pending = set()
+                try:
+                    for file_summary in self.iter_files_in_folder(input_path):
+                        server_relative_url = file_summary["server_relative_url"]
+                        relative_path = self._get_mirror_relative_path(folder_url, server_relative_url)
+                        if not relative_path:
+                            logger.warning("invalid input:file outside of folder: %s", server_relative_url)
+                            continue
+
+                        seen[server_relative_url] = relative_path
+                        stats["files"] += 1
+
+                        local_file_name = os.path.join(local_root, relative_path)
+                        if (manifest.is_current(server_relative_url, file_summary) and os.path.isfile(local_file_name)
+                                and os.path.getsize(local_file_name) == int(file_summary["size_bytes"])):
+                            stats["skipped"] += 1
+                            continue
+
+                        # bounded in flight downloads, the listing is not read ahead of them
+                        if len(pending) >= max_workers * Mirror_InFlightPerWorker:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            self._record_mirrored_files(manifest, done, stats)
+                        pending.add(executor.submit(run_in_context(self._mirror_file), file_summary, relative_path, local_root))
+                except Exception as e:
+                    logger.error("mirror folder listing: %s %s", input_path, e)
+                    raise
+                finally:
+                    # files already downloaded are recorded, even if the listing failed
+                    done, _ = wait(pending)
+                    self._record_mirrored_files(manifest, done, stats)
+
+            # only a complete listing tells removed files, a failed one raised above and nothing is pruned
+            if delete_removed:
+                seen_paths = set(seen.values())
+                for server_relative_url in manifest.urls():
+                    if server_relative_url in seen:
+                        continue
+                    entry = manifest.remove(server_relative_url)
+                    if entry["path"] not in seen_paths:
+                        self._remove_mirrored_file(local_root, entry["path"])
+                    stats["deleted"] += 1
+        finally:
+            manifest.save()
+        stats["elapsed_secs"] = time.monotonic() - start_time
+
+        logger.info("mirrored %s files to %s, %s downloaded (%s resumed), %s skipped, %s deleted, %s failed, %s bytes in %.2f secs",
+                    stats["files"], local_root, stats["downloaded"], stats["resumed"], stats["skipped"], stats["deleted"],
+                    stats["failed"], stats["bytes"], stats["elapsed_secs"])
+        return stats
+
+    @instrumented
+    def upload_file(self, local_file_name, input_path, chunk_size_bytes=Upload_ChunkSizeBytes, overwrite=True,
+                    file_name=None) -> (dict, bool):
+        """
+        upload a local file to given folder.
+        Small files are sent in one request. Large files (>= Upload_LargeFileSizeBytes) are sent as an
+        upload session (StartUpload, ContinueUpload, FinishUpload) of chunk_size_bytes chunks, the next chunk
+        is read from disk while the current one is sent, and a failed chunk is retried (Upload_ChunkRetries).
+
+        local_file_name: local file to upload
+        input_path: Folder path, starting at Document Library for Eg. Documents/sharepoint-test-folder1
+                    (the folder must exist)
+        chunk_size_bytes: optional, upload session chunk size for large files
+        overwrite: optional, replace an existing file (a new version), else the upload fails
+        file_name: optional, name of the uploaded file, defaults to the local file name
+
+        Returns: Dict of uploaded file details (server_relative_url, file_size_bytes, chunks, elapsed_secs,
+                 bytes_per_sec), bool
+                 Caller to check bool for success/failure detection
+        """
+
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return {}, False
+
+        if not os.path.isfile(local_file_name):
+            logger.warning("Provided local_file_name does not exist")
+            return {}, False
+
+        folder_url = self._get_folder_url_from_inputpath(input_path)
+        if not folder_url:
+            logger.warning("invalid input:document library not found: %s", input_path)
+            return {}, False
+
+        return self._upload_local_file(local_file_name, folder_url, file_name or os.path.basename(local_file_name),
+                                       chunk_size_bytes, overwrite)
+
+    @instrumented
+    def upload_folder(self, local_path, input_path, max_workers=Upload_MaxWorkers,
+                      chunk_size_bytes=Upload_ChunkSizeBytes, overwrite=True) -> (list, dict):
+        """
+        upload a local directory tree to given folder, files uploaded concurrently (see upload_file(...)).
+        Sub directories are created in SharePoint as needed,
+        Eg. Documents/folder1 : {local_path}/nested/a.docx -> /sites/test-site-1/Shared Documents/folder1/nested/a.docx
+
+        local_path: local directory to upload
+        input_path: Folder path, starting at Document Library for Eg. Documents/sharepoint-test-folder1
+                    (the folder must exist)
+        max_workers: optional, concurrent file uploads
+        chunk_size_bytes: optional, upload session chunk size for large files
+        overwrite: optional, replace existing files (a new version), else their upload fails
+
+        Returns: [](dict, bool) per local file (as returned by upload_file(...)),
+                 dict of stats: files, failed, bytes, elapsed_secs, files_per_sec, bytes_per_sec
+        """
+
+        stats = {
+            "files": 0,
+            "failed": 0,
+            "bytes": 0,
+            "elapsed_secs": 0.0,
+            "files_per_sec": 0.0,
+            "bytes_per_sec": 0.0,
+        }
+
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return [], stats
+
+        if not os.path.isdir(local_path):
+            logger.warning("Provided local_path does not exist")
+            return [], stats
+
+        folder_url = self._get_folder_url_from_inputpath(input_path)
+        if not folder_url:
+            logger.warning("invalid input:document library not found: %s", input_path)
+            return [], stats
+
+        # (local file, folder url) in walk order, folders created parents first
+        uploads = []
+        start_time = time.monotonic()
+        try:
+            for local_folder, folder_names, file_names in os.walk(local_path):
+                folder_names.sort()
+                relative_folder = os.path.relpath(local_folder, local_path)
+                target_url = folder_url
+                if relative_folder != ".":
+                    target_url = folder_url + "/" + relative_folder.replace(os.sep, "/")
+                    self._add_folder(target_url)
+                uploads.extend((os.path.join(local_folder, file_name), target_url) for file_name in sorted(file_names))
+        except requests.RequestException as e:
+            logger.error("upload folder: %s %s", input_path, e)
+            return [], stats
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(run_in_context(self._upload_local_file), local_file_name, target_url,
+                                os.path.basename(local_file_name), chunk_size_bytes, overwrite)
+                for local_file_name, target_url in uploads
+            ]
+            results = [future.result() for future in futures]
+        elapsed_secs = time.monotonic() - start_time
+
+        for file_upload_summary, ok in results:
+            stats["files"] += 1
+            if ok:
+                stats["bytes"] += file_upload_summary["file_size_bytes"]
+            else:
+                stats["failed"] += 1
+        stats["elapsed_secs"] = elapsed_secs
+        if elapsed_secs > 0:
+            stats["files_per_sec"] = (stats["files"] - stats["failed"]) / elapsed_secs
+            stats["bytes_per_sec"] = stats["bytes"] / elapsed_secs
+
+        logger.info("uploaded %s files, %s failed, %s bytes in %.2f secs",
+                    stats["files"] - stats["failed"], stats["failed"], stats["bytes"], elapsed_secs)
+
+        return results, stats
+
+    ################################### Internal functions #################################
+
+    def _get_connection_key(self) -> Any:
+        """
+        credentials a connection check holds for: the token manager of a certificate connection
+        (shared by every site object of the tenant and client), else the pooled session of the context
+        """
+        auth_context = self.ctx.authentication_context
+        if isinstance(auth_context, ManagedAuthenticationContext):
+            return auth_context.token_manager
+        return getattr(self.ctx, "session", None) or self.ctx
+
+    def _get_connection_valid_secs(self) -> float:
+        """
+        seconds a valid connection check is trusted: Connection_ValidSecs, 
+        or less if the current access token expires sooner
+        """
+        valid_secs = Connection_ValidSecs
+        auth_context = self.ctx.authentication_context
+        if isinstance(auth_context, ManagedAuthenticationContext):
+            expires_in = auth_context.token_manager.stats()["expires_in_secs"]
+        else:
+            expires_in = getattr(getattr(auth_context, "_cached_token", None), "expiresIn", None)
+        if expires_in:
+            valid_secs = min(valid_secs, int(expires_in) - Connection_TokenExpiryMarginSecs)
+        return max(valid_secs, 0)
+
+    def _get_user_cached(self, user_email) -> Any:
+        """
+        get_user_by_email(...) through the access cache, if enabled
+        """
+        if self.access_cache is not None:
+            user = self.access_cache.get_user(user_email)
+            if user is not None:
+                return user
+
+        user = self.get_user_by_email(user_email)
+        if user is not None and self.access_cache is not None:
+            self.access_cache.set_user(user_email, user)
+        return user
+
+    def _get_file_item_cached(self, file_path) -> Any:
+        """
+        list item of the file at file_path, through the access cache if enabled
+
+        Returns: ListItem, None if file does not exist
+        """
+        if self.access_cache is not None:
+            item = self.access_cache.get_item(file_path)
+            if item is not None:
+                return item
+
+        target_file = self.get_file_by_path(file_path)
+        if target_file is None:
+            return None
+
+        item = target_file.listItemAllFields
+        if self.access_cache is not None:
+            self.access_cache.set_item(file_path, item)
+        return item
+
+    def _has_permission(self, permissions, permission_kind, user_email, file_path) -> bool:
+        if permissions.has(permission_kind):
+            logger.info('user:%s has access to file:"%s', user_email, file_path)
+            return True
+        else:
+            logger.info('user:%s does not have access to file:"%s', user_email, file_path)
+            return False
+
+    def _execute_request(self, url, headers=None, stream=False, method="GET", data=None) -> requests.Response:
+        """
+        authenticated request outside of the SDK query pipeline (file content, byte ranges, $batch),
+        sent over the shared HTTP session
+
+        Returns: requests.Response, raises requests.HTTPError on error status
+        """
+        request = RequestOptions(url)
+        for name, value in (headers or {}).items():
+            request.set_header(name, value)
+        self.ctx.authentication_context.authenticate_request(request)
+        response = self.session.request(
+            method, request.url, headers=request.headers, data=data, stream=stream, timeout=Download_TimeoutSecs
+        )
+        response.raise_for_status()
+        return response
+
+    def _execute_batch(self, urls) -> list:
+        """
+        sends GET urls as one OData $batch request. Parts are independent, 
+        a failed part (Eg. 404 for a missing file) does not fail the others.
+        urls: [] absolute REST urls, at most Batch_MaxRequests
+
+        Returns: [](status_code, json "d" payload or None) in urls order
+        """
+        boundary = "batch_" + str(uuid.uuid4())
+        parts = [
+            "--{0}\r\nContent-Type: application/http\r\nContent-Transfer-Encoding: binary\r\n\r\n"
+            "GET {1} HTTP/1.1\r\nAccept: application/json;odata=verbose\r\n\r\n".format(boundary, url)
+            for url in urls
+        ]
+        body = "".join(parts) + "--{0}--\r\n".format(boundary)
+
+        response = self._execute_request(
+            self.ctx.service_root_url() + "/$batch",
+            {"Content-Type": "multipart/mixed; boundary=" + boundary, "Accept": "multipart/mixed"},
+            method="POST", data=body.encode("utf-8"),
+        )
+
+        message = email.message_from_bytes(
+            b"Content-Type: " + response.headers["Content-Type"].encode("ascii") + b"\r\n\r\n" + response.content
+        )
+        results = []
+        for part in message.get_payload():
+            status_line, _, part_body = part.get_payload(decode=True).decode("utf-8").partition("\r\n\r\n")
+            status_code = int(status_line.split(" ", 2)[1])
+            payload = None
+            if status_code == 200 and part_body.strip():
+                payload = json.loads(part_body)["d"]
+            results.append((status_code, payload))
+        return results
+
+    def _get_effective_permissions_batch(self, login_name, file_paths) -> dict:
+        """
+        gets the effective permissions of login_name on each file in file_paths,
+        as one OData $batch request of GetUserEffectivePermissions parts.
+
+        Returns: dict of file_path -> BasePermissions, None for missing files
+        """
+        service_root_url = self.ctx.service_root_url()
+        user_alias = quote(login_name.replace("'", "''"), safe="")
+        urls = [
+            (
+                "{0}/web/GetFileByServerRelativePath(decodedurl='{1}')"
+                "/ListItemAllFields/GetUserEffectivePermissions(@user)?@user='{2}'"
+            ).format(service_root_url, quote(file_path.replace("'", "''")), user_alias)
+            for file_path in file_paths
+        ]
+
+        permissions_by_path = {}
+        for file_path, (status_code, result) in zip(file_paths, self._execute_batch(urls)):
+            if status_code != 200:
+                if status_code != 404:
+                    logger.error("file:%s permission check status:%s", file_path, status_code)
+                permissions_by_path[file_path] = None
+                continue
+
+            permissions_by_path[file_path] = _to_base_permissions(result.get("GetUserEffectivePermissions", result))
+
+        return permissions_by_path
+
+    def _get_fresh_catalog(self, doc_lib, tag_column_name=None) -> MetadataCatalog:
+        """
+        the catalog, synced if older than its max staleness
+
+        Returns: MetadataCatalog, None if not enabled or the sync failed (callers read from SharePoint)
+        """
+        if self.catalog is None:
+            return None
+        if self.catalog.is_fresh(doc_lib, tag_column_name):
+            return self.catalog
+        if self.sync_catalog(doc_lib, tag_column_name):
+            return self.catalog
+        return None
+
+    def _get_catalog_folder_summary(self, server_relative_url, folder_summary) -> dict:
+        """
+        folder summary (as returned by get_folder(...)) from a catalog folder summary.
+        size_bytes is the total size of the current file versions
+        """
+        return {
+            "site_url": self.site_url,
+            "server_relative_url": server_relative_url,
+            "time_last_modified": folder_summary["time_last_modified"],
+            "size_bytes": folder_summary["size_bytes"],
+        }
+
+    def _get_list_url(self, list_title) -> str:
+        return "{0}/web/lists/getbytitle('{1}')".format(
+            self.ctx.service_root_url(), quote(list_title.replace("'", "''"))
+        )
+
+    def _load_acl_principals(self, acl_index) -> bool:
+        """
+        loads site users, site groups (with members), the library role assignments and
+        the library change token into acl_index, as one OData $batch request
+
+        Returns: True on success
+        """
+        service_root_url = self.ctx.service_root_url()
+        list_url = self._get_list_url(acl_index.doc_lib)
+        results = self._execute_batch([
+            list_url + "?$select=CurrentChangeToken",
+            list_url + "/RoleAssignments?$expand=RoleDefinitionBindings",
+            service_root_url + "/web/SiteGroups?$select=Id,Users/Id&$expand=Users",
+            service_root_url + "/web/SiteUsers?$select=Id,Email,LoginName",
+        ])
+        for status_code, result in results:
+            if status_code != 200:
+                logger.error("doc_lib:%s acl request status:%s", acl_index.doc_lib, status_code)
+                return False
+        lib, role_assignments, groups, users = [result for status_code, result in results]
+
+        acl_index.set_principals(
+            {user["Email"]: user["Id"] for user in users["results"] if user.get("Email")},
+            {group["Id"]: [user["Id"] for user in group["Users"]["results"]] for group in groups["results"]},
+            [user["Id"] for user in users["results"] if user["LoginName"] in Everyone_LoginNames],
+        )
+        acl_index.set_list_scope(_get_principals_with_permission(role_assignments["results"], PermissionKind.OpenItems))
+        acl_index.change_token = lib["CurrentChangeToken"]["StringValue"]
+        return True
+
+    def _load_acl_item_scopes(self, acl_index, item_ids) -> None:
+        """
+        loads the unique scope of each item in item_ids (items with unique role assignments) into acl_index,
+        items deleted since they were listed are removed (never left with the scope of their parent)
+        """
+        scopes = self._get_item_scopes_batch(acl_index.doc_lib, item_ids)
+        for item_id in item_ids:
+            scope = scopes.get(item_id)
+            if scope is None:
+                acl_index.remove_item(item_id)
+            else:
+                acl_index.set_item(item_id, acl_index.items[item_id], scope)
+
+    def _get_item_scopes_batch(self, list_title, item_ids) -> dict:
+        """
+        gets the principals with PermissionKind.OpenItems of each item in item_ids,
+        as OData $batch requests of Batch_MaxRequests items
+
+        Returns: dict of item_id -> set of principal ids, missing items (404) are left out,
+                 raises requests.HTTPError for any other failed item
+        """
+        list_url = self._get_list_url(list_title)
+        scopes = {}
+        for start in range(0, len(item_ids), Batch_MaxRequests):
+            batch_item_ids = item_ids[start:start + Batch_MaxRequests]
+            urls = [
+                "{0}/items({1})/RoleAssignments?$expand=RoleDefinitionBindings".format(list_url, item_id)
+                for item_id in batch_item_ids
+            ]
+            for item_id, (status_code, result) in zip(batch_item_ids, self._execute_batch(urls)):
+                if status_code not in (200, 404):
+                    raise requests.HTTPError("item:{0} role assignments status:{1}".format(item_id, status_code))
+                if status_code == 200:
+                    scopes[item_id] = _get_principals_with_permission(result["results"], PermissionKind.OpenItems)
+        return scopes
+
+    def _get_list_items_batch(self, list_title, item_ids, select, expand=None) -> dict:
+        """
+        gets the select fields of each item in item_ids, as OData $batch requests of Batch_MaxRequests items
+        expand: optional, item properties to expand, Eg. ["File"]
+
+        Returns: dict of item_id -> item fields dict, None for missing items
+        """
+        list_url = self._get_list_url(list_title)
+        query = "$select=" + ",".join(select)
+        if expand:
+            query += "&$expand=" + ",".join(expand)
+        items = {}
+        for start in range(0, len(item_ids), Batch_MaxRequests):
+            batch_item_ids = item_ids[start:start + Batch_MaxRequests]
+            urls = ["{0}/items({1})?{2}".format(list_url, item_id, query) for item_id in batch_item_ids]
+            for item_id, (status_code, result) in zip(batch_item_ids, self._execute_batch(urls)):
+                if status_code not in (200, 404):
+                    raise requests.HTTPError("item:{0} request status:{1}".format(item_id, status_code))
+                items[item_id] = result
+        return items
+
+    def _get_list_changes(self, lib, change_token) -> (list, str):
+        """
+        reads the item changes of the lib change log since change_token, 
+        ChangeLog_FetchLimit changes per request
+
+        Returns: [] change properties dict (ItemId, ChangeType, ..) oldest first, change token of the last change
+        """
+        changes = []
+        while True:
+            qry = ChangeQuery(item=True, change_token_start=ChangeToken(change_token), fetch_limit=ChangeLog_FetchLimit)
+            qry.Rename = True
+            qry.Move = True
+            qry.Restore = True
+            qry.SecurityPolicy = True
+            page = lib.get_changes(qry).execute_query()
+
+            for change in page:
+                changes.append(change.properties)
+                change_token = change.change_token.StringValue
+            if len(page) < ChangeLog_FetchLimit:
+                break
+
+        return changes, change_token
+
+    def _get_doc_lib_summary(self, list_title) -> dict:
+        """
+        get_doc_lib(...) from SharePoint
+        """
+        lib = (
+            self.ctx.web.lists.get_by_title(list_title)
+            .root_folder.expand(["StorageMetrics"])
+            .get()
+            .execute_query()
+        )
+        return self._get_system_object_summary(List, lib)
+
+    def _get_folder_summary(self, input_path, folder_server_relative_url) -> Any:
+        """
+        get_folder(...) from SharePoint, direct lookup by path, one request regardless of library size
+
+        Returns: dict, None if the folder does not exist
+        """
+        try:
+            folder = (
+                self.ctx.web.get_folder_by_server_relative_path(folder_server_relative_url)
+                .expand(["StorageMetrics"])
+                .get()
+                .execute_query()
+            )
+        except ClientRequestException as e:
+            if e.response.status_code == 404:
+                logger.warning("folder:%s does not belong to site", input_path)
+                return None
+            logger.error("folder: %s %s", input_path, e)
+            return None
+
+        return self._get_system_object_summary(Folder, folder)
+
+    def _get_file_content(self, server_relative_url) -> (str, int):
+        """
+        download_file(...) source: url of the file content and file size
+
+        Returns: (url, size bytes), (None, 0) if the file does not exist
+        """
+        source_file = self.get_file_by_path(server_relative_url)
+        if source_file is None:
+            return None, 0
+        return source_file.resource_url + "/$value", source_file.length
+
+    def _get_file_content_url(self, server_relative_url) -> str:
+        """
+        file content ($value) url for server_relative_url, without a metadata request
+
+        Returns: url
+        """
+        return "{0}/web/GetFileByServerRelativePath(decodedurl='{1}')/$value".format(
+            self.ctx.service_root_url(), quote(server_relative_url.replace("'", "''"))
+        )
+
+    def _get_local_relative_path(self, server_relative_url) -> str:
+        """
+        converts a server relative url (Eg. /sites/test-site-1/Shared Documents/folder1/a.docx)
+        to a local path relative to the site (Eg. Shared Documents/folder1/a.docx)
+
+        Returns: relative path, "" if server_relative_url escapes the site
+        """
+        site_path = urlparse(self.site_url).path.rstrip('/')
+        relative_path = server_relative_url
+        if relative_path.lower().startswith(site_path.lower() + "/"):
+            relative_path = relative_path[len(site_path):]
+        relative_path = os.path.normpath(relative_path.lstrip('/'))
+        if relative_path.startswith("..") or os.path.isabs(relative_path):
+            return ""
+        return relative_path
+
+    def _download_summary_file(self, file_summary, download_path, chunk_size_bytes) -> (dict, bool):
+        """
+        download_many(...) worker, downloads one file summary keeping its folder structure under download_path.
+        Only uses the HTTP session (the SDK context is not thread safe).
+
+        Returns: Dict of downloaded file details, bool
+        """
+        server_relative_url = file_summary["server_relative_url"]
+        relative_path = self._get_local_relative_path(server_relative_url)
+        if not relative_path:
+            logger.warning("invalid input:file outside of site: %s", server_relative_url)
+            return {}, False
+
+        local_file_name = os.path.join(download_path, relative_path)
+        os.makedirs(os.path.dirname(local_file_name), exist_ok=True)
+
+        content_url = self._get_file_content_url(server_relative_url)
+        expected_size = int(file_summary["size_bytes"])
+        if not self._download_content(content_url, local_file_name, expected_size, chunk_size_bytes, Download_MaxWorkers,
+                                      cache_key=(server_relative_url, file_summary.get("etag"))):
+            return {}, False
+
+        return {
+            "file_name": local_file_name,
+            "file_size_bytes": expected_size,
+        }, True
+
+    def _upload_local_file(self, local_file_name, folder_url, file_name, chunk_size_bytes, overwrite) -> (dict, bool):
+        """
+        upload_file(...) / upload_folder(...) worker, uploads local_file_name to folder_url/file_name.
+        Only uses the HTTP session (the SDK context is not thread safe).
+
+        Returns: Dict of uploaded file details, bool
+        """
+        server_relative_url = folder_url + "/" + file_name
+        start_time = time.monotonic()
+        try:
+            file_size = os.path.getsize(local_file_name)
+            if file_size >= Upload_LargeFileSizeBytes and chunk_size_bytes and file_size > chunk_size_bytes:
+                chunks = self._upload_session(local_file_name, folder_url, file_name, file_size, chunk_size_bytes, overwrite)
+            else:
+                with open(local_file_name, "rb") as local_file:
+                    data = local_file.read()
+                self._execute_request(self._get_file_add_url(folder_url, file_name, overwrite), _Upload_Headers,
+                                      method="POST", data=data)
+                chunks = 1
+        except (requests.RequestException, OSError, ValueError) as e:
+            logger.error("file upload failed: %s: %s", server_relative_url, e)
+            return {}, False
+        elapsed_secs = time.monotonic() - start_time
+
+        file_upload_summary = {
+            "server_relative_url": server_relative_url,
+            "file_size_bytes": file_size,
+            "chunks": chunks,
+            "elapsed_secs": elapsed_secs,
+            "bytes_per_sec": file_size / elapsed_secs if elapsed_secs > 0 else 0.0,
+        }
+        logger.info("file has been uploaded: %s,size:%s bytes,chunks:%s,%.2f secs",
+                    server_relative_url, file_size, chunks, elapsed_secs)
+        return file_upload_summary, True
+
+    def _upload_session(self, local_file_name, folder_url, file_name, file_size, chunk_size_bytes, overwrite) -> int:
+        """
+        uploads local_file_name as an upload session: an empty file is created, then chunks are sent in order
+        (StartUpload, ContinueUpload..., FinishUpload), the next chunk read from disk while the current one is sent.
+        The session is cancelled on failure.
+
+        Returns: chunks sent, raises requests.RequestException / ValueError on failure
+        """
+        self._execute_request(self._get_file_add_url(folder_url, file_name, overwrite), _Upload_Headers,
+                              method="POST", data=b"")
+        file_url = "{0}/web/GetFileByServerRelativePath(decodedurl='{1}')".format(
+            self.ctx.service_root_url(), quote((folder_url + "/" + file_name).replace("'", "''"))
+        )
+        upload_id = str(uuid.uuid4())
+
+        offset = 0
+        chunks = 0
+        with open(local_file_name, "rb") as local_file, ThreadPoolExecutor(max_workers=1) as reader:
+            next_chunk = reader.submit(local_file.read, chunk_size_bytes)
+            try:
+                while True:
+                    chunk = next_chunk.result()
+                    if not chunk:
+                        raise ValueError("local file truncated at {0} bytes".format(offset))
+                    # the session starts with the first chunk, ends with the last one
+                    last = offset > 0 and offset + len(chunk) >= file_size
+                    if not last:
+                        next_chunk = reader.submit(local_file.read, chunk_size_bytes)
+
+                    if offset == 0:
+                        operation = "StartUpload"
+                        url = "{0}/StartUpload(uploadId=guid'{1}')".format(file_url, upload_id)
+                    else:
+                        operation = "FinishUpload" if last else "ContinueUpload"
+                        url = "{0}/{1}(uploadId=guid'{2}',fileOffset={3})".format(file_url, operation, upload_id, offset)
+
+                    response = self._upload_chunk(url, chunk)
+                    chunks += 1
+                    if last:
+                        break
+                    # server offset after the chunk
+                    offset = int(response.json()["d"][operation])
+            except (requests.RequestException, ValueError):
+                try:
+                    self._execute_request("{0}/CancelUpload(uploadId=guid'{1}')".format(file_url, upload_id),
+                                          _Upload_Headers, method="POST")
+                except requests.RequestException as e:
+                    logger.warning("upload session cancel failed: %s: %s", local_file_name, e)
+                raise
+        return chunks
+
+    def _upload_chunk(self, url, chunk) -> requests.Response:
+        """
+        sends one upload session chunk, retried up to Upload_ChunkRetries times on error
+        (throttled responses are retried by the session)
+
+        Returns: requests.Response, raises requests.RequestException once retries are exhausted
+        """
+        for attempt in range(1, Upload_ChunkRetries + 1):
+            try:
+                return self._execute_request(url, _Upload_Headers, method="POST", data=chunk)
+            except requests.RequestException as e:
+                if attempt == Upload_ChunkRetries:
+                    raise
+                logger.warning("upload chunk failed: %s: %s, retry: %s", url, e, attempt)
+
+    def _add_folder(self, folder_url) -> None:
+        """
+        creates folder_url (server relative url), an existing folder is kept
+        """
+        self._execute_request("{0}/web/Folders/AddUsingPath(decodedurl='{1}')".format(
+            self.ctx.service_root_url(), quote(folder_url.replace("'", "''"))), _Upload_Headers, method="POST")
+
+    def _get_file_add_url(self, folder_url, file_name, overwrite) -> str:
+        """
+        Files/AddUsingPath url adding file_name to folder_url (server relative url), without a metadata request
+
+        Returns: url
+        """
+        return "{0}/web/GetFolderByServerRelativePath(decodedurl='{1}')/Files/AddUsingPath(decodedurl='{2}',overwrite={3})".format(
+            self.ctx.service_root_url(), quote(folder_url.replace("'", "''")), quote(file_name.replace("'", "''")),
+            "true" if overwrite else "false"
+        )
+
+    def _get_mirror_relative_path(self, folder_url, server_relative_url) -> str:
+        """
+        converts a server relative url under folder_url (Eg. /sites/test-site-1/Shared Documents/folder1/nested/a.docx)
+        to a local path relative to the folder (Eg. nested/a.docx)
+
+        Returns: relative path, "" if server_relative_url is not under folder_url
+        """
+        folder_url = folder_url.rstrip('/')
+        if not server_relative_url.lower().startswith(folder_url.lower() + "/"):
+            return ""
+        relative_path = os.path.normpath(server_relative_url[len(folder_url):].lstrip('/'))
+        if relative_path.startswith("..") or os.path.isabs(relative_path) or relative_path == Mirror_ManifestName:
+            return ""
+        return relative_path
+
+    def _mirror_file(self, file_summary, relative_path, local_root) -> (dict, str, bool, bool):
+        """
+        mirror_folder(...) worker, downloads one file summary to local_root/relative_path through a part file
+        named after the file version, so only a part of the same version is resumed.
+        Only uses the HTTP session (the SDK context is not thread safe).
+
+        Returns: (file_summary, relative_path, downloaded, resumed)
+        """
+        server_relative_url = file_summary["server_relative_url"]
+        local_file_name = os.path.join(local_root, relative_path)
+        os.makedirs(os.path.dirname(local_file_name), exist_ok=True)
+
+        part_file_name = self._get_mirror_part_file_name(local_file_name, file_summary)
+
+        # parts of other versions of the file can not be resumed
+        for stale_part in glob.glob(glob.escape(local_file_name) + ".*" + Download_PartSuffix):
+            if stale_part != part_file_name:
+                os.remove(stale_part)
+        resumed = os.path.isfile(part_file_name) and os.path.getsize(part_file_name) > 0
+
+        content_url = self._get_file_content_url(server_relative_url)
+        expected_size = int(file_summary["size_bytes"])
+        if not self._download_content(content_url, local_file_name, expected_size, None, 1, part_file_name=part_file_name,
+                                      etag=file_summary.get("etag")):
+            return file_summary, relative_path, False, resumed
+
+        modified = _parse_ctime(file_summary["time_last_modified"])
+        os.utime(local_file_name, (modified, modified))
+        return file_summary, relative_path, True, resumed
+
+    def _get_mirror_part_file_name(self, local_file_name, file_summary) -> str:
+        """
+        part file of the version (etag, size, modified time) of file_summary,
+        Eg. {local_file_name}.3f2a9c01b7de.part
+
+        Returns: local file name
+        """
+        version = "{0}|{1}|{2}".format(file_summary.get("etag"), file_summary["size_bytes"], file_summary["time_last_modified"])
+        return "{0}.{1}{2}".format(local_file_name, hashlib.sha1(version.encode()).hexdigest()[:12], Download_PartSuffix)
+
+    def _record_mirrored_files(self, manifest, futures, stats) -> None:
+        """
+        records the _mirror_file(...) results of futures in manifest and stats,
+        the manifest is saved every Mirror_CheckpointFiles downloads
+        """
+        for future in futures:
+            file_summary, relative_path, ok, resumed = future.result()
+            if not ok:
+                stats["failed"] += 1
+                continue
+            manifest.set(file_summary["server_relative_url"], relative_path, file_summary)
+            stats["downloaded"] += 1
+            stats["resumed"] += int(resumed)
+            stats["bytes"] += int(file_summary["size_bytes"])
+            if stats["downloaded"] % Mirror_CheckpointFiles == 0:
+                manifest.save()
+
+    def _remove_mirrored_file(self, local_root, relative_path) -> None:
+        """
+        removes local_root/relative_path, and its parent folders left empty (up to local_root)
+        """
+        local_file_name = os.path.join(local_root, relative_path)
+        try:
+            os.remove(local_file_name)
+        except FileNotFoundError:
+            pass
+        folder = os.path.dirname(relative_path)
+        while folder:
+            try:
+                os.rmdir(os.path.join(local_root, folder))
+            except OSError:
+                break
+            folder = os.path.dirname(folder)
+        logger.info("mirrored file removed: %s", local_file_name)
+
+    def _download_content(self, content_url, local_file_name, expected_size, chunk_size_bytes, max_workers,
+                          part_file_name=None, cache_key=None, etag=None) -> bool:
+        """
+        downloads content_url into local_file_name, as concurrent byte ranges for large files,
+        and verifies the local file size against expected_size. Content is written to a part file,
+        renamed to local_file_name once complete, so local_file_name is never left partial.
+        part_file_name: optional, resumable part file: streamed from its current size (a Range request),
+                        and kept on a failed transfer for a later call to resume.
+                        Default local_file_name + Download_PartSuffix, removed on failure.
+        etag: optional, version of the part file content, a part is only resumed from the same version (If-Range)
+        cache_key: optional, (server relative url, etag) of the content, served from the download cache if enabled
+
+        Returns: True on success
+        """
+        if cache_key is not None and self._is_cacheable(cache_key[1], expected_size):
+            cached_path = self._get_cached_content(content_url, cache_key[0], cache_key[1], expected_size)
+            if cached_path is None:
+                return False
+            if self.download_cache.link(cached_path, local_file_name):
+                logger.info("file has been downloaded from cache: %s,size:%s bytes", local_file_name, expected_size)
+                return True
+            # evicted since, downloaded as usual
+
+        resume = part_file_name is not None
+        part_file_name = part_file_name or local_file_name + Download_PartSuffix
+
+        if not resume and expected_size >= Download_LargeFileSizeBytes and chunk_size_bytes and expected_size > chunk_size_bytes:
+            ok = self._download_file_ranges(content_url, part_file_name, expected_size, chunk_size_bytes, max_workers)
+        else:
+            ok = self._download_stream(content_url, local_file_name, part_file_name, expected_size, resume, etag)
+
+        if ok:
+            file_size = os.stat(part_file_name).st_size
+            if file_size != expected_size:
+                logger.error("file size mismatch: %s,size:%s bytes,expected:%s bytes",
+                             local_file_name, file_size, expected_size)
+                # a resumed part of the wrong size is not resumable either
+                resume = ok = False
+
+        if not ok:
+            if not resume and os.path.exists(part_file_name):
+                os.remove(part_file_name)
+            return False
+
+        os.replace(part_file_name, local_file_name)
+        logger.info("file has been downloaded: %s,size:%s bytes", local_file_name, expected_size)
+        return True
+
+    def _is_cacheable(self, etag, expected_size) -> bool:
+        """
+        Returns: True if a file version can be served from the download cache
+        """
+        return self.download_cache is not None and bool(etag) and expected_size <= self.download_cache.max_bytes
+
+    def _get_cached_content(self, content_url, server_relative_url, etag, expected_size) -> str:
+        """
+        read-only download cache path of the content of server_relative_url at version etag,
+        streamed from content_url into the cache on a miss (hashed as it is written)
+
+        Returns: str, None on failure
+        """
+        cached_path = self.download_cache.get(self.site_url, server_relative_url, etag)
+        if cached_path is not None:
+            return cached_path
+
+        try:
+            response = self._execute_request(content_url, stream=True)
+            return self.download_cache.add(self.site_url, server_relative_url, etag,
+                                           response.iter_content(Download_StreamBlockBytes), expected_size)
+        except (requests.RequestException, OSError) as e:
+            logger.error("file download failed: %s: %s", server_relative_url, e)
+            return None
+
+    def _download_stream(self, content_url, local_file_name, part_file_name, expected_size, resume, etag=None) -> bool:
+        """
+        streams content_url into part_file_name, continuing from the end of an existing part file if resume
+        (the server may answer the whole content instead of the range, the part is then rewritten).
+        The range is conditional on etag (If-Range), a changed file is answered whole, and the range answered
+        is checked against the part and expected_size, bytes of another version are never appended to it.
+
+        Returns: True on success
+        """
+        offset = 0
+        if resume and os.path.exists(part_file_name):
+            offset = os.path.getsize(part_file_name)
+            if offset > expected_size:
+                offset = 0
+            elif offset and offset == expected_size:
+                # complete, the transfer stopped before the rename
+                return True
+
+        try:
+            headers = None
+            if offset:
+                headers = {"Range": "bytes={0}-".format(offset)}
+                if etag:
+                    headers["If-Range"] = etag
+            response = self._execute_request(content_url, headers, stream=True)
+            if offset and response.status_code == 206:
+                content_range = response.headers.get("Content-Range")
+                content_size = _get_content_range_size(content_range)
+                if ((content_size is not None and content_size != expected_size)
+                        or not (content_range or "").startswith("bytes {0}-".format(offset))):
+                    response.close()
+                    logger.error("file download resumed from a changed file: %s,range:%s,expected:%s bytes from %s",
+                                 local_file_name, content_range, expected_size, offset)
+                    # the part can not be completed
+                    os.remove(part_file_name)
+                    return False
+                logger.info("file download resumed: %s,from:%s bytes", local_file_name, offset)
+                mode = "ab"
+            else:
+                mode = "wb"
+            with open(part_file_name, mode) as local_file:
+                for chunk in response.iter_content(Download_StreamBlockBytes):
+                    local_file.write(chunk)
+        except (requests.RequestException, OSError) as e:
+            logger.error("file download failed: %s: %s", local_file_name, e)
+            return False
+        return True
+
+    def _download_file_ranges(self, content_url, local_file_name, file_size, chunk_size_bytes, max_workers) -> bool:
+        """
+        downloads content_url into local_file_name as concurrent byte range requests.
+        local file is preallocated to file_size, each range is written at its offset (pwrite).
+
+        Returns: True on success, False if a range failed or the content is no longer file_size bytes
+        """
+        ranges = [(start, min(start + chunk_size_bytes, file_size) - 1) for start in range(0, file_size, chunk_size_bytes)]
+
+        fd = os.open(local_file_name, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, file_size)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(run_in_context(self._download_range), content_url, fd, start, end, file_size)
+                           for start, end in ranges]
+                results = [future.result() for future in futures]
+        finally:
+            os.close(fd)
+
+        if not all(results):
+            logger.error("file download failed: %s,%s of %s chunks failed",
+                         local_file_name, results.count(False), len(ranges))
+            return False
+
+        return True
+
+    def _download_range(self, content_url, fd, start, end, file_size) -> bool:
+        """
+        downloads bytes start-end (inclusive) of content_url into fd at offset start,
+        retrying the range up to Download_ChunkRetries times.
+        The complete size in the Content-Range of the response is checked against file_size,
+        so the ranges of a file changed on the server (or listed with a stale size) are never mixed.
+
+        Returns: True on success
+        """
+        for retry in range(1, Download_ChunkRetries + 1):
+            try:
+                response = self._execute_request(
+                    content_url, {"Range": "bytes={0}-{1}".format(start, end)}, stream=True
+                )
+                if response.status_code != 206:
+                    raise ValueError("byte range not supported, status:{0}".format(response.status_code))
+                content_size = _get_content_range_size(response.headers.get("Content-Range"))
+                if content_size is not None and content_size != file_size:
+                    # not transient, not retried
+                    logger.error("chunk %s-%s of a changed file: size:%s bytes,expected:%s bytes",
+                                 start, end, content_size, file_size)
+                    response.close()
+                    return False
+
+                offset = start
+                for chunk in response.iter_content(Download_StreamBlockBytes):
+                    offset += os.pwrite(fd, chunk, offset)
+                if offset == end + 1:
+                    return True
+                logger.warning("chunk %s-%s incomplete, received %s bytes", start, end, offset - start)
+            except (requests.RequestException, ValueError) as e:
+                logger.warning("chunk %s-%s error (attempt %s): %s", start, end, retry, e)
+        return False
+
+    def _get_lib_field_internal(self, lib, field_ext_name) -> str:
+        """
+        gets field_internal_name from input field_ext_name
+
+        Returns: field_internal_name if found, 
+                 "" on error
+        """
+        fields = lib.fields.get().execute_query()
+        for field in fields:
+            #print("Field name Internal {0}".format(field.internal_name))
+            #print("Field name Internal {0}".format(field.title))
+            #print(field._properties)
+            if field.title == field_ext_name:
+                return field.internal_name
+
+    
+        logger.warning("invalid input:column not found in Sharepoint: %s", field_ext_name)
+
+        return ""
+
+    def _iter_files(self, doc_lib, folder_path, tag_column_name=None, modified_after=None, page_size=None) -> Iterator[dict]:
+        """
+        iter_files_in_folder(...) from SharePoint
+        """
+        lib = self.ctx.web.lists.get_by_title(doc_lib)
+
+        tag_column_name_internal = ""
+        if tag_column_name:
+            tag_column_name_internal = self._get_lib_field_internal(lib, tag_column_name)
+
+        # scope the query to the folder subtree on the server.
+        # folder_path empty -> all files from doc_lib. Eg.input_path = Documents
+        folder_server_relative_url = None
+        if folder_path:
+            folder_server_relative_url = self._get_server_relative_url(folder_path)
+
+        select = ["Id", "FileSystemObjectType"] + File_SummaryFields
+        if tag_column_name_internal:
+            select.append(tag_column_name_internal)
+
+        pages = self._iter_folder_item_pages(
+            lib, select, ["File"], folder_server_relative_url, modified_after, page_size
+        )
+        for page in pages:
+            for idx, item in enumerate(page):  # type: int, ListItem
+                if item.file_system_object_type == FileSystemObjectType.File:
+                    yield self._get_system_object_summary(File, item, tag_column_name_internal)
+
+    def _iter_folder_item_pages(self, lib, select, expand=None, folder_server_relative_url=None, modified_after=None,
+                                page_size=None, scope=ViewScope.Recursive) -> Iterator[ListItemCollection]:
+        """
+        iterate pages of items under folder_server_relative_url (including items under sub folders),
+        using a recursive CAML query so only the folder subtree is read from SharePoint.
+        Items are paged by ID to stay below the list view threshold, and carry every field
+        in select (no per item requests).
+        The next page is only requested once the caller is done with the current one.
+
+        select: item fields to return, Eg. File_SummaryFields for file summaries
+        expand: optional, item properties to expand, Eg. ["File"]
+        folder_server_relative_url: optional, Eg. /sites/test-site-1/Shared Documents/sharepoint-test-folder1
+                                    None for the whole doc_lib
+        modified_after: optional, get only items modified after datetime
+        page_size: optional, items per request, defaults to ListItems_PageSize
+        scope: optional, ViewScope.Recursive (files only) or ViewScope.RecursiveAll (files and folders)
+
+        Yields: ListItemCollection per page
+        Raises: ClientRequestException / requests.RequestException if a page fails, a listing is never cut short silently
+        """
+
+        page_size = min(page_size or ListItems_PageSize, ListView_Threshold)
+
+        last_item_id = None
+        while True:
+            qry = self._get_folder_items_query(folder_server_relative_url, modified_after, last_item_id, page_size, scope)
+            page = ListItemCollection(self.ctx, lib.items.resource_path).select(select)
+            if expand:
+                page.expand(expand) #office365/sharepoint/files/system_object_type.py
+            self.ctx.add_query(_GetItemsQuery(lib, "GetItems", None, {"query": qry}, None, page))
+            # throttled requests are retried by the session, any other error ends the listing (raised to the caller)
+            page.execute_query()
+
+            page_len = len(page)
+            if page_len:
+                last_item_id = page[page_len - 1].id
+                yield page
+            if page_len < page_size:
+                break
+
+    def _get_folder_items_query(self, folder_server_relative_url=None, modified_after=None, last_item_id=None,
+                                page_size=None, scope=ViewScope.Recursive) -> CamlQuery:
+        """
+        builds a recursive, ID ordered and paged CAML query for items under folder_server_relative_url
+
+        Returns: CamlQuery
+        """
+
+        where = ""
+        if modified_after:
+            # naive datetimes are UTC, StorageTZ compares in UTC instead of the site time zone
+            if modified_after.tzinfo is not None:
+                modified_after = modified_after.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+            where = (
+                '<Where><Gt><FieldRef Name="Modified" />'
+                '<Value Type="DateTime" IncludeTimeValue="TRUE" StorageTZ="TRUE">{0}</Value></Gt></Where>'
+            ).format(modified_after.strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+        qry = CamlQuery()
+        qry.ViewXml = (
+            '<View Scope="{0}"><Query>{1}<OrderBy><FieldRef Name="ID" Ascending="TRUE" /></OrderBy></Query>'
+            '<RowLimit Paged="TRUE">{2}</RowLimit></View>'
+        ).format(scope, where, page_size or ListItems_PageSize)
+        qry.FolderServerRelativeUrl = folder_server_relative_url
+        if last_item_id is not None:
+            qry.ListItemCollectionPosition = ListItemCollectionPosition("Paged=TRUE&p_ID={0}".format(last_item_id))
+
+        return qry
 
     def _get_system_object_summary(self, input_type, item, tag_column_name_internal="") -> dict:
 
@@ -361,30 +2350,28 @@ class SharePointSite:
             }
 
         if input_type == Folder:
-            sm = item.expand(["StorageMetrics"]).get().execute_query()
+            # item is the Folder loaded with StorageMetrics expanded
             summary = {
                 "site_url": self.site_url,
                 "server_relative_url": item.serverRelativeUrl,
                 "time_last_modified": item.properties['TimeLastModified'].ctime(),
-                "size_bytes": sm.storage_metrics.total_file_stream_size
+                "size_bytes": item.storage_metrics.total_file_stream_size
             }
 
         if input_type == File:
-        
-            sm = item.expand(["StorageMetrics"]).get().execute_query()
-
+            # item is the ListItem with File_SummaryFields (and tag column) projected by the listing query
+            file = item.file
             summary = {
                 "site_url": self.site_url,
-                "server_relative_url": item.serverRelativeUrl,
-                "time_last_modified": item.properties['TimeLastModified'].ctime(),
-                "size_bytes": item.properties['Length']
+                "item_id": item.id,
+                "server_relative_url": file.serverRelativeUrl,
+                "time_last_modified": file.properties['TimeLastModified'].ctime(),
+                "size_bytes": file.properties['Length'],
+                "etag": file.properties.get('ETag'),
             }
             # add tag if tag-column present
             if tag_column_name_internal:
-                file_item = (
-                    item.listItemAllFields.get().execute_query()
-                )
-                tag_value = file_item.properties.get(tag_column_name_internal)   
+                tag_value = item.properties.get(tag_column_name_internal)
                 if tag_value:    
                     summary["tag"] = tag_value
                 else:
@@ -402,6 +2389,14 @@ class SharePointSite:
     #    for k, v in file_item.properties.items():
     #        print("{0}: {1}".format(k, v))
 
+    def _get_server_relative_url(self, path) -> str:
+        """
+        converts a site path (Eg. Shared Documents/somefolder) to a server relative url
+        (Eg. /sites/test-site-1/Shared Documents/somefolder)
+        """
+        site_path = urlparse(self.site_url).path.rstrip('/')
+        return site_path + "/" + path.strip('/')
+
     def _get_doclib_from_inputpath(self, input_path) -> str:
         parts = input_path.split('/', 1)
         return parts[0]
@@ -413,17 +2408,80 @@ class SharePointSite:
         if len(parts) == 1:
             return ""
 
+        root_folder_url = self._get_doc_lib_root_url(doc_lib)
+        if root_folder_url:
+            # Eg. Documents -> /sites/test-site-1/Shared Documents
+            site_path = urlparse(self.site_url).path.rstrip('/')
+            lib_path = root_folder_url[len(site_path):].strip('/')
+            return lib_path + "/" + parts[1] # Shared Documents/somefolder
+
         if Documents_DocLibName in doc_lib:
             folder_path = Documents_SitePathName + "/" + parts[1]
             return folder_path # Shared Documents/somefolder
         else:
             return input_path # my-site-lib/somefolder
 
+    def _get_folder_url_from_inputpath(self, input_path) -> str:
+        """
+        server relative url of the folder at input_path (Eg. Documents/somefolder), the library root folder
+        for a document library input_path (Eg. Documents)
+
+        Returns: str, None if the document library is not found
+        """
+        folder_path = self._get_folderpath_from_inputpath(input_path)
+        if folder_path:
+            return self._get_server_relative_url(folder_path)
+        return self._get_doc_lib_root_url(self._get_doclib_from_inputpath(input_path))
+
+    def _get_doc_lib_root_url(self, doc_lib) -> str:
+        """
+        server relative url of the root folder of document library doc_lib (title, case insensitive),
+        from the title -> root folder mapping of the site, resolved with one request per site
+        (process wide) and again only when doc_lib is missing from it (Eg. a library created since),
+        at most once per DocLibRoots_MissSecs (unknown titles are not relisted on every call).
+
+        Returns: str, None if doc_lib is not a document library of the site or the lookup fails
+        """
+        key = (self.site_url or "").rstrip('/').lower()
+        with _doc_lib_roots_lock:
+            doc_lib_roots, listed_at = _doc_lib_roots.get(key, (None, 0))
+        if doc_lib_roots is not None:
+            if doc_lib.lower() in doc_lib_roots:
+                return doc_lib_roots[doc_lib.lower()]
+            if time.monotonic() - listed_at < DocLibRoots_MissSecs:
+                return None
+
+        if self.ctx is None:
+            return None
+        try:
+            libs = (
+                self.ctx.web.lists.select(["Title", "RootFolder/ServerRelativeUrl"])
+                .expand(["RootFolder"])
+                .filter("BaseTemplate eq {0}".format(DocumentLibrary_BaseTemplate))
+                .get()
+                .execute_query()
+            )
+        except ClientRequestException as e:
+            logger.error("document libraries: %s", e)
+            return None
+
+        doc_lib_roots = {lib.title.lower(): lib.root_folder.serverRelativeUrl for lib in libs}
+        with _doc_lib_roots_lock:
+            _doc_lib_roots[key] = (doc_lib_roots, time.monotonic())
+        return doc_lib_roots.get(doc_lib.lower())
+
     def __init__(self, site_url=None, ctx=None) -> Any:
 
         if not site_url:
-            print("invalid input:missing site_url")
+            logger.warning("invalid input:missing site_url")
         
         # instance variables
         self.site_url = site_url
         self.ctx = None
+        self.access_cache = None # optional, see enable_access_cache(...)
+        self.catalog = None # optional, see enable_catalog(...)
+        self.download_cache = None # optional, see enable_download_cache(...)
+
+        # process wide, rate limited HTTP session for this site (connection keep-alive across downloads
+        # and site objects), replaced by the tenant session on connect_with_client_certificate(...)
+        self.session = get_session(None, site_url or "", Download_PoolSize)
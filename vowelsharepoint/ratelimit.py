@@ -0,0 +1,189 @@
+import datetime
+import email.utils
+import threading
+import time
+from urllib.parse import urlparse
+
+from typing import Any
+
+# requests per second, adapted between min and max (AIMD): additive increase per successful
+# request, multiplicative decrease when throttled
+RateLimit_InitialRate = 20.0
+RateLimit_MinRate = 0.5
+RateLimit_MaxRate = 200.0
+RateLimit_Burst = 40
+RateLimit_IncreasePerRequest = 0.5
+RateLimit_DecreaseFactor = 0.5
+
+# responses SharePoint Online throttles with, retried after Retry-After
+Throttle_StatusCodes = (429, 503)
+Throttle_MaxRetries = 5
+# pause when a throttled response carries no Retry-After
+Throttle_DefaultRetryAfterSecs = 10
+
+# process wide rate limiters, (tenant, site url) -> RateLimiter, site url None for the tenant
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(tenant_id, site_url) -> "RateLimiter":
+    """
+    process wide RateLimiter for site_url of tenant_id, shared by every session and thread of that site.
+    Requests are also limited by the tenant limiter (shared by every site of the tenant), which pauses
+    all sites of the tenant when any of them is told to Retry-After.
+    tenant_id: Azure AD tenant id, None to scope by the site host (Eg. contoso.sharepoint.com)
+
+    Returns: RateLimiter
+    """
+    tenant = tenant_id or urlparse(site_url).netloc.lower()
+    key = (tenant, site_url.rstrip('/').lower())
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            tenant_limiter = _limiters.get((tenant, None))
+            if tenant_limiter is None:
+                tenant_limiter = _limiters[(tenant, None)] = RateLimiter()
+            limiter = _limiters[key] = RateLimiter(parent=tenant_limiter)
+        return limiter
+
+
+def get_retry_after_secs(response) -> float:
+    """
+    Returns: seconds to wait as per the Retry-After header of response (seconds or HTTP date),
+             Throttle_DefaultRetryAfterSecs if missing or invalid
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return Throttle_DefaultRetryAfterSecs
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return Throttle_DefaultRetryAfterSecs
+    return max((retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+
+
+class RateLimiter:
+
+    """
+    thread safe token bucket, refilled at rate requests per second (up to burst), where rate adapts
+    to throttling (AIMD): it grows by increase_per_request per successful request up to max_rate,
+    and is cut by decrease_factor (at most once per pause) when throttled, down to min_rate.
+    A throttled response pauses every caller for its Retry-After.
+    parent: optional, RateLimiter also acquired (and informed of throttling) per request, Eg. the tenant's
+    """
+
+    def __init__(self, rate=RateLimit_InitialRate, burst=RateLimit_Burst, min_rate=RateLimit_MinRate,
+                 max_rate=RateLimit_MaxRate, increase_per_request=RateLimit_IncreasePerRequest,
+                 decrease_factor=RateLimit_DecreaseFactor, parent=None) -> Any:
+
+        self.rate = float(rate)
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_per_request = increase_per_request
+        self.decrease_factor = decrease_factor
+        self.parent = parent
+
+        self._tokens = float(burst)   # below 0 when callers are waiting for their turn
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0      # monotonic, Retry-After
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.throttled = 0
+        self.waits = 0
+        self.waited_secs = 0.0
+
+    def acquire(self) -> float:
+        """
+        takes a token, blocking until one is available and any Retry-After pause is over
+
+        Returns: seconds waited
+        """
+        waited_secs = self.parent.acquire() if self.parent is not None else 0.0
+
+        wait_secs = self._take()
+        if wait_secs > 0:
+            time.sleep(wait_secs)
+        return waited_secs + wait_secs
+
+    def reserve(self) -> float:
+        """
+        takes a token without blocking, the caller waits the returned seconds before its request
+        (Eg. await asyncio.sleep(...) in a coroutine)
+
+        Returns: seconds to wait
+        """
+        wait_secs = self.parent.reserve() if self.parent is not None else 0.0
+        return wait_secs + self._take()
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.rate + self.increase_per_request, self.max_rate)
+        if self.parent is not None:
+            self.parent.on_success()
+
+    def on_throttled(self, retry_after_secs=Throttle_DefaultRetryAfterSecs) -> None:
+        """
+        slows down, and pauses every caller for retry_after_secs
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.throttled += 1
+            # requests in flight when the pause started are throttled too, decrease once per pause
+            if now >= self._paused_until:
+                self.rate = max(self.rate * self.decrease_factor, self.min_rate)
+            self._paused_until = max(self._paused_until, now + retry_after_secs)
+            self._tokens = min(self._tokens, 0.0)
+        if self.parent is not None:
+            self.parent.on_throttled(retry_after_secs)
+
+    def stats(self) -> dict:
+        """
+        Returns: dict of rate (requests per second), paused_secs (remaining Retry-After), requests,
+                 throttled, waits, waited_secs, and tenant (parent stats, if any)
+        """
+        with self._lock:
+            stats = {
+                "rate": self.rate,
+                "paused_secs": max(self._paused_until - time.monotonic(), 0.0),
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "waits": self.waits,
+                "waited_secs": self.waited_secs,
+            }
+        if self.parent is not None:
+            stats["tenant"] = self.parent.stats()
+        return stats
+
+    ################################### Internal functions #################################
+
+    def _take(self) -> float:
+        """
+        reserves a token, callers queue up behind each other's debt
+
+        Returns: seconds until the token is available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait_secs = max(self._paused_until - now, 0.0) + max(-self._tokens, 0.0) / self.rate
+            self.requests += 1
+            if wait_secs > 0:
+                self.waits += 1
+                self.waited_secs += wait_secs
+        return wait_secs
+
+    def _refill(self, now) -> None:
+        # caller holds self._lock. No tokens accrue during a Retry-After pause
+        refill_from = max(self._refilled_at, self._paused_until)
+        if now > refill_from:
+            self._tokens = min(self._tokens + (now - refill_from) * self.rate, self.burst)
+        self._refilled_at = now
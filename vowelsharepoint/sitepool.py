@@ -0,0 +1,530 @@
+import collections
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from typing import Any, Iterator
+
+from vowelsharepoint.instrumentation import get_logger, instrumented, run_in_context
+from vowelsharepoint.msgraphapi import Backend_Rest, new_site
+from vowelsharepoint.office365sdk import Download_ChunkSizeBytes
+
+logger = get_logger(__name__)
+
+# tasks running at once, for the pool and per site
+SitePool_MaxWorkers = 16
+SitePool_MaxPerSite = 4
+
+# files listed per listing task, a site listing resumes once the last download of its previous batch has run
+SitePool_ListBatchFiles = 500
+# iter_files(...): files listed ahead of the caller
+SitePool_QueuedFiles = 10000
+
+
+class SitePool:
+
+    """
+    SharePointSite per site url of a tenant (Eg. a tenant wide crawl of hundreds of site collections),
+    sharing the tenant token (token manager) and HTTP connections of the host.
+    Work is scheduled across sites: at most max_workers tasks run at once and at most max_per_site per site,
+    sites are served round robin, so a slow or throttled site holds at most max_per_site workers while
+    the other sites proceed. Progress and stats are aggregated per site and for the pool, see get_stats(...).
+    Note: the SDK context of a site is not thread safe, a site's listing runs as one task at a time,
+    downloads only use the HTTP session.
+    """
+
+    def __init__(self, site_urls, max_workers=SitePool_MaxWorkers, max_per_site=SitePool_MaxPerSite,
+                 backend=Backend_Rest) -> Any:
+
+        self.max_workers = max_workers
+        self.max_per_site = max_per_site
+
+        # site url -> SharePointSite (GraphSharePointSite for the graph backend)
+        self.sites = {}
+        for site_url in site_urls:
+            site = new_site(site_url, backend)
+            if site is not None and site_url:
+                self.sites[site_url] = site
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._queues = {site_url: collections.deque() for site_url in self.sites}
+        self._running = dict.fromkeys(self.sites, 0)
+        self._total_running = 0
+        # round robin order of the sites
+        self._site_order = collections.deque(self.sites)
+        self._site_stats = {site_url: _new_site_stats() for site_url in self.sites}
+        self._start_time = time.monotonic()
+        self._closed = False
+
+    def connect_with_client_certificate(self, tenant_id=None, client_id=None, cert_thumbprint=None, cert_pem=None) -> bool:
+        """
+        connects every site of the pool with certificate credentials, see SharePointSite.connect_with_client_certificate(...).
+        Sites of a tenant host share one token (refreshed in the background) and one connection pool.
+
+        Return: True if every site connected
+        """
+        if not self.sites:
+            logger.warning("invalid input:no site urls")
+            return False
+
+        connected = 0
+        for site_url, site in self.sites.items():
+            if site.connect_with_client_certificate(tenant_id, client_id, cert_thumbprint, cert_pem):
+                connected += 1
+            else:
+                logger.error("site pool connection failed: %s", site_url)
+
+        logger.info("site pool connected %s of %s sites", connected, len(self.sites))
+        return connected == len(self.sites)
+
+    def submit(self, site_url, func, *args, **kwargs) -> Future:
+        """
+        schedules func(site, *args, **kwargs) on the SharePointSite of site_url,
+        run once the pool and the site are below their concurrency limits
+
+        Returns: Future (cancelled once the pool is closed), None if site_url is not in the pool
+        """
+        if site_url not in self.sites:
+            logger.warning("invalid input:site not in pool: %s", site_url)
+            return None
+
+        future = Future()
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._queues[site_url].append((future, func, args, kwargs))
+                self._site_stats[site_url]["tasks"] += 1
+        if closed:
+            logger.warning("site pool closed, task cancelled: %s", site_url)
+            _cancel(future)
+            return future
+        self._dispatch()
+        return future
+
+    @instrumented
+    def map_sites(self, func, *args, **kwargs) -> dict:
+        """
+        runs func(site, *args, **kwargs) on every site of the pool, Eg. pool.map_sites(SharePointSite.get_doc_lib, "Documents")
+
+        Returns: dict site url -> result, None for a site where func raised
+        """
+        futures = {site_url: self.submit(site_url, func, *args, **kwargs) for site_url in self.sites}
+        results = {}
+        for site_url, future in futures.items():
+            try:
+                results[site_url] = future.result()
+            except Exception:
+                results[site_url] = None
+        return results
+
+    @instrumented
+    def iter_files(self, input_path, tag_column_name=None, modified_after=None, page_size=None) -> Iterator[tuple]:
+        """
+        iterate all files under given folder of every site (see SharePointSite.iter_files_in_folder(...)),
+        sites listed concurrently, files yielded as they arrive (at most SitePool_QueuedFiles listed ahead).
+        A site failing to list is logged and skipped (see get_stats(...) "errors").
+        input_path: Folder path, starting at Document Library for Eg. Documents/sharepoint-test-folder1
+
+        Yields: (site url, dict per file as returned by get_files_in_folder(...))
+        """
+
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return
+
+        out = queue.Queue(maxsize=SitePool_QueuedFiles)
+        closed = threading.Event()
+        remaining = 0
+        for site_url, site in self.sites.items():
+            if not self._is_connected(site_url):
+                continue
+            files = site.iter_files_in_folder(input_path, tag_column_name, modified_after, page_size)
+            self._submit_list_step(site_url, files, out, closed)
+            remaining += 1
+
+        try:
+            while remaining:
+                site_url, file_summary = out.get()
+                if file_summary is None:
+                    remaining -= 1
+                    continue
+                yield site_url, file_summary
+        finally:
+            # listings still running stop at their next file
+            closed.set()
+
+    @instrumented
+    def download_files(self, input_path, download_path, tag_column_name=None, modified_after=None,
+                       chunk_size_bytes=Download_ChunkSizeBytes) -> dict:
+        """
+        download all files under given folder of every site to download_path, listing and downloads of
+        the sites interleaved: downloads of a site start with its first listed files, its listing resumes
+        once the last download of the previous batch (SitePool_ListBatchFiles files) has run.
+        Files keep their folder structure under a folder per site,
+        Eg. https://contoso.sharepoint.com/sites/a : /sites/a/Shared Documents/x.docx
+            -> {download_path}/contoso.sharepoint.com/sites/a/Shared Documents/x.docx
+        input_path: Folder path, starting at Document Library for Eg. Documents/sharepoint-test-folder1
+        download_path : local path to download files. local path must be pre-existing.
+        tag_column_name: optional, column name from sharepoint to get tags
+        modified_after: optional, get only files modified after datetime
+        chunk_size_bytes: optional, byte range size for large files
+
+        Returns: dict of stats: sites, files, failed, bytes, elapsed_secs, files_per_sec, bytes_per_sec,
+                 by_site: site url -> {listed, files, failed, bytes, elapsed_secs}
+                 None on invalid input
+        """
+
+        if not input_path:
+            logger.warning("invalid input:missing input_path")
+            return None
+
+        if not os.path.isdir(download_path):
+            logger.warning("Provided download_path does not exist")
+            return None
+
+        job = _DownloadJob(self.sites)
+        # held until every site is scheduled
+        job.add()
+        for site_url, site in self.sites.items():
+            if not self._is_connected(site_url):
+                job.set_listing_failed(site_url)
+                continue
+            site_download_path = os.path.join(download_path, _get_site_folder(site_url))
+            files = site.iter_files_in_folder(input_path, tag_column_name, modified_after)
+            self._submit_download_step(job, site_url, files, site_download_path, chunk_size_bytes)
+        job.done()
+        job.wait()
+
+        stats = job.stats()
+        logger.info("site pool downloaded %s files from %s sites, %s failed, %s bytes in %.2f secs",
+                    stats["files"] - stats["failed"], stats["sites"], stats["failed"], stats["bytes"],
+                    stats["elapsed_secs"])
+        return stats
+
+    def get_stats(self) -> dict:
+        """
+        progress of the pool (every task submitted since it was created)
+
+        Returns: dict {sites, tasks, queued, running, completed, failed, errors, files, failed_files, bytes,
+                 elapsed_secs, bytes_per_sec, by_site: site url -> {tasks, queued, running, completed, failed,
+                 errors, files, failed_files, bytes, elapsed_secs}}
+        """
+        now = time.monotonic()
+        by_site = {}
+        with self._lock:
+            for site_url, site_stats in self._site_stats.items():
+                site_stats = dict(site_stats)
+                started_at, finished_at = site_stats.pop("started_at"), site_stats.pop("finished_at")
+                site_stats["queued"] = len(self._queues[site_url])
+                site_stats["running"] = self._running[site_url]
+                site_stats["elapsed_secs"] = 0.0
+                if started_at is not None:
+                    if site_stats["queued"] or site_stats["running"]:
+                        finished_at = now
+                    site_stats["elapsed_secs"] = finished_at - started_at
+                by_site[site_url] = site_stats
+
+        stats = {"sites": len(by_site)}
+        for key in ("tasks", "queued", "running", "completed", "failed", "errors", "files", "failed_files", "bytes"):
+            stats[key] = sum(site_stats[key] for site_stats in by_site.values())
+        stats["elapsed_secs"] = now - self._start_time
+        stats["bytes_per_sec"] = stats["bytes"] / stats["elapsed_secs"] if stats["elapsed_secs"] > 0 else 0.0
+        stats["by_site"] = by_site
+        return stats
+
+    def close(self) -> None:
+        """
+        cancels the queued tasks (their futures are cancelled, so callers waiting on them return),
+        waits for the running tasks and stops the pool workers. Tasks submitted afterwards are cancelled.
+        """
+        with self._lock:
+            self._closed = True
+            queued = [task for tasks in self._queues.values() for task in tasks]
+            for tasks in self._queues.values():
+                tasks.clear()
+        for future, _, _, _ in queued:
+            _cancel(future)
+        self._executor.shutdown(wait=True)
+
+    ################################### Internal functions #################################
+
+    def _dispatch(self) -> None:
+        """
+        starts queued tasks, round robin over the sites below max_per_site, while the pool is below max_workers
+        """
+        with self._lock:
+            while not self._closed and self._total_running < self.max_workers:
+                task = self._next_task()
+                if task is None:
+                    return
+                site_url = task[0]
+                self._running[site_url] += 1
+                self._total_running += 1
+                self._executor.submit(run_in_context(self._run), *task)
+
+    def _next_task(self) -> tuple:
+        """
+        Returns: (site url, future, func, args, kwargs) of the next site with a queued task and a free slot,
+                 None if there is none (lock held)
+        """
+        for _ in range(len(self._site_order)):
+            site_url = self._site_order[0]
+            self._site_order.rotate(-1)
+            if self._queues[site_url] and self._running[site_url] < self.max_per_site:
+                return (site_url,) + self._queues[site_url].popleft()
+        return None
+
+    def _run(self, site_url, future, func, args, kwargs) -> None:
+        """
+        pool worker, runs one task then starts the next ones
+        """
+        error = None
+        result = None
+        started_at = time.monotonic()
+        if future.set_running_or_notify_cancel():
+            try:
+                result = func(self.sites[site_url], *args, **kwargs)
+            except Exception as e:
+                logger.error("site pool task failed: %s %s", site_url, e)
+                error = e
+
+        with self._lock:
+            self._running[site_url] -= 1
+            self._total_running -= 1
+            site_stats = self._site_stats[site_url]
+            site_stats["completed"] += 1
+            site_stats["failed"] += int(error is not None)
+            if site_stats["started_at"] is None:
+                site_stats["started_at"] = started_at
+            site_stats["finished_at"] = time.monotonic()
+
+        if future.running():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        self._dispatch()
+
+    def _submit_job(self, job, site_url, on_cancel, func, *args) -> Future:
+        """
+        submit(...) of a task of job, job waits for it. on_cancel() runs if the task is cancelled (pool closed)
+        """
+        job.add()
+        future = self.submit(site_url, func, *args)
+
+        def done(_):
+            if future.cancelled():
+                on_cancel()
+            job.done()
+        future.add_done_callback(done)
+        return future
+
+    def _submit_list_step(self, site_url, files, out, closed) -> None:
+        """
+        submit(...) of the next _list_step(...) of a site, a cancelled step ends the site listing
+        """
+        future = self.submit(site_url, self._list_step, site_url, files, out, closed)
+
+        def done(_):
+            if future.cancelled():
+                _put(out, (site_url, None), closed)
+        future.add_done_callback(done)
+
+    def _submit_download_step(self, job, site_url, files, site_download_path, chunk_size_bytes) -> None:
+        """
+        _submit_job(...) of the next _download_step(...) of a site, a cancelled step leaves the site partly listed
+        """
+        self._submit_job(job, site_url, lambda: job.set_listing_failed(site_url), self._download_step,
+                         job, site_url, files, site_download_path, chunk_size_bytes)
+
+    def _is_connected(self, site_url) -> bool:
+        """
+        Returns: True if the site of site_url is connected, else counted as an error
+        """
+        if self.sites[site_url].ctx is not None:
+            return True
+        logger.warning("site not connected: %s", site_url)
+        self._add_progress(site_url, errors=1)
+        return False
+
+    def _add_progress(self, site_url, files=0, failed_files=0, size_bytes=0, errors=0) -> None:
+        with self._lock:
+            site_stats = self._site_stats[site_url]
+            site_stats["files"] += files
+            site_stats["failed_files"] += failed_files
+            site_stats["bytes"] += size_bytes
+            site_stats["errors"] += errors
+
+    def _list_step(self, site, site_url, files, out, closed) -> None:
+        """
+        iter_files(...) task, puts the next SitePool_ListBatchFiles files of site into out, then schedules
+        the next batch (the site listing does not hold a worker while other sites wait), (site url, None) once done
+        """
+        listed = 0
+        finished = True
+        try:
+            for file_summary in itertools.islice(files, SitePool_ListBatchFiles):
+                if not _put(out, (site_url, file_summary), closed):
+                    files.close()
+                    return
+                listed += 1
+            finished = listed < SitePool_ListBatchFiles
+        except Exception as e:
+            # any error ends the listing of this site only, the other sites carry on
+            logger.error("site pool listing failed: %s %s", site_url, e)
+            self._add_progress(site_url, errors=1)
+        finally:
+            self._add_progress(site_url, files=listed)
+            if finished:
+                # iter_files(...) waits for it
+                _put(out, (site_url, None), closed)
+
+        if not finished:
+            self._submit_list_step(site_url, files, out, closed)
+
+    def _download_step(self, site, job, site_url, files, site_download_path, chunk_size_bytes) -> None:
+        """
+        download_files(...) task, schedules the downloads of the next SitePool_ListBatchFiles files of site,
+        the next batch is listed once the last download of this one has run
+        """
+        last = None
+        listed = 0
+        try:
+            for file_summary in itertools.islice(files, SitePool_ListBatchFiles):
+                last = self._submit_job(job, site_url, lambda: job.add_file(site_url, False, 0), self._download_file,
+                                        job, site_url, file_summary, site_download_path, chunk_size_bytes)
+                listed += 1
+        except Exception as e:
+            # any error ends the listing of this site only, the other sites carry on
+            logger.error("site pool listing failed: %s %s", site_url, e)
+            self._add_progress(site_url, errors=1)
+            job.set_listing_failed(site_url)
+            return
+
+        if listed < SitePool_ListBatchFiles:
+            return
+
+        # the job waits for the next batch too
+        job.add()
+
+        def resume(_):
+            try:
+                self._submit_download_step(job, site_url, files, site_download_path, chunk_size_bytes)
+            finally:
+                job.done()
+        last.add_done_callback(resume)
+
+    def _download_file(self, site, job, site_url, file_summary, site_download_path, chunk_size_bytes) -> None:
+        """
+        download_files(...) task, downloads one file of site
+        """
+        os.makedirs(site_download_path, exist_ok=True)
+        file_download_summary, ok = site._download_summary_file(file_summary, site_download_path, chunk_size_bytes)
+        size_bytes = file_download_summary["file_size_bytes"] if ok else 0
+        job.add_file(site_url, ok, size_bytes)
+        self._add_progress(site_url, files=1, failed_files=int(not ok), size_bytes=size_bytes)
+
+
+class _DownloadJob:
+
+    """
+    SitePool.download_files(...) state: tasks in progress (the job is done at 0) and per site stats
+    """
+
+    def __init__(self, site_urls) -> Any:
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._done = threading.Event()
+        self._start_time = time.monotonic()
+        self._by_site = {site_url: {"listed": True, "files": 0, "failed": 0, "bytes": 0, "elapsed_secs": 0.0}
+                         for site_url in site_urls}
+
+    def add(self) -> None:
+        with self._lock:
+            self._pending += 1
+
+    def done(self) -> None:
+        with self._lock:
+            self._pending -= 1
+            if self._pending == 0:
+                self._done.set()
+
+    def wait(self) -> None:
+        self._done.wait()
+
+    def add_file(self, site_url, ok, size_bytes) -> None:
+        with self._lock:
+            site_stats = self._by_site[site_url]
+            site_stats["files"] += 1
+            site_stats["failed"] += int(not ok)
+            site_stats["bytes"] += size_bytes
+            site_stats["elapsed_secs"] = time.monotonic() - self._start_time
+
+    def set_listing_failed(self, site_url) -> None:
+        with self._lock:
+            self._by_site[site_url]["listed"] = False
+
+    def stats(self) -> dict:
+        elapsed_secs = time.monotonic() - self._start_time
+        with self._lock:
+            by_site = {site_url: dict(site_stats) for site_url, site_stats in self._by_site.items()}
+        stats = {"sites": len(by_site)}
+        for key in ("files", "failed", "bytes"):
+            stats[key] = sum(site_stats[key] for site_stats in by_site.values())
+        stats["elapsed_secs"] = elapsed_secs
+        stats["files_per_sec"] = (stats["files"] - stats["failed"]) / elapsed_secs if elapsed_secs > 0 else 0.0
+        stats["bytes_per_sec"] = stats["bytes"] / elapsed_secs if elapsed_secs > 0 else 0.0
+        stats["by_site"] = by_site
+        return stats
+
+
+def _new_site_stats() -> dict:
+    return {
+        "tasks": 0,
+        "completed": 0,
+        "failed": 0,
+        "errors": 0,
+        "files": 0,
+        "failed_files": 0,
+        "bytes": 0,
+        "started_at": None,
+        "finished_at": None,
+    }
+
+
+def _get_site_folder(site_url) -> str:
+    """
+    local folder of a site, Eg. https://contoso.sharepoint.com/sites/a -> contoso.sharepoint.com/sites/a
+    """
+    url = urlparse(site_url)
+    parts = [url.netloc.replace(":", "_")] + [part for part in url.path.split("/") if part and part != ".."]
+    return os.path.join(*parts)
+
+
+def _cancel(future) -> None:
+    """
+    cancels a queued future, waiters (Eg. concurrent.futures.wait(...)) are notified
+    """
+    if future.cancel():
+        future.set_running_or_notify_cancel()
+
+
+def _put(out, item, closed) -> bool:
+    """
+    puts item into queue out, unless closed is set first
+
+    Returns: True if item was put
+    """
+    while not closed.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
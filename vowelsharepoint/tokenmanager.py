@@ -0,0 +1,228 @@
+import threading
+import time
+
+import msal
+
+from office365.runtime.auth.authentication_context import AuthenticationContext
+from office365.runtime.auth.token_response import TokenResponse
+
+from typing import Any
+
+from vowelsharepoint.instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+# background refresh starts this long before the token expires
+Token_RefreshBeforeSecs = 600
+# a token this close to expiry is not used, requests wait for a new one
+Token_ExpiryMarginSecs = 60
+# wait before retrying a failed background refresh
+Token_RetrySecs = 10
+
+# process wide token managers, (tenant_id, client_id, scopes) -> (cert_thumbprint, TokenManager)
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_token_manager(tenant_id, client_id, cert_thumbprint, cert_pem, scopes) -> "TokenManager":
+    """
+    process wide TokenManager for the app-only (certificate) token of client_id in tenant_id,
+    shared by every SharePointSite of the tenant and client. A new certificate (Eg. after a rotation,
+    another cert_thumbprint) replaces the manager, the previous one stops its background refresh.
+    scopes: Eg. ["https://contoso.sharepoint.com/.default"]
+
+    Returns: TokenManager
+    """
+    key = (tenant_id, client_id, tuple(scopes))
+    with _managers_lock:
+        thumbprint, manager = _managers.get(key, (None, None))
+        if manager is not None and thumbprint != cert_thumbprint:
+            logger.info("certificate changed, new token manager: %s %s", tenant_id, client_id)
+            manager.stop()
+            manager = None
+        if manager is None:
+            app = msal.ConfidentialClientApplication(
+                client_id,
+                authority="https://login.microsoftonline.com/{0}".format(tenant_id),
+                client_credential={"thumbprint": cert_thumbprint, "private_key": cert_pem},
+            )
+
+            def _acquire_token(force):
+                if force:
+                    # msal serves its cached token until 5 mins before expiry
+                    _remove_client_tokens(app.token_cache, client_id)
+                return app.acquire_token_for_client(scopes)
+
+            manager = TokenManager(_acquire_token)
+            _managers[key] = (cert_thumbprint, manager)
+        return manager
+
+
+def _remove_client_tokens(token_cache, client_id) -> None:
+    """
+    removes the app-only access tokens of client_id from an msal token cache, so the next
+    acquire_token_for_client(...) requests a new token. Works with the pinned msal, which has no
+    remove_tokens_for_client() nor TokenCache.search() (later releases deprecate find() for search())
+    """
+    search = getattr(token_cache, "search", None) or token_cache.find
+    for access_token in list(search(msal.TokenCache.CredentialType.ACCESS_TOKEN, query={"client_id": client_id})):
+        token_cache.remove_at(access_token)
+
+
+class TokenManager:
+
+    """
+    keeps an access token fresh: a background thread refreshes it Token_RefreshBeforeSecs
+    before expiry, so requests do not wait on token acquisition at rollover.
+    Without a usable token, concurrent callers share a single (blocking) refresh.
+    acquire_token: callable(force) -> msal token result dict (access_token, token_type, expires_in),
+                   force: bypass any token cache
+    """
+
+    def __init__(self, acquire_token, refresh_before_secs=Token_RefreshBeforeSecs) -> Any:
+
+        self.refresh_before_secs = refresh_before_secs
+
+        self._acquire_token = acquire_token
+        self._token = None          # TokenResponse
+        self._acquired_at = 0.0     # monotonic
+        self._expires_at = 0.0      # monotonic
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.refreshes = 0
+        self.background_refreshes = 0
+        self.blocking_refreshes = 0
+        self.refresh_failures = 0
+        self.last_refresh_secs = 0.0
+
+    def get_token(self) -> TokenResponse:
+        """
+        Returns: a valid token, acquired (once for all waiting callers) if missing or about to expire
+        """
+        token = self.peek_token()
+        if token is not None:
+            return token
+
+        with self._lock:
+            # refreshed by another caller while waiting for the lock
+            token = self.peek_token()
+            if token is not None:
+                return token
+            self._refresh(force=False)
+            self.blocking_refreshes += 1
+            return self._token
+
+    def refresh_token(self, rejected_access_token=None) -> TokenResponse:
+        """
+        acquires a new token now, bypassing any token cache (Eg. the current one was rejected with a 401).
+        rejected_access_token: optional, the token that was rejected, not refreshed again if already replaced
+                               (concurrent callers rejected with the same token share one refresh)
+
+        Returns: the new token
+        """
+        with self._lock:
+            if (rejected_access_token is None or self._token is None
+                    or self._token.accessToken == rejected_access_token):
+                self._refresh(force=True)
+                self.blocking_refreshes += 1
+            return self._token
+
+    def peek_token(self) -> TokenResponse:
+        """
+        Returns: current token if valid beyond Token_ExpiryMarginSecs, None otherwise (never blocks)
+        """
+        if self._token is not None and time.monotonic() < self._expires_at - Token_ExpiryMarginSecs:
+            return self._token
+        return None
+
+    def get_authorization_header(self) -> str:
+        token = self.get_token()
+        return "{0} {1}".format(token.tokenType, token.accessToken)
+
+    def start(self) -> None:
+        """
+        starts the background refresh thread, which also prefetches the first token
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="vowelsharepoint-token-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        """
+        Returns: dict of token_age_secs, expires_in_secs (None without a token), refreshes,
+                 background_refreshes, blocking_refreshes, refresh_failures, last_refresh_secs (duration)
+        """
+        now = time.monotonic()
+        has_token = self._token is not None
+        return {
+            "token_age_secs": now - self._acquired_at if has_token else None,
+            "expires_in_secs": self._expires_at - now if has_token else None,
+            "refreshes": self.refreshes,
+            "background_refreshes": self.background_refreshes,
+            "blocking_refreshes": self.blocking_refreshes,
+            "refresh_failures": self.refresh_failures,
+            "last_refresh_secs": self.last_refresh_secs,
+        }
+
+    ################################### Internal functions #################################
+
+    def _refresh(self, force) -> None:
+        """
+        acquires a new token, caller holds self._lock. Raises ValueError on error
+        """
+        start = time.monotonic()
+        try:
+            token = TokenResponse.from_json(self._acquire_token(force))
+        except Exception:
+            self.refresh_failures += 1
+            raise
+        now = time.monotonic()
+
+        self._token = token
+        self._acquired_at = now
+        self._expires_at = now + int(getattr(token, "expiresIn", 0) or 0)
+        self.refreshes += 1
+        self.last_refresh_secs = now - start
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            # refresh_before_secs ahead of expiry, at the earliest half way through the token lifetime
+            lifetime_secs = self._expires_at - self._acquired_at
+            refresh_at = self._acquired_at + max(lifetime_secs - self.refresh_before_secs, lifetime_secs / 2)
+            wait_secs = refresh_at - time.monotonic()
+            if self._token is not None and wait_secs > 0:
+                self._stop.wait(wait_secs)
+                continue
+            try:
+                with self._lock:
+                    self._refresh(force=self._token is not None)
+                    self.background_refreshes += 1
+            except Exception as e:
+                logger.error("token refresh failed: %s", e)
+                self._stop.wait(Token_RetrySecs)
+
+
+class ManagedAuthenticationContext(AuthenticationContext):
+
+    """
+    SDK authentication context which authorizes requests with the token of a TokenManager
+    (the SDK's own with_access_token(...) caches the first token forever)
+    """
+
+    def __init__(self, url, token_manager) -> Any:
+        super(ManagedAuthenticationContext, self).__init__(url)
+        self.token_manager = token_manager
+
+    def authenticate_request(self, request):
+        request.set_header("Authorization", self.token_manager.get_authorization_header())